@@ -1,91 +1,100 @@
 import sounddevice as sd
+import math
 import queue
 import sys
-import json
-import requests
-from vosk import Model, KaldiRecognizer
+from time import perf_counter, process_time
+from scorpion_speech import AudioRing, CommandSender, make_detector
 
 # ESP32 Wi-Fi connection info - replace with your ESP32's IP address
-ESP32_IP = '192.168.4.1'  
+ESP32_IP = '192.168.4.1'
 ESP32_URL = f"http://{ESP32_IP}/control"
 
+# Send a command as soon as the keyword shows up in the partial result, instead
+# of waiting for the pause at the end of the sentence
+LOW_LATENCY = False
+# Time both ways of firing on every command and print a table when stopped
+MEASURE = False
+# Only listen for the command words in scorpion_commands.json (anything else
+# is heard as [unk]); much cheaper than decoding open English
+GRAMMAR = False
+# Don't decode blocks that are just background noise between commands
+VAD = True
+# Skip audio that has waited longer than this (seconds) to be decoded, and never
+# send a command whose word was spoken longer ago than MAX_COMMAND_AGE
+MAX_LAG = 1.0
+MAX_COMMAND_AGE = 1.5
+# Print queue stats this often (seconds)
+STATS_EVERY = 10
+# Keep the model loaded in a background recognizer (speech_daemon.py) between
+# runs, so a restart is ready in milliseconds instead of seconds. It keeps
+# running (and holding the model's memory) after this script exits; stop it
+# with "python speech_daemon.py --stop". Needs Unix sockets (Linux/macOS).
+DAEMON = False
+
 # Path to your downloaded Vosk model
 model_path = 'vosk-model-small-en-us-0.15'
 sample_rate = 16000
-q = queue.Queue()
+# Partial results are only checked once per block, so use short blocks (0.1 s) when they matter
+blocksize = 1600 if LOW_LATENCY or MEASURE else 8000
+q = AudioRing(capacity=math.ceil(MAX_LAG * sample_rate / blocksize) + 2, max_lag=MAX_LAG, clock=perf_counter)
 
 # Audio callback - required by sounddevice
 def callback(indata, frames, time, status):
     if status:
         print(status, file=sys.stderr)
-    q.put(bytes(indata))
+    q.put(bytes(indata), perf_counter())
 
 # Load the model and start recognition
-model = Model(model_path)
-recognizer = KaldiRecognizer(model, sample_rate)
+options = dict(sample_rate=sample_rate, grammar=GRAMMAR, vad=VAD, partial=LOW_LATENCY, measure=MEASURE,
+               max_age=MAX_COMMAND_AGE)
+if DAEMON:
+    from speech_daemon import RecognizerClient
+    detector = RecognizerClient(model_path=model_path, **options)
+    print(detector.startup())
+else:
+    from vosk import Model
+    startup = perf_counter()
+    model = Model(model_path)
+    detector = make_detector(model, **options)
+    print(f"Model loaded in {perf_counter() - startup:.2f} s")
+
+# Commands go out on their own thread, so the loop below never waits on the ESP32
+sender = CommandSender(ESP32_URL, timeout=5, max_age=MAX_COMMAND_AGE)
 
 # Start audio stream
-with sd.RawInputStream(samplerate=sample_rate, blocksize=8000, dtype='int16',
+with sd.RawInputStream(samplerate=sample_rate, blocksize=blocksize, dtype='int16',
                       channels=1, callback=callback):
     print("Listening for command... (Ctrl+C to stop)")
-    
+    started, started_cpu = perf_counter(), process_time()
+    last_stats = started
+
     try:
         while True:
-            data = q.get()
-            if recognizer.AcceptWaveform(data):
-                result = recognizer.Result()
-                text = json.loads(result).get("text", "")
-                
-                if text:
-                    print("You said:", text)
-                    
-                    # Send command to ESP32 if required commands are detected
-                    if "expand" in text.lower():
-                        print("Sending command to ESP32...")
-                        try:
-                            response = requests.get(f"{ESP32_URL}?command=LIGHT_ON", timeout=5)
-                            print(f"ESP32 response: {response.text} (Status: {response.status_code})")
-                        except Exception as e:
-                            print(f"Error communicating with ESP32: {e}")
-
-                    elif "contract" in text.lower() or "contact" in text.lower():
-                        print("Sending command to ESP32...")
-                        try:
-                            response = requests.get(f"{ESP32_URL}?command=LIGHT_OFF", timeout=5)
-                            print(f"ESP32 response: {response.text} (Status: {response.status_code})")
-                        except Exception as e:
-                            print(f"Error communicating with ESP32: {e}")
-
-                    elif "exit" in text.lower():
-                        print("Sending command to ESP32...")
-                        try:
-                            response = requests.get(f"{ESP32_URL}?command=LIGHT_HOLD", timeout=5)
-                            print(f"ESP32 response: {response.text} (Status: {response.status_code})")
-                        except Exception as e:
-                            print(f"Error communicating with ESP32: {e}")
-
-                    elif "left" in text.lower():
-                        print("Sending command to ESP32...")
-                        try:
-                            response = requests.get(f"{ESP32_URL}?command=MOVE_LEFT", timeout=5)
-                            print(f"ESP32 response: {response.text} (Status: {response.status_code})")
-                        except Exception as e:
-                            print(f"Error communicating with ESP32: {e}")
+            if perf_counter() - last_stats >= STATS_EVERY:
+                print(q.stats())
+                last_stats = perf_counter()
+            try:
+                data, arrived, gap = q.get(timeout=STATS_EVERY)
+            except queue.Empty:
+                continue
+            if gap:
+                # Audio was dropped: don't stitch the two halves of a sentence together
+                detector.discard()
+            # Send command to ESP32 if required commands are detected
+            for command, spoken in detector.feed(data, arrived):
+                print(f"Sending {command} to ESP32...")
+                if not sender.send(command, spoken):
+                    print("ESP32 is not keeping up, command dropped")
 
-                    elif "right" in text.lower():
-                        print("Sending command to ESP32...")
-                        try:
-                            response = requests.get(f"{ESP32_URL}?command=MOVE_RIGHT", timeout=5)
-                            print(f"ESP32 response: {response.text} (Status: {response.status_code})")
-                        except Exception as e:
-                            print(f"Error communicating with ESP32: {e}")
-                    elif "middle" in text.lower():
-                        print("Sending command to ESP32...")
-                        try:
-                            response = requests.get(f"{ESP32_URL}?command=MOVE_MID", timeout=5)
-                            print(f"ESP32 response: {response.text} (Status: {response.status_code})")
-                        except Exception as e:
-                            print(f"Error communicating with ESP32: {e}")
-                        
     except KeyboardInterrupt:
         print("\nProgram stopped")
+        sender.close(wait=False)
+        print("Commands:", sender.summary())
+        print("Recognizer ({}):".format("command grammar" if GRAMMAR else "open vocabulary"), detector.usage())
+        print("Whole program: CPU {:.1f}% of one core".format(
+            100 * (process_time() - started_cpu) / (perf_counter() - started)))
+        if DAEMON:
+            print('The recognizer daemon is still running with the model loaded; '
+                  'stop it with "python speech_daemon.py --stop"')
+        if MEASURE:
+            print(detector.report())
@@ -136,4 +136,3 @@ def main():
 
 if __name__ == "__main__":
     main()
-    nigga is dying chat help plz nwnvdjd
@@ -1,16 +1,17 @@
+import asyncio
 import random
+import sys
 import time
 import cv2
 import pyaudio
-import numpy as np
 import wave
 import pygame
 import serial
 import threading
 from datetime import datetime
-import tkinter as tk
-from PIL import Image, ImageTk
-import os
+from horror_camera import CameraCapture, FaceDetector
+from horror_mic import MicMonitor
+from horror_scare import ScareAssets, ScareWindow
 
 class HorrorGame:
     def __init__(self, serial_port='/dev/ttyUSB0', baud_rate=115200):
@@ -100,39 +101,59 @@ class HorrorGame:
         self.jumpscare_image_path = 'jumpscare.png'  # Replace with your image
         self.jumpscare_sound = 'screeching-sound-effect-312866.mp3'  # Replace with your sound file
         
-        # Initialize tkinter for fullscreen jumpscare
-        self.root = None
-        self.tk_thread = None
+        # Decode the sound and scale the picture now, and keep a hidden fullscreen
+        # window ready, so a scare only has to show it. Tk runs on this (the main) thread.
+        self.assets = ScareAssets(self.jumpscare_image_path, self.jumpscare_sound)
+        self.scare_window = ScareWindow(self.assets, duration_ms=2000)
         
         # Audio detection settings
-        self.audio_threshold = 1000  # Adjust based on testing
-        self.format = pyaudio.paInt16
-        self.channels = 1
         self.rate = 44100
         self.chunk = 1024
         self.audio = pyaudio.PyAudio()
+        # Opened once at game start; a sound must stay 15 dB over the room's background
+        # (and over -50 dBFS) for 150 ms, so a single click doesn't count
+        self.mic = MicMonitor(self.audio, rate=self.rate, chunk=self.chunk,
+                              margin_db=15, min_db=-50, sustain_ms=150)
         
         # Video detection settings
         self.face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
+        # Half resolution, skip frames where nothing moved, look near the last face first.
+        # FaceDetector(self.face_cascade, scale=1, motion_threshold=0, roi_margin=None) is the old full check;
+        # compare settings on a recording with horror_face_bench.py
+        self.face_detector = FaceDetector(self.face_cascade, scale=0.5, motion_threshold=2.0, roi_margin=0.5)
+        # Opened once at game start and kept running, so camera questions don't wait for it
+        self.camera = CameraCapture(0)
         
         # Game state
         self.running = False
+        self.answer_timeout = 30  # seconds to answer before the game moves on
         self.current_question = None
         self.user_choice = None
         
     def start_game(self):
         """Start the horror game"""
+        try:
+            asyncio.run(self.play())
+        except KeyboardInterrupt:
+            print("\nGame terminated by user")
+    
+    async def play(self):
+        """Run the game: questions, sensors, ESP32 and keyboard as tasks on one event loop"""
         self.running = True
-        print("\n" + "="*50)
-        print("HORROR GAME INITIATED")
-        print("="*50 + "\n")
-        time.sleep(2)
-        print("The game will ask you questions...")
-        time.sleep(1)
-        print("Answer truthfully... or else.")
-        time.sleep(2)
+        self.inputs = asyncio.Queue()  # (source, line) from the keyboard and the ESP32
+        self.outbox = asyncio.Queue()  # bytes for the ESP32
+        self.camera.start()  # warms up during the intro
+        self.mic.start()  # and learns the room's background level
+        
+        # Blocking reads get a thread each and hand their lines to the loop
+        self._start_reader(self._read_keyboard, "keyboard")
+        if self.ser:
+            self._start_reader(self._read_serial, "esp32")
+        tasks = [asyncio.create_task(self._pump_window()), asyncio.create_task(self._write_serial())]
         
         try:
+            await self.intro()
+            
             # Create a shuffled copy of questions to go through
             game_questions = random.sample(self.questions, len(self.questions))
             
@@ -143,34 +164,107 @@ class HorrorGame:
                 self.current_question = question
                 
                 # Display the question with a slow typing effect
-                self.type_text(self.current_question["text"])
+                await self.type_text(self.current_question["text"])
                 
                 # Handle the question based on its type
                 if self.current_question["special"]:
                     if self.current_question["trigger"] == "camera":
-                        self.handle_camera_question()
+                        await self.handle_camera_question()
                     elif self.current_question["trigger"] == "microphone":
-                        self.handle_microphone_question()
+                        await self.handle_microphone_question()
                 else:
-                    self.handle_normal_question()
+                    await self.handle_normal_question()
                 
                 # Wait between questions
-                time.sleep(random.uniform(2, 4))
-                
-        except KeyboardInterrupt:
-            print("\nGame terminated by user")
+                await asyncio.sleep(random.uniform(2, 4))
         finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
             self.cleanup()
     
-    def type_text(self, text):
+    async def intro(self):
+        """Print the opening lines"""
+        print("\n" + "="*50)
+        print("HORROR GAME INITIATED")
+        print("="*50 + "\n")
+        await asyncio.sleep(2)
+        print("The game will ask you questions...")
+        await asyncio.sleep(1)
+        print("Answer truthfully... or else.")
+        await asyncio.sleep(2)
+    
+    def _start_reader(self, read_line, source):
+        """Read lines on a daemon thread and queue them as (source, line) until read_line returns None"""
+        loop = asyncio.get_running_loop()
+        
+        def run():
+            while self.running:
+                line = read_line()
+                if line is None:
+                    break
+                try:
+                    loop.call_soon_threadsafe(self.inputs.put_nowait, (source, line))
+                except RuntimeError:
+                    break  # The game is over and its loop closed
+        
+        threading.Thread(target=run, daemon=True).start()
+    
+    def _read_keyboard(self):
+        line = sys.stdin.readline()
+        return line.strip() if line else None
+    
+    def _read_serial(self):
+        # The ESP32 can answer too: it sends the option number, or any line for Enter
+        while self.running:
+            try:
+                line = self.ser.readline()  # Gives up after the port's 1 s timeout
+            except Exception:
+                return None  # Closed
+            if line.strip():
+                return line.decode(errors="replace").strip()
+        return None
+    
+    async def _write_serial(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            data = await self.outbox.get()
+            if self.ser:
+                try:
+                    await loop.run_in_executor(None, self.ser.write, data)
+                except Exception as e:
+                    print(f"Failed to write to ESP32: {e}")
+    
+    async def _pump_window(self):
+        # Tk lives on this thread, so the loop keeps it drawing
+        while True:
+            self.scare_window.update()
+            await asyncio.sleep(0.01)
+    
+    async def next_input(self, timeout=None):
+        """Wait for the next line from the keyboard or the ESP32; None on timeout"""
+        try:
+            source, line = await asyncio.wait_for(self.inputs.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        if source != "keyboard":
+            print(f"{line}  ({source})")
+        return line
+    
+    def _drop_typed_ahead(self):
+        # Anything entered before the question asked doesn't answer it
+        while not self.inputs.empty():
+            self.inputs.get_nowait()
+    
+    async def type_text(self, text):
         """Display text with creepy typing effect"""
         print("\n")
         for char in text:
             print(char, end='', flush=True)
-            time.sleep(random.uniform(0.05, 0.15))
+            await asyncio.sleep(random.uniform(0.05, 0.15))
         print("\n")
     
-    def handle_normal_question(self):
+    async def handle_normal_question(self):
         """Handle a normal question with yes/no options"""
         options = self.current_question.get("options", ["Yes", "No"])
         
@@ -179,9 +273,16 @@ class HorrorGame:
             print(f"{i}. {option}")
         
         # Get user choice
+        self._drop_typed_ahead()
+        deadline = asyncio.get_running_loop().time() + self.answer_timeout
         while True:
+            print("\nEnter your choice (1 or 2): ", end='', flush=True)
+            choice = await self.next_input(deadline - asyncio.get_running_loop().time())
+            if choice is None:
+                self.user_choice = None
+                print("\n\nToo slow...")
+                break
             try:
-                choice = input("\nEnter your choice (1 or 2): ")
                 choice_num = int(choice)
                 if 1 <= choice_num <= len(options):
                     self.user_choice = options[choice_num - 1]
@@ -192,24 +293,22 @@ class HorrorGame:
             except ValueError:
                 print("Please enter a valid number.")
     
-    def handle_camera_question(self):
+    async def handle_camera_question(self):
         """Handle a camera-based question"""
         print("\nPress Enter to continue...")
-        input()
+        self._drop_typed_ahead()
+        await self.next_input(self.answer_timeout)
         
         # Display warning
         warning = self.current_question.get("warning", "H I D E")
-        self.type_text(warning)
-        
-        # Start camera in a separate thread
-        camera_thread = threading.Thread(target=self._camera_check)
-        camera_thread.daemon = True
-        camera_thread.start()
+        await self.type_text(warning)
         
-        # Wait for detection period
-        time.sleep(3)  # 3 second window to hide
+        # 3 second window to hide; over as soon as a face shows
+        detected = await self.watch_camera(3)
+        if detected is not None:
+            await self.trigger_jumpscare("I SEE YOU", detected)
     
-    def handle_microphone_question(self):
+    async def handle_microphone_question(self):
         """Handle a microphone-based question"""
         options = self.current_question.get("options", ["Yes", "IT CAN HEAR YOU"])
         
@@ -219,151 +318,82 @@ class HorrorGame:
         
         print("\nListening...")
         
-        # Start listening in a separate thread
-        mic_thread = threading.Thread(target=self._listen_for_sound)
-        mic_thread.daemon = True
-        mic_thread.start()
-        
-        # Wait for detection period
-        time.sleep(3)  # 3 second window of silence
+        # 3 second window of silence; over as soon as a sound is heard
+        detected = await self.listen_for_sound(3)
+        if detected is not None:
+            await self.trigger_jumpscare("I HEARD YOU", detected)
     
-    def _camera_check(self):
-        """Internal method to check camera feed for faces"""
-        cap = cv2.VideoCapture(0)
-        if not cap.isOpened():
-            print("Could not open camera")
-            return
-            
-        # Check for 3 seconds
-        end_time = time.time() + 3
-        detected = False
+    async def watch_camera(self, window):
+        """Look for a face for up to window seconds; returns when one was found, or None"""
+        loop = asyncio.get_running_loop()
+        stop = threading.Event()
+        try:
+            return await asyncio.wait_for(loop.run_in_executor(None, self._camera_check, stop), window)
+        except asyncio.TimeoutError:
+            return None
+        finally:
+            stop.set()  # The detector thread stops at its next frame; nothing it finds now counts
+    
+    def _camera_check(self, stop):
+        """Internal method to check camera feed for faces until stop is set"""
+        seq = 0
+        self.face_detector.reset()
         
-        while time.time() < end_time and not detected:
-            ret, frame = cap.read()
-            if not ret:
+        while not stop.is_set():
+            # Newest frame from the capture thread (not a copy, so don't draw on it)
+            latest = self.camera.wait_frame(seq, timeout=0.1)
+            if latest is None:
+                if self.camera.error:
+                    print(self.camera.error)
+                    stop.wait()  # Still give the player the whole window
+                    return None
                 continue
-                
-            # Convert to grayscale for face detection
-            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+            frame, seq, _ = latest
             
             # Detect faces
-            faces = self.face_cascade.detectMultiScale(
-                gray,
-                scaleFactor=1.1,
-                minNeighbors=5,
-                minSize=(30, 30)
-            )
-            
-            # If face detected, trigger jumpscare
-            if len(faces) > 0:
-                detected = True
-                self.trigger_jumpscare("I SEE YOU")
-        
-        # Release the camera
-        cap.release()
+            if self.face_detector.detect(frame):
+                return time.perf_counter()
+        return None
     
-    def _listen_for_sound(self):
-        """Internal method to listen for sounds above threshold"""
-        stream = self.audio.open(
-            format=self.format,
-            channels=self.channels,
-            rate=self.rate,
-            input=True,
-            frames_per_buffer=self.chunk
-        )
+    async def listen_for_sound(self, window):
+        """Listen for a sound above the background level for up to window seconds; returns when, or None"""
+        if self.mic.error:
+            print(self.mic.error)
+            await asyncio.sleep(window)
+            return None
         
-        # Listen for 3 seconds
-        end_time = time.time() + 3
-        detected = False
+        # The mic is already running: just hear about detections during the window
+        loop = asyncio.get_running_loop()
+        heard = asyncio.Queue()
         
-        while time.time() < end_time and not detected:
-            data = np.frombuffer(stream.read(self.chunk), dtype=np.int16)
-            if np.abs(data).mean() > self.audio_threshold:
-                detected = True
-                self.trigger_jumpscare("I HEARD YOU")
+        def on_detection(detection):
+            loop.call_soon_threadsafe(heard.put_nowait, detection)
         
-        # Close the stream
-        stream.stop_stream()
-        stream.close()
+        self.mic.subscribe(on_detection)
+        try:
+            detected, _, _ = await asyncio.wait_for(heard.get(), window)
+        except asyncio.TimeoutError:
+            return None
+        finally:
+            self.mic.unsubscribe(on_detection)
+        return detected
     
-    def trigger_jumpscare(self, message):
-        """Display jumpscare image and play sound"""
+    async def trigger_jumpscare(self, message, detected=None):
+        """Show the jumpscare and play its sound; detected is when the detection happened"""
+        # Tk runs on this thread, so the window can go up straight away
+        done = self.scare_window.scare(message, detected)
+        self.scare_window.update()
+        
         # Log the jumpscare event
         print(f"\n!!! JUMPSCARE TRIGGERED: {message} !!!")
         
         # Notify ESP32 if connected
-        if self.ser:
-            self.ser.write(b'JUMPSCARE\n')
-        
-        # Play jumpscare sound in a separate thread
-        sound_thread = threading.Thread(target=self._play_jumpscare_sound)
-        sound_thread.daemon = True
-        sound_thread.start()
-        
-        # Display jumpscare image using tkinter for guaranteed fullscreen
-        if self.tk_thread and self.tk_thread.is_alive():
-            # Don't create a new window if one is already active
-            return
-            
-        self.tk_thread = threading.Thread(target=self._show_fullscreen_jumpscare, args=(message,))
-        self.tk_thread.daemon = True
-        self.tk_thread.start()
+        self.outbox.put_nowait(b'JUMPSCARE\n')
         
         # Wait for jumpscare window to close
-        if self.tk_thread:
-            self.tk_thread.join(timeout=2.5)  # Wait up to 2.5 seconds
-        
-    def _play_jumpscare_sound(self):
-        """Play jumpscare sound"""
-        try:
-            pygame.mixer.music.load(self.jumpscare_sound)
-            pygame.mixer.music.play()
-        except Exception as e:
-            print(f"Error playing jumpscare sound: {e}")
-    
-    def _show_fullscreen_jumpscare(self, message):
-        """Show jumpscare image in fullscreen mode using tkinter"""
-        try:
-            # Create a new tkinter window
-            root = tk.Tk()
-            root.attributes('-fullscreen', True)  # Make it fullscreen
-            root.attributes('-topmost', True)  # Make it appear on top of all windows
-            root.overrideredirect(True)  # Remove window decorations
-            
-            # Load jumpscare image
-            if os.path.exists(self.jumpscare_image_path):
-                # Get screen dimensions
-                screen_width = root.winfo_screenwidth()
-                screen_height = root.winfo_screenheight()
-                
-                # Load and resize the image to fit the screen
-                image = Image.open(self.jumpscare_image_path)
-                image = image.resize((screen_width, screen_height), Image.LANCZOS)
-                photo = ImageTk.PhotoImage(image)
-                
-                # Create a label with the image
-                label = tk.Label(root, image=photo)
-                label.image = photo  # Keep a reference to prevent garbage collection
-                label.place(x=0, y=0, relwidth=1, relheight=1)
-            else:
-                print(f"Jumpscare image not found: {self.jumpscare_image_path}")
-                
-                # Create a plain black screen with text if image is missing
-                label = tk.Label(root, text=message, font=("Arial", 72), fg="red", bg="black")
-                label.place(relx=0.5, rely=0.5, anchor='center')
-            
-            # Function to close the window after 2 seconds
-            def close_window():
-                root.destroy()
-                
-            # Schedule window to close after 2 seconds
-            root.after(2000, close_window)
-            
-            # Start the main loop
-            root.mainloop()
-                
-        except Exception as e:
-            print(f"Error displaying jumpscare: {e}")
+        deadline = asyncio.get_running_loop().time() + 2.5  # Wait up to 2.5 seconds
+        while not done.is_set() and asyncio.get_running_loop().time() < deadline:
+            await asyncio.sleep(0.02)
     
     def cleanup(self):
         """Clean up resources"""
@@ -373,14 +403,22 @@ class HorrorGame:
         if self.ser:
             self.ser.close()
             
-        # Terminate audio
+        # Release the camera
+        self.camera.stop()
+        print(self.camera.stats())
+        print(self.face_detector.stats())
+            
+        # Close the microphone and terminate audio
+        self.mic.stop()
+        print(self.mic.stats())
         self.audio.terminate()
         
         # Close any OpenCV windows
         cv2.destroyAllWindows()
         
-        # Note: We don't check the root window here anymore
-        # Instead, we let each tk window clean itself up
+        # Close the jumpscare window
+        print(self.scare_window.stats())
+        self.scare_window.destroy()
         print("\nThe game has ended...or has it?")
 
 if __name__ == "__main__":
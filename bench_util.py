@@ -0,0 +1,29 @@
+# Small helpers shared by the host-side benchmarks and harnesses
+# (scorpion_udp_loopback.py, scorpion_loadgen.py, speech_replay.py,
+# speech_grammar_bench.py, horror_face_bench.py), so none of them has to
+# import another.
+import socket
+import wave
+
+
+def percentile(values, p):
+    """The p-th percentile of values (nearest rank, no interpolation)."""
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+def free_port(kind):
+    """A localhost port that is free right now, for socket.SOCK_STREAM or socket.SOCK_DGRAM."""
+    s = socket.socket(socket.AF_INET, kind)
+    s.bind(('127.0.0.1', 0))
+    port = s.getsockname()[1]
+    s.close()
+    return port
+
+
+def read_wav(path):
+    """Return (frames, sample rate) of a 16-bit mono WAV file."""
+    with wave.open(path, 'rb') as w:
+        if w.getnchannels() != 1 or w.getsampwidth() != 2:
+            raise ValueError('{} must be 16-bit mono'.format(path))
+        return w.readframes(w.getnframes()), w.getframerate()
@@ -0,0 +1,267 @@
+# Camera side of the HorrorGame.
+# The camera is opened once when the game starts and a background thread keeps
+# reading frames into a small ring, so a camera question can start looking at
+# once instead of waiting for the device to open and its exposure to settle.
+# FaceDetector runs the Haar cascade as a pipeline of cheaper stages, so a face
+# is found in a fraction of the time the full-resolution cascade takes.
+import threading
+import time
+
+import cv2
+
+
+class CameraCapture:
+    def __init__(self, index=0, ring_size=4, clock=time.perf_counter):
+        """
+        Keep a camera open and the latest few frames at hand.
+
+        Frames are read straight into a ring of ring_size buffers and handed out
+        without copying, so a frame stays valid for ring_size - 1 further frames;
+        copy it if it is needed for longer.
+
+        Args:
+            index (int): OpenCV camera index.
+            ring_size (int): Frame buffers to cycle through.
+            clock (callable): Time source for the frame timestamps.
+        """
+        self.index = index
+        self.ring_size = ring_size
+        self.clock = clock
+        self.error = None
+        self.frames = 0
+        self.read_failures = 0
+        self.dropped = 0  # frames captured while a detector was busy that it never saw
+        self.open_s = None  # start() to the device being open
+        self.first_frame_s = None  # start() to the first frame
+        self._started = None
+        self._first_t = None
+        self._last_t = None
+        self._latest = None  # (frame, seq, t)
+        self._running = False
+        self._thread = None
+        self._cond = threading.Condition()
+
+    def start(self):
+        """Open the camera and start capturing in the background. Returns self."""
+        if self._thread is None:
+            self._started = self.clock()
+            self._running = True
+            self._thread = threading.Thread(target=self._run, name='CameraCapture', daemon=True)
+            self._thread.start()
+        return self
+
+    def _run(self):
+        cap = cv2.VideoCapture(self.index)
+        if not cap.isOpened():
+            with self._cond:
+                self.error = 'Could not open camera'
+                self._running = False
+                self._cond.notify_all()
+            return
+        self.open_s = self.clock() - self._started
+        ring = [None] * self.ring_size
+        seq = 0
+        try:
+            while self._running:
+                slot = seq % self.ring_size
+                ok, frame = cap.read(ring[slot])  # reuses the slot's buffer once it has the right shape
+                now = self.clock()
+                if not ok:
+                    self.read_failures += 1
+                    time.sleep(0.01)
+                    continue
+                ring[slot] = frame
+                seq += 1
+                with self._cond:
+                    if self._first_t is None:
+                        self._first_t = now
+                        self.first_frame_s = now - self._started
+                    self._last_t = now
+                    self.frames = seq
+                    self._latest = (frame, seq, now)
+                    self._cond.notify_all()
+        finally:
+            cap.release()
+
+    def latest(self):
+        """Return (frame, seq, t) for the newest frame, or None before the first one."""
+        return self._latest
+
+    def wait_frame(self, after_seq=0, timeout=None):
+        """
+        Wait for a frame newer than after_seq.
+
+        Args:
+            after_seq (int): seq of the last frame the caller got (0 for none).
+            timeout (float, optional): Seconds to wait.
+
+        Returns:
+            tuple: (frame, seq, t), or None on timeout or if the camera failed.
+        """
+        with self._cond:
+            if not self._cond.wait_for(lambda: (self._latest is not None and self._latest[1] > after_seq)
+                                       or not self._running, timeout):
+                return None
+            latest = self._latest
+            if latest is None or latest[1] <= after_seq:
+                return None
+        if after_seq:
+            self.dropped += latest[1] - after_seq - 1
+        return latest
+
+    def fps(self):
+        if self._first_t is None or self.frames < 2 or self._last_t == self._first_t:
+            return 0.0
+        return (self.frames - 1) / (self._last_t - self._first_t)
+
+    def stats(self):
+        if self.error:
+            return 'camera: ' + self.error
+        return 'camera: open {}, first frame {}, {:.1f} fps, {} frames, {} read failures, {} dropped'.format(
+            '-' if self.open_s is None else '{:.2f} s'.format(self.open_s),
+            '-' if self.first_frame_s is None else '{:.2f} s'.format(self.first_frame_s),
+            self.fps(), self.frames, self.read_failures, self.dropped)
+
+    def stop(self):
+        self._running = False
+        with self._cond:
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+            self._thread = None
+
+
+class FaceDetector:
+    STAGES = ('gray', 'resize', 'motion', 'roi', 'full')
+
+    def __init__(self, cascade, scale=0.5, stride=1, motion_threshold=2.0, roi_margin=0.5,
+                 scale_factor=1.1, min_neighbors=5, min_size=(30, 30), clock=time.perf_counter):
+        """
+        Find faces in camera frames, skipping as much cascade work as it can.
+
+        Each frame goes through these stages, each of them timed:
+          gray    colour to grayscale
+          resize  shrink by scale before anything else looks at it
+          motion  compare a thumbnail with the one from the last cascade run; if the
+                  scene has barely changed, the last answer still stands
+          roi     after a hit, search only around it first
+          full    search the whole (shrunk) frame
+
+        FaceDetector(cascade, scale=1, motion_threshold=0, roi_margin=None) is the
+        plain full-resolution detectMultiScale call.
+
+        Args:
+            cascade (cv2.CascadeClassifier): The face cascade.
+            scale (float): Size to shrink frames to before detection (1 keeps them).
+                Faces smaller than 24 / scale pixels are not found.
+            stride (int): Look at every stride-th frame; the others get the last answer.
+            motion_threshold (float): Mean absolute thumbnail difference (0-255) below
+                which the last answer is reused. 0 turns the motion gate off.
+            roi_margin (float): How far to grow the last hit on each side, as a fraction
+                of its size, for the region searched first. None turns it off.
+            scale_factor (float): detectMultiScale scaleFactor.
+            min_neighbors (int): detectMultiScale minNeighbors.
+            min_size (tuple): Smallest face to find, in full-resolution pixels.
+            clock (callable): Time source for the stage timings.
+        """
+        if scale <= 0 or scale > 1:
+            raise ValueError('scale must be in (0, 1]')
+        if stride < 1:
+            raise ValueError('stride must be at least 1')
+        self.cascade = cascade
+        self.scale = scale
+        self.stride = stride
+        self.motion_threshold = motion_threshold
+        self.roi_margin = roi_margin
+        self.scale_factor = scale_factor
+        self.min_neighbors = min_neighbors
+        self.min_size = (max(1, int(round(min_size[0] * scale))), max(1, int(round(min_size[1] * scale))))
+        self.clock = clock
+        self.frames = 0
+        self.strided = 0  # frames skipped by the stride
+        self.gated = 0  # frames the motion gate answered
+        self.roi_hits = 0  # frames the region of interest answered
+        self.full_runs = 0  # frames that needed the whole-frame cascade
+        self.stage_s = dict.fromkeys(self.STAGES, 0.0)
+        self.reset()
+
+    def reset(self):
+        """Forget the last answer, e.g. when a new question starts."""
+        self.faces = []  # last answer, in full-resolution pixels
+        self._boxes = []  # the same in shrunk pixels
+        self._reference = None  # thumbnail at the last cascade run
+
+    def _timed(self, stage, start):
+        now = self.clock()
+        self.stage_s[stage] += now - start
+        return now
+
+    def _cascade(self, image):
+        boxes = self.cascade.detectMultiScale(image, scaleFactor=self.scale_factor,
+                                              minNeighbors=self.min_neighbors, minSize=self.min_size)
+        return [tuple(int(v) for v in box) for box in boxes]
+
+    def _region(self, shape):
+        """Bounding box of the last hits grown by roi_margin, clipped to the frame."""
+        x0 = min(x for x, _, _, _ in self._boxes)
+        y0 = min(y for _, y, _, _ in self._boxes)
+        x1 = max(x + w for x, _, w, _ in self._boxes)
+        y1 = max(y + h for _, y, _, h in self._boxes)
+        grow_x = int((x1 - x0) * self.roi_margin)
+        grow_y = int((y1 - y0) * self.roi_margin)
+        return max(0, x0 - grow_x), max(0, y0 - grow_y), min(shape[1], x1 + grow_x), min(shape[0], y1 + grow_y)
+
+    def detect(self, frame):
+        """
+        Args:
+            frame (numpy.ndarray): BGR camera frame.
+
+        Returns:
+            list: (x, y, w, h) face boxes in frame pixels; empty if none.
+        """
+        self.frames += 1
+        if (self.frames - 1) % self.stride:
+            self.strided += 1
+            return self.faces
+        t = self.clock()
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+        t = self._timed('gray', t)
+        if self.scale != 1:
+            gray = cv2.resize(gray, None, fx=self.scale, fy=self.scale, interpolation=cv2.INTER_AREA)
+        t = self._timed('resize', t)
+
+        thumb = None
+        if self.motion_threshold:
+            thumb = cv2.resize(gray, (64, 48), interpolation=cv2.INTER_AREA)
+            if self._reference is not None and cv2.absdiff(thumb, self._reference).mean() < self.motion_threshold:
+                self._timed('motion', t)
+                self.gated += 1
+                return self.faces
+        t = self._timed('motion', t)
+
+        boxes = []
+        if self._boxes and self.roi_margin is not None:
+            x0, y0, x1, y1 = self._region(gray.shape)
+            boxes = [(x + x0, y + y0, w, h) for x, y, w, h in self._cascade(gray[y0:y1, x0:x1])]
+            t = self._timed('roi', t)
+            if boxes:
+                self.roi_hits += 1
+        if not boxes:
+            boxes = self._cascade(gray)
+            self._timed('full', t)
+            self.full_runs += 1
+
+        self._reference = thumb
+        self._boxes = boxes
+        self.faces = [tuple(int(round(v / self.scale)) for v in box) for box in boxes]
+        return self.faces
+
+    def stage_ms(self):
+        """Average milliseconds per frame spent in each stage."""
+        return {stage: 1000 * s / max(1, self.frames) for stage, s in self.stage_s.items()}
+
+    def stats(self):
+        stages = self.stage_ms()
+        return 'faces: {} frames, {:.2f} ms/frame ({}); {} strided, {} motion-gated, {} ROI hits, {} full runs'.format(
+            self.frames, sum(stages.values()), ', '.join('{} {:.2f}'.format(s, ms) for s, ms in stages.items()),
+            self.strided, self.gated, self.roi_hits, self.full_runs)
@@ -0,0 +1,181 @@
+# Compares face detection settings for the HorrorGame camera questions on a
+# recorded video: per-stage cost, frames per second, which frames each setting
+# finds a face in compared with the original full-resolution check, and how long
+# after a face appears each setting reports it when it can only keep up with
+# part of a live camera's frames.
+#
+#   python horror_face_bench.py recording.mp4
+#   python horror_face_bench.py recording.mp4 --fps 30 --configs current half+motion+roi
+#
+# Record with the laptop camera the game runs on, walking in and out of view.
+import argparse
+
+import cv2
+
+from bench_util import percentile
+from horror_camera import FaceDetector
+
+BASELINE = 'current'
+CONFIGS = {
+    'current': dict(scale=1, motion_threshold=0, roi_margin=None),  # what _camera_check used to do
+    'half': dict(scale=0.5, motion_threshold=0, roi_margin=None),
+    'half+motion': dict(scale=0.5, motion_threshold=2.0, roi_margin=None),
+    'half+motion+roi': dict(scale=0.5, motion_threshold=2.0, roi_margin=0.5),
+    'half+motion+roi/2': dict(scale=0.5, motion_threshold=2.0, roi_margin=0.5, stride=2),
+    'quarter+motion+roi': dict(scale=0.25, motion_threshold=2.0, roi_margin=0.5),
+}
+
+
+def _open(path):
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        raise ValueError('Could not open ' + path)
+    return cap
+
+
+def video_info(path):
+    """Return (fps, width, height) of a video file; fps is 0 if the file doesn't say."""
+    cap = _open(path)
+    info = (cap.get(cv2.CAP_PROP_FPS) or 0, int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+            int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+    cap.release()
+    return info
+
+
+def video_frames(path, max_frames):
+    """
+    Yield the first max_frames frames of a video file one at a time. Each pass
+    decodes the file again rather than keeping the frames: a minute of 640x480
+    is over 1.5 GB of pixels.
+    """
+    cap = _open(path)
+    try:
+        for _ in range(max_frames):
+            ok, frame = cap.read()
+            if not ok:
+                break
+            yield frame
+    finally:
+        cap.release()
+
+
+def offline(frames, cascade, options):
+    """Run every frame through a detector. Returns (detector, [found a face per frame])."""
+    detector = FaceDetector(cascade, **options)
+    return detector, [bool(detector.detect(frame)) for frame in frames]
+
+
+def appearances(found):
+    """[(first, last)] frame index ranges in which a face is present."""
+    spans = []
+    start = None
+    for i, hit in enumerate(found + [False]):
+        if hit and start is None:
+            start = i
+        elif not hit and start is not None:
+            spans.append((start, i - 1))
+            start = None
+    return spans
+
+
+def live(frames, count, fps, cascade, options):
+    """
+    Play the video as a camera would, handing the detector the newest frame
+    whenever it is free; the clock advances by the time each detect() took.
+    frames is iterated once, skipping the frames the detector was too busy for;
+    count is how many it holds.
+
+    Returns:
+        tuple: (frames processed, [(seconds into the video the face was reported, frame index)])
+    """
+    detector = FaceDetector(cascade, **options)
+    t = 0.0
+    last = -1
+    processed = 0
+    hits = []
+    frames = iter(frames)
+    at = -1  # index of the last frame read
+    while True:
+        i = int(t * fps + 1e-6)
+        if i >= count:
+            break
+        if i == last:
+            t = (i + 1) / fps  # caught up: wait for the next frame
+            continue
+        while at < i:
+            frame = next(frames)
+            at += 1
+        start = cv2.getTickCount()
+        faces = detector.detect(frame)
+        t += (cv2.getTickCount() - start) / cv2.getTickFrequency()
+        last = i
+        processed += 1
+        if faces:
+            hits.append((t, i))
+    return processed, hits
+
+
+def latencies(spans, hits, fps):
+    """Seconds from each appearance to its first report, and how many were never reported."""
+    found = []
+    missed = 0
+    for first, last in spans:
+        onset = first / fps
+        reported = [t for t, i in hits if first <= i <= last]
+        if reported:
+            found.append(reported[0] - onset)
+        else:
+            missed += 1
+    return found, missed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare face detection settings on a recorded video.')
+    parser.add_argument('video')
+    parser.add_argument('--fps', type=float, default=0, help='camera frame rate (default: from the file, else 30)')
+    parser.add_argument('--max-frames', type=int, default=1800)
+    parser.add_argument('--configs', nargs='+', default=list(CONFIGS), choices=list(CONFIGS))
+    args = parser.parse_args()
+
+    file_fps, w, h = video_info(args.video)
+    fps = args.fps or file_fps or 30
+    cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
+
+    _, reference = offline(video_frames(args.video, args.max_frames), cascade, CONFIGS[BASELINE])
+    count = len(reference)
+    if not count:
+        raise ValueError('No frames in ' + args.video)
+    print('{}: {} frames of {}x{} at {:.0f} fps ({:.1f} s)'.format(args.video, count, w, h, fps, count / fps))
+    spans = appearances(reference)
+    print('{} finds a face in {} frames, {} appearances'.format(BASELINE, sum(reference), len(spans)))
+    print()
+    print('{:20s} {:>8s} {:>7s} {:>7s} {:>7s} {:>6s} {:>8s} {:>10s} {:>10s} {:>7s}'.format(
+        'config', 'ms/frame', 'max fps', 'recall', 'extra', 'full', 'live fps', 'lat p50 ms', 'lat max ms',
+        'missed'))
+    breakdown = []
+    for name in args.configs:
+        detector, found = offline(video_frames(args.video, count), cascade, CONFIGS[name])
+        stages = detector.stage_ms()
+        per_frame = sum(stages.values())
+        both = sum(1 for r, f in zip(reference, found) if r and f)
+        extra = sum(1 for r, f in zip(reference, found) if f and not r)
+        processed, hits = live(video_frames(args.video, count), count, fps, cascade, CONFIGS[name])
+        found_lat, missed = latencies(spans, hits, fps)
+        print('{:20s} {:8.2f} {:7.0f} {:6.0f}% {:7d} {:5.0f}% {:8.1f} {:>10s} {:>10s} {:7d}'.format(
+            name, per_frame, 1000 / per_frame if per_frame else 0, 100 * both / max(1, sum(reference)), extra,
+            100 * detector.full_runs / count, processed * fps / count,
+            '{:.0f}'.format(1000 * percentile(found_lat, 50)) if found_lat else '-',
+            '{:.0f}'.format(1000 * max(found_lat)) if found_lat else '-', missed))
+        breakdown.append('{:20s} '.format(name) + '  '.join('{} {:.2f}'.format(s, ms) for s, ms in stages.items()))
+    print()
+    print('ms per frame by stage:')
+    print('\n'.join(breakdown))
+    print()
+    print('recall: share of the frames {} finds a face in that this setting also does; extra: frames only this '
+          'setting does;'.format(BASELINE))
+    print('full: frames needing the whole-frame cascade; latency: from the first frame of an appearance to the '
+          'first report, keeping up with a live camera')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,273 @@
+# Microphone side of the HorrorGame.
+# One input stream is opened when the game starts and stays open; its callback
+# measures the level of the new audio in sliding windows, all windows of a
+# block at once. A sound counts only when it stays
+# well above the room's background level for a while, so a single click does
+# not set it off. Microphone questions subscribe to detections for as long as
+# they listen instead of opening the device themselves.
+#
+#   python horror_mic.py                 # print detections from the default microphone
+#   python horror_mic.py take.wav        # run a 16-bit mono WAV through the detector
+import threading
+import time
+
+import numpy as np
+
+FULL_SCALE = 32768.0
+
+
+class LevelDetector:
+    def __init__(self, rate=44100, window_ms=50, hop_ms=10, margin_db=15, min_db=-50, sustain_ms=150,
+                 baseline_s=3.0, warmup_s=0.5):
+        """
+        Find sustained loud sounds in a stream of 16-bit samples.
+
+        The RMS level is taken over window_ms windows every hop_ms. A window is loud
+        when it is margin_db above the background level and above min_db; a sound
+        that keeps windows loud for about sustain_ms makes one detection. The background level follows
+        the quiet windows with a time constant of baseline_s.
+
+        Args:
+            rate (int): Sample rate.
+            window_ms (float): RMS window length.
+            hop_ms (float): Step between windows.
+            margin_db (float): How far above the background a loud window is.
+            min_db (float): Quietest level that can count as loud, in dBFS.
+            sustain_ms (float): How long a sound must stay loud.
+            baseline_s (float): Background level time constant.
+            warmup_s (float): Audio to learn the background from before detecting.
+        """
+        if hop_ms <= 0 or window_ms < hop_ms:
+            raise ValueError('window_ms must be at least hop_ms, and hop_ms positive')
+        self.rate = rate
+        self.window = int(rate * window_ms / 1000)
+        self.hop = max(1, int(rate * hop_ms / 1000))
+        self.margin_db = margin_db
+        self.min_db = min_db
+        # A window is loud for part of its length after a sound starts, so allow half a window of that
+        self.need = max(1, int(np.ceil((sustain_ms + window_ms / 2) / hop_ms)))
+        self.alpha = self.hop / (baseline_s * rate)  # per quiet window
+        self.warmup = int(rate * warmup_s)
+        self.baseline_db = None
+        self.samples = 0
+        self.windows = 0
+        self.loud = 0
+        self.detections = 0
+        self.peak_db = -np.inf
+        self._tail = np.zeros(0)  # squared samples carried over for windows spanning blocks
+        self._run = 0  # loud windows in a row at the end of the last block
+
+    def threshold_db(self):
+        if self.baseline_db is None:
+            return None
+        return max(self.baseline_db + self.margin_db, self.min_db)
+
+    def process(self, samples, end_t=None):
+        """
+        Measure a block of samples.
+
+        Args:
+            samples (numpy.ndarray): int16 samples following the previous block.
+            end_t (float, optional): Time the last sample was captured.
+
+        Returns:
+            list: (t, level dBFS, baseline dBFS) for each detection in the block; t is
+            end_t adjusted back to the window that completed it, or None without end_t.
+        """
+        start = self.samples - len(self._tail)  # absolute index of the first squared sample held
+        x = samples.astype(np.float64)
+        sq = np.concatenate((self._tail, x * x))
+        self.samples += len(samples)
+        self._tail = sq[-(self.window - 1):] if self.window > 1 else sq[:0]
+
+        # Window ends on the hop grid that fit entirely in what is held
+        first = -(-(start + self.window) // self.hop) * self.hop
+        ends = np.arange(first, self.samples + 1, self.hop)
+        if not len(ends):
+            return []
+        csum = np.concatenate(([0.0], np.cumsum(sq)))
+        power = (csum[ends - start] - csum[ends - start - self.window]) / self.window
+        levels = 10 * np.log10(np.maximum(power, 1e-3) / FULL_SCALE ** 2)
+        self.windows += len(levels)
+        self.peak_db = max(self.peak_db, levels.max())
+
+        if self.baseline_db is None:
+            self.baseline_db = float(np.median(levels))
+        baseline = self.baseline_db
+        threshold = self.threshold_db()
+        loud = levels > threshold
+        loud &= ends > self.warmup
+        self.loud += int(loud.sum())
+
+        # Loud windows in a row ending at each window, carrying the run from the last block
+        index = np.arange(len(loud))
+        last_quiet = np.maximum.accumulate(np.where(loud, -1, index))
+        run = index - last_quiet
+        run[last_quiet < 0] += self._run
+        self._run = int(run[-1])
+        hits = np.flatnonzero(run == self.need)
+
+        quiet = levels[~loud]
+        if len(quiet):
+            # Same as stepping an exponential average once per quiet window, using their median
+            step = 1 - (1 - self.alpha) ** len(quiet) if ends[-1] > self.warmup else 0.5
+            self.baseline_db += step * (float(np.median(quiet)) - self.baseline_db)
+
+        detections = []
+        for i in hits:
+            t = None if end_t is None else end_t - (self.samples - ends[i]) / self.rate
+            detections.append((t, float(levels[i]), baseline))
+        self.detections += len(detections)
+        return detections
+
+
+class MicMonitor:
+    def __init__(self, audio=None, rate=44100, chunk=1024, device=None, clock=time.perf_counter,
+                 **detector_options):
+        """
+        Keep a microphone open and tell subscribers when it hears something.
+
+        Args:
+            audio (pyaudio.PyAudio, optional): PyAudio instance to open the stream on;
+                one is made (and terminated on stop()) if not given.
+            rate (int): Sample rate.
+            chunk (int): Samples per callback.
+            device (int, optional): Input device index.
+            clock (callable): Time source for detections.
+            **detector_options: Passed to LevelDetector.
+        """
+        self.audio = audio
+        self.rate = rate
+        self.chunk = chunk
+        self.device = device
+        self.clock = clock
+        self.detector = LevelDetector(rate, **detector_options)
+        self.error = None
+        self.open_s = None
+        self.overflows = 0
+        self.process_s = 0.0
+        self._subscribers = []
+        self._lock = threading.Lock()
+        self._own_audio = False
+        self._stream = None
+
+    def subscribe(self, callback):
+        """
+        Call callback((t, level_db, baseline_db)) on every detection until unsubscribed.
+
+        Callbacks run on the audio thread, so they must return at once (put the
+        event on a queue, set an Event, call_soon_threadsafe, ...).
+        """
+        with self._lock:
+            self._subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        with self._lock:
+            if callback in self._subscribers:
+                self._subscribers.remove(callback)
+
+    def start(self):
+        """Open the input stream. Returns self; sets error instead of raising if it can't."""
+        if self._stream is not None:
+            return self
+        import pyaudio
+        started = self.clock()
+        try:
+            if self.audio is None:
+                self.audio = pyaudio.PyAudio()
+                self._own_audio = True
+            self._stream = self.audio.open(format=pyaudio.paInt16, channels=1, rate=self.rate, input=True,
+                                           input_device_index=self.device, frames_per_buffer=self.chunk,
+                                           stream_callback=self._callback)
+        except Exception as e:
+            self.error = 'Could not open microphone: {}'.format(e)
+            return self
+        self.open_s = self.clock() - started
+        return self
+
+    def _callback(self, in_data, frame_count, time_info, status):
+        import pyaudio
+        if status & pyaudio.paInputOverflow:
+            self.overflows += 1
+        self.feed(np.frombuffer(in_data, dtype=np.int16), self.clock())
+        return None, pyaudio.paContinue
+
+    def feed(self, samples, end_t):
+        """Take a block of int16 samples captured up to end_t (the stream callback does this)."""
+        begin = time.perf_counter()
+        detections = self.detector.process(samples, end_t)
+        if detections:
+            with self._lock:
+                subscribers = self._subscribers[:]
+            for detection in detections:
+                for callback in subscribers:
+                    callback(detection)
+        self.process_s += time.perf_counter() - begin
+
+    def ms_per_audio_s(self):
+        """Milliseconds of processing per second of audio."""
+        audio_s = self.detector.samples / self.rate
+        return 1000 * self.process_s / audio_s if audio_s else 0.0
+
+    def stats(self):
+        if self.error:
+            return 'mic: ' + self.error
+        d = self.detector
+        return ('mic: open {}, {:.1f} s of audio, {:.3f} ms processing per s of audio, background {} dBFS, '
+                'peak {:.0f} dBFS, {} loud windows of {}, {} detections, {} overflows').format(
+            '-' if self.open_s is None else '{:.2f} s'.format(self.open_s), d.samples / self.rate,
+            self.ms_per_audio_s(), '-' if d.baseline_db is None else '{:.0f}'.format(d.baseline_db),
+            d.peak_db, d.loud, d.windows, d.detections, self.overflows)
+
+    def stop(self):
+        if self._stream is not None:
+            self._stream.stop_stream()
+            self._stream.close()
+            self._stream = None
+        if self._own_audio:
+            self.audio.terminate()
+            self.audio = None
+            self._own_audio = False
+
+
+def _show(started):
+    def show(detection):
+        t, level, baseline = detection
+        print('{:7.2f} s  {:.0f} dBFS (background {:.0f})'.format(t - started, level, baseline))
+    return show
+
+
+def main():
+    import sys
+    if len(sys.argv) > 1:
+        import wave
+        with wave.open(sys.argv[1], 'rb') as w:
+            if w.getsampwidth() != 2 or w.getnchannels() != 1:
+                raise ValueError('Expected 16-bit mono WAV: ' + sys.argv[1])
+            rate = w.getframerate()
+            samples = np.frombuffer(w.readframes(w.getnframes()), dtype=np.int16)
+        monitor = MicMonitor(rate=rate)
+        monitor.subscribe(_show(0))
+        for i in range(0, len(samples), monitor.chunk):
+            block = samples[i:i + monitor.chunk]
+            monitor.feed(block, (i + len(block)) / rate)
+        print(monitor.stats())
+        return
+    monitor = MicMonitor().start()
+    if monitor.error:
+        print(monitor.error)
+        return
+    monitor.subscribe(_show(monitor.clock()))
+    print('Listening... (Ctrl+C to stop)')
+    try:
+        while True:
+            time.sleep(5)
+            print(monitor.stats())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        monitor.stop()
+
+
+if __name__ == '__main__':
+    main()
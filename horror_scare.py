@@ -0,0 +1,219 @@
+# Jumpscare side of the HorrorGame.
+# The scream is decoded and the picture scaled to the screen once, at startup,
+# and one fullscreen window is made then and kept hidden. A scare just starts
+# the sound and shows the window, so it lands as soon as the detection does.
+# Tk has to be driven from the thread that made the window, by calling
+# ScareWindow.update() often (the game does it from its event loop); scares can
+# be asked for from any thread with ScareWindow.scare().
+# Without a display (over SSH, no $DISPLAY) no window can be made; scares are
+# then the sound and the message printed to the terminal.
+import os
+import queue
+import threading
+import time
+import tkinter as tk
+
+from PIL import Image, ImageTk
+
+
+class ScareAssets:
+    def __init__(self, image_path, sound_path):
+        """
+        The jumpscare picture and sound, loaded once.
+
+        Args:
+            image_path (str): Picture shown fullscreen; a text screen is used if it is missing.
+            sound_path (str): Sound played with it; pygame.mixer must be initialised first.
+        """
+        self.image_path = image_path
+        self.sound_path = sound_path
+        self.sound = None
+        self.load_s = {}  # what took how long to prepare
+        self._original = None
+        self._images = {}  # (width, height) -> PIL image scaled to it
+        started = time.perf_counter()
+        try:
+            import pygame
+            self.sound = pygame.mixer.Sound(sound_path)  # decoded now, not when it is needed
+        except Exception as e:
+            print(f"Error loading jumpscare sound: {e}")
+        self.load_s['sound'] = time.perf_counter() - started
+        if os.path.exists(image_path):
+            started = time.perf_counter()
+            self._original = Image.open(image_path)
+            self._original.load()
+            self.load_s['image'] = time.perf_counter() - started
+        else:
+            print(f"Jumpscare image not found: {image_path}")
+
+    def image(self, size):
+        """The picture scaled to size (width, height), rendered on first use; None if there is none."""
+        if self._original is None:
+            return None
+        if size not in self._images:
+            started = time.perf_counter()
+            self._images[size] = self._original.resize(size, Image.LANCZOS)
+            self.load_s['image {}x{}'.format(*size)] = time.perf_counter() - started
+        return self._images[size]
+
+
+class ScareWindow:
+    def __init__(self, assets, duration_ms=2000, clock=time.perf_counter, log=print):
+        """
+        Make the hidden fullscreen window. Call on the main thread. If Tk can't
+        open a display, scares are sound and printed text only.
+
+        Args:
+            assets (ScareAssets): What to show and play.
+            duration_ms (int): How long a scare stays on screen.
+            clock (callable): Time source; detection times passed to scare() must use it.
+            log (callable): Called with a line per scare, or None.
+        """
+        self.assets = assets
+        self.duration_ms = duration_ms
+        self.clock = clock
+        self.log = log
+        self.latencies = []  # (detection to audio s, detection to pixels s or None)
+        self.interrupted = False
+        self._requests = queue.Queue()
+        self._photos = {}  # (width, height) -> PhotoImage; these belong to this Tk instance
+        self._showing = None  # (detected, audio_t, done Event) of the scare on screen
+        self._hide_job = None
+        self._hide_at = None  # clock time the scare on screen ends, without a display
+
+        try:
+            self.root = tk.Tk()
+        except tk.TclError as e:
+            self.root = None
+            if log:
+                log(f"No display for the jumpscare window ({e}); scares will be sound and text only")
+            return
+        self.root.withdraw()
+        self.root.configure(bg='black')
+        self.root.overrideredirect(True)  # Remove window decorations
+        self.root.report_callback_exception = self._callback_exception
+        self.label = tk.Label(self.root, bg='black', fg='red', font=("Arial", 72))
+        self.label.place(x=0, y=0, relwidth=1, relheight=1)
+        self.label.bind('<Expose>', self._exposed)
+        self._photo(self._screen_size())  # render for this screen now
+
+    def _screen_size(self):
+        return self.root.winfo_screenwidth(), self.root.winfo_screenheight()
+
+    def _photo(self, size):
+        if size not in self._photos:
+            image = self.assets.image(size)
+            self._photos[size] = None if image is None else ImageTk.PhotoImage(image, master=self.root)
+        return self._photos[size]
+
+    def scare(self, message, detected=None):
+        """
+        Ask for a scare; safe to call from any thread.
+
+        Args:
+            message (str): Shown if there is no picture.
+            detected (float, optional): When the detection happened (clock time); now if not given.
+
+        Returns:
+            threading.Event: Set once the scare is off the screen again.
+        """
+        done = threading.Event()
+        self._requests.put((message, self.clock() if detected is None else detected, done))
+        return done
+
+    def update(self):
+        """
+        Put up any scares asked for and let Tk draw and run its timers. Call every
+        few milliseconds on the thread that made the window.
+
+        Raises:
+            KeyboardInterrupt: If Ctrl+C was pressed while Tk ran a callback.
+        """
+        try:
+            while True:
+                self._show(*self._requests.get_nowait())
+        except queue.Empty:
+            pass
+        if self.root is None:
+            if self._hide_at is not None and self.clock() >= self._hide_at:
+                self._hide()
+            return
+        self.root.update()
+        if self.interrupted:
+            self.interrupted = False
+            raise KeyboardInterrupt
+
+    def _show(self, message, detected, done):
+        if self._showing is not None:
+            done.set()  # Don't stack scares: one is already on screen
+            return
+        if self.assets.sound is not None:
+            self.assets.sound.play()
+        audio_t = self.clock()
+        if self.root is None:
+            print('\n' + '!' * 20 + ' ' + message + ' ' + '!' * 20 + '\n', flush=True)
+            self._showing = (detected, audio_t, done)
+            self._hide_at = audio_t + self.duration_ms / 1000
+            return
+        photo = self._photo(self._screen_size())
+        if photo is not None:
+            self.label.configure(image=photo, text='')
+        else:
+            self.label.configure(image='', text=message)
+        self._showing = (detected, audio_t, done)
+        self.root.deiconify()
+        self.root.attributes('-fullscreen', True)
+        self.root.attributes('-topmost', True)
+        self.root.lift()
+        self._hide_job = self.root.after(self.duration_ms, self._hide)
+
+    def _exposed(self, event):
+        # The first expose after showing is when the picture is being drawn
+        if self._showing is not None and len(self._showing) == 3:
+            detected, audio_t, done = self._showing
+            self.root.update_idletasks()
+            pixels_t = self.clock()
+            self._showing = (detected, audio_t, done, pixels_t)
+            self._record(detected, audio_t, pixels_t)
+
+    def _record(self, detected, audio_t, pixels_t):
+        audio = audio_t - detected
+        pixels = None if pixels_t is None else pixels_t - detected
+        self.latencies.append((audio, pixels))
+        if self.log:
+            self.log('jumpscare: detection to audio {:.1f} ms, to pixels {}'.format(
+                1000 * audio, 'not seen' if pixels is None else '{:.1f} ms'.format(1000 * pixels)))
+
+    def _hide(self):
+        self._hide_job = None
+        self._hide_at = None
+        if self.root is not None:
+            self.root.withdraw()
+        if self._showing is not None:
+            if len(self._showing) == 3:
+                self._record(self._showing[0], self._showing[1], None)  # never exposed
+            self._showing[2].set()
+            self._showing = None
+
+    def _callback_exception(self, exc, value, tb):
+        if issubclass(exc, KeyboardInterrupt):
+            self.interrupted = True
+        else:
+            tk.Tk.report_callback_exception(self.root, exc, value, tb)
+
+    def stats(self):
+        if not self.latencies:
+            return 'jumpscares: none'
+        audio = sorted(a for a, _ in self.latencies)
+        pixels = sorted(p for _, p in self.latencies if p is not None)
+        return 'jumpscares: {}, detection to audio median {:.1f} ms, to pixels median {}; prepared in {}'.format(
+            len(self.latencies), 1000 * audio[len(audio) // 2],
+            '{:.1f} ms'.format(1000 * pixels[len(pixels) // 2]) if pixels else '-',
+            ', '.join('{} {:.2f} s'.format(k, v) for k, v in self.assets.load_s.items()))
+
+    def destroy(self):
+        if self._showing is not None:
+            self._showing[2].set()
+            self._showing = None
+        if self.root is not None:
+            self.root.destroy()
@@ -0,0 +1,152 @@
+# Host simulation backend for the ESP32 scripts.
+# install() puts stand-in machine, neopixel and network modules (and a time
+# module on a virtual clock) into sys.modules, so the device scripts run
+# unchanged under normal Python. Sleeps return instantly, and every pin, PWM,
+# UART, SPI and NeoPixel change is recorded with its virtual timestamp.
+#
+#     import hostsim
+#     sim = hostsim.install()
+#     sim.uart_input(2, 1.0, b'JUMPSCARE\n')
+#     sim.run_script('ODTL_Scaffold 2_ESP32 code.py', seconds=30)
+#     sim.events('PWM(5)')
+#
+# Only the blocking, sleep-driven scripts run here. There is no uasyncio,
+# socket or usocket stand-in, so scripts built on an event loop and sockets
+# (the Scorpion controller, ODTL_Final Project_Scorpion_ESP32 controls.py)
+# stop with "No module named 'uasyncio'". Their parts are covered separately:
+# SRControl and ServoMotion on the virtual clock (sim_timelines.py,
+# servo_motion_sim.py), and the command handling against scorpion_server's
+# fake_router on real sockets (scorpion_loadgen.py, speech_replay.py).
+import contextlib
+import io
+import os
+import sys
+
+from .clock import SimulationEnd, VirtualClock
+from . import machine, neopixel, network, vtime
+
+__all__ = ['install', 'uninstall', 'Simulator', 'SimulationEnd']
+
+_MODULES = {'machine': machine, 'neopixel': neopixel, 'network': network, 'time': vtime}
+
+
+class Simulator:
+    def __init__(self, cost_us=5):
+        """
+        Args:
+            cost_us (int): Virtual time each hardware call takes, so loops without sleeps still advance.
+        """
+        self.clock = VirtualClock()
+        self.cost_us = cost_us
+        self.trace = []  # (t_us, source, attr, value)
+        self.pins = {}
+        self.uarts = {}
+        self._inputs = {}
+        self._touch = {}
+        self._adc = {}
+        self._uart_rx = []  # (t_us, uart_id, data), kept in time order
+        self.output = ''
+
+    # Recording
+
+    def record(self, source, attr, value):
+        self.trace.append((self.clock.now_us, source, attr, value))
+
+    def cost(self):
+        if self.cost_us:
+            self.clock.advance(self.cost_us)
+
+    def events(self, source=None, attr=None):
+        """Return recorded (t_ms, source, attr, value) events, optionally filtered."""
+        return [(t / 1000, s, a, v) for t, s, a, v in self.trace
+                if (source is None or s == source) and (attr is None or a == attr)]
+
+    # Inputs. Each value can be a constant or a function of the time in seconds.
+
+    def _value(self, table, key, default):
+        value = table.get(key, default)
+        return value(self.clock.now_us / 1000000) if callable(value) else value
+
+    def pin_input(self, pin_id, value):
+        self._inputs[pin_id] = value
+
+    def input_value(self, pin_id, level):
+        return self._value(self._inputs, pin_id, level)
+
+    def touch(self, pin_id, value):
+        self._touch[pin_id] = value
+
+    def touch_value(self, pin_id):
+        return self._value(self._touch, pin_id, 400)
+
+    def adc(self, pin_id, value):
+        self._adc[pin_id] = value
+
+    def adc_value(self, pin_id):
+        return self._value(self._adc, pin_id, 0)
+
+    def uart_input(self, uart_id, at_s, data):
+        """Make data arrive on a UART at at_s seconds."""
+        self._uart_rx.append((int(at_s * 1000000), uart_id, data))
+        self._uart_rx.sort(key=lambda entry: entry[0])
+
+    def feed_uart(self, uart):
+        while self._uart_rx and self._uart_rx[0][0] <= self.clock.now_us:
+            _, uart_id, data = self._uart_rx.pop(0)
+            target = self.uarts.get(uart_id)
+            if target is not None:
+                target.rx.extend(data)
+
+    # Running
+
+    def run_for(self, seconds):
+        """Advance the clock, firing timers, until seconds from now."""
+        try:
+            self.clock.advance(seconds * 1000000)
+        except SimulationEnd:
+            pass
+
+    def run_script(self, path, seconds, quiet=True):
+        """
+        Run a device script until the virtual clock reaches seconds (from now).
+
+        Returns:
+            dict: The script's globals when it stopped.
+        """
+        path = os.path.abspath(path)
+        folder = os.path.dirname(path)
+        if folder not in sys.path:
+            sys.path.insert(0, folder)  # so the script's own imports (srcontrol, servo, ...) resolve
+        with open(path) as f:
+            code = compile(f.read(), path, 'exec')
+        namespace = {'__name__': '__main__', '__file__': path}
+        out = io.StringIO()
+        self.clock.end_us = self.clock.now_us + int(seconds * 1000000)
+        try:
+            if quiet:
+                with contextlib.redirect_stdout(out):
+                    exec(code, namespace)
+            else:
+                exec(code, namespace)
+        except SimulationEnd:
+            pass
+        finally:
+            self.clock.end_us = None
+        self.output = out.getvalue()
+        return namespace
+
+
+def install(cost_us=5):
+    """Create a Simulator and install the stand-in modules. Returns the simulator."""
+    sim = Simulator(cost_us)
+    for name, module in _MODULES.items():
+        module._sim = sim
+        sys.modules[name] = module
+    return sim
+
+
+def uninstall():
+    """Put the real time module back and remove the stand-ins."""
+    for name in _MODULES:
+        sys.modules.pop(name, None)
+    sys.modules['time'] = vtime._time
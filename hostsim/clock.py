@@ -0,0 +1,45 @@
+# Virtual clock shared by every stand-in module.
+# Sleeping advances the clock instantly and fires any machine.Timer callbacks
+# that fall due on the way, in time order.
+
+
+class SimulationEnd(BaseException):
+    """Raised from a sleep once the clock passes the simulation's end time.
+
+    It derives from BaseException so scripts that catch Exception don't swallow it.
+    """
+
+
+class VirtualClock:
+    def __init__(self):
+        self.now_us = 0
+        self.end_us = None
+        self._timers = []  # [due_us, seq, timer]
+        self._seq = 0
+        self._firing = False
+
+    def schedule(self, timer, due_us):
+        self._seq += 1
+        self._timers.append([due_us, self._seq, timer])
+
+    def cancel(self, timer):
+        self._timers = [entry for entry in self._timers if entry[2] is not timer]
+
+    def advance(self, us):
+        """Move time forward by us, running timer callbacks that fall due on the way."""
+        target = self.now_us + max(0, int(us))
+        while not self._firing and self._timers:
+            self._timers.sort()
+            due, _, timer = self._timers[0]
+            if due > target:
+                break
+            self._timers.pop(0)
+            self.now_us = max(self.now_us, due)
+            self._firing = True
+            try:
+                timer._fire()
+            finally:
+                self._firing = False
+        self.now_us = max(self.now_us, target)
+        if self.end_us is not None and self.now_us >= self.end_us:
+            raise SimulationEnd()
@@ -0,0 +1,249 @@
+# Stand-in for MicroPython's machine module.
+# Every output change is recorded on the simulator trace with a timestamp,
+# and every hardware call costs a few virtual microseconds so busy loops
+# still move time forward.
+_sim = None
+
+
+def _record(source, attr, value):
+    _sim.record(source, attr, value)
+
+
+def freq(hz=None):
+    return 240000000
+
+
+def reset():
+    from .clock import SimulationEnd
+    raise SimulationEnd()
+
+
+class Pin:
+    IN = 1
+    OUT = 3
+    OPEN_DRAIN = 7
+    PULL_UP = 2
+    PULL_DOWN = 1
+    IRQ_RISING = 1
+    IRQ_FALLING = 2
+
+    def __init__(self, pin_id, mode=-1, pull=-1, value=None):
+        self.id = pin_id
+        self.mode = mode
+        self.level = 0
+        self.toggles = 0
+        _sim.pins[pin_id] = self
+        if value is not None:
+            self.value(value)
+
+    def __repr__(self):
+        return 'Pin({})'.format(self.id)
+
+    def init(self, mode=-1, pull=-1, value=None):
+        self.mode = mode
+        if value is not None:
+            self.value(value)
+
+    def value(self, v=None):
+        _sim.cost()
+        if v is None:
+            if self.mode == Pin.IN:
+                return _sim.input_value(self.id, self.level)
+            return self.level
+        v = 1 if v else 0
+        if v != self.level:
+            self.level = v
+            self.toggles += 1
+            _record(repr(self), 'value', v)
+
+    def __call__(self, v=None):
+        return self.value(v)
+
+    def on(self):
+        self.value(1)
+
+    def off(self):
+        self.value(0)
+
+    def irq(self, handler=None, trigger=3):
+        return None
+
+
+class PWM:
+    def __init__(self, pin, freq=None, duty=None, duty_u16=None, duty_ns=None):
+        self.pin = pin
+        self.name = 'PWM({})'.format(pin.id)
+        self._freq = 5000
+        self._duty_u16 = 0
+        if freq is not None:
+            self.freq(freq)
+        if duty is not None:
+            self.duty(duty)
+        if duty_u16 is not None:
+            self.duty_u16(duty_u16)
+        if duty_ns is not None:
+            self.duty_ns(duty_ns)
+
+    def freq(self, f=None):
+        if f is None:
+            return self._freq
+        _sim.cost()
+        if f != self._freq:
+            self._freq = f
+            _record(self.name, 'freq', f)
+
+    def _set(self, u16):
+        _sim.cost()
+        if u16 != self._duty_u16:
+            self._duty_u16 = u16
+            _record(self.name, 'duty_u16', u16)
+
+    def duty(self, d=None):
+        if d is None:
+            return self._duty_u16 >> 6
+        self._set(min(1023, d) << 6)
+
+    def duty_u16(self, d=None):
+        if d is None:
+            return self._duty_u16
+        self._set(d)
+
+    def duty_ns(self, ns=None):
+        period_ns = 1000000000 // self._freq
+        if ns is None:
+            return self._duty_u16 * period_ns // 65535
+        self._set(min(65535, ns * 65535 // period_ns))
+
+    def deinit(self):
+        self._set(0)
+
+
+class TouchPad:
+    def __init__(self, pin):
+        self.pin = pin
+
+    def config(self, value):
+        pass
+
+    def read(self):
+        # A touch measurement counts charge cycles for about half a millisecond
+        _sim.clock.advance(500)
+        return _sim.touch_value(self.pin.id)
+
+
+class ADC:
+    ATTN_0DB = 0
+    ATTN_2_5DB = 1
+    ATTN_6DB = 2
+    ATTN_11DB = 3
+    WIDTH_9BIT = 0
+    WIDTH_10BIT = 1
+    WIDTH_11BIT = 2
+    WIDTH_12BIT = 3
+
+    def __init__(self, pin, atten=None):
+        self.pin = pin
+
+    def atten(self, value):
+        pass
+
+    def width(self, value):
+        pass
+
+    def read(self):
+        _sim.cost()
+        return _sim.adc_value(self.pin.id)
+
+    def read_u16(self):
+        return self.read() << 4
+
+
+class UART:
+    def __init__(self, uart_id, baudrate=115200, **kwargs):
+        self.id = uart_id
+        self.name = 'UART({})'.format(uart_id)
+        self.rx = bytearray()
+        _sim.uarts[uart_id] = self
+
+    def init(self, baudrate=115200, **kwargs):
+        pass
+
+    def any(self):
+        _sim.cost()
+        _sim.feed_uart(self)
+        return len(self.rx)
+
+    def read(self, n=None):
+        _sim.feed_uart(self)
+        if not self.rx:
+            return None
+        n = len(self.rx) if n is None else n
+        data = bytes(self.rx[:n])
+        del self.rx[:n]
+        return data
+
+    def readline(self):
+        _sim.feed_uart(self)
+        if not self.rx:
+            return None
+        end = self.rx.find(b'\n')
+        end = len(self.rx) if end < 0 else end + 1
+        data = bytes(self.rx[:end])
+        del self.rx[:end]
+        return data
+
+    def write(self, data):
+        if isinstance(data, str):
+            data = data.encode()
+        _record(self.name, 'write', bytes(data))
+        return len(data)
+
+
+class Timer:
+    ONE_SHOT = 0
+    PERIODIC = 1
+
+    def __init__(self, timer_id=-1, **kwargs):
+        self.id = timer_id
+        self.period_us = 0
+        self.mode = Timer.PERIODIC
+        self.callback = None
+        if kwargs:
+            self.init(**kwargs)
+
+    def init(self, mode=PERIODIC, period=-1, freq=-1, callback=None):
+        _sim.clock.cancel(self)
+        self.mode = mode
+        self.period_us = int(1000000 / freq) if freq > 0 else period * 1000
+        self.callback = callback
+        _sim.clock.schedule(self, _sim.clock.now_us + self.period_us)
+
+    def deinit(self):
+        _sim.clock.cancel(self)
+
+    def _fire(self):
+        if self.mode == Timer.PERIODIC:
+            _sim.clock.schedule(self, _sim.clock.now_us + self.period_us)
+        if self.callback is not None:
+            self.callback(self)
+
+
+class SPI:
+    MSB = 0
+    LSB = 1
+
+    def __init__(self, spi_id, baudrate=1000000, **kwargs):
+        self.id = spi_id
+        self.name = 'SPI({})'.format(spi_id)
+        self.baudrate = baudrate
+
+    def init(self, baudrate=1000000, **kwargs):
+        self.baudrate = baudrate
+
+    def write(self, buf):
+        # Time on the wire at the configured clock rate
+        _sim.clock.advance(len(buf) * 8 * 1000000 // self.baudrate)
+        _record(self.name, 'write', bytes(buf))
+
+
+SoftSPI = SPI
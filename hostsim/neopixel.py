@@ -0,0 +1,34 @@
+# Stand-in for MicroPython's neopixel module, with the same GRB buffer layout.
+# write() records the whole frame and costs the WS2812 wire time.
+_sim = None
+
+
+class NeoPixel:
+    ORDER = (1, 0, 2, 3)
+
+    def __init__(self, pin, n, bpp=3, timing=1):
+        self.pin = pin
+        self.n = n
+        self.bpp = bpp
+        self.buf = bytearray(n * bpp)
+        self.name = 'NeoPixel({})'.format(pin.id)
+
+    def __len__(self):
+        return self.n
+
+    def __setitem__(self, i, v):
+        offset = i * self.bpp
+        for k in range(self.bpp):
+            self.buf[offset + self.ORDER[k]] = v[k]
+
+    def __getitem__(self, i):
+        offset = i * self.bpp
+        return tuple(self.buf[offset + self.ORDER[k]] for k in range(self.bpp))
+
+    def fill(self, v):
+        for i in range(self.n):
+            self[i] = v
+
+    def write(self):
+        _sim.clock.advance(30 * self.n + 50)
+        _sim.record(self.name, 'write', bytes(self.buf))
@@ -0,0 +1,31 @@
+# Stand-in for MicroPython's network module: a WLAN that is always up.
+STA_IF = 0
+AP_IF = 1
+
+
+class WLAN:
+    def __init__(self, interface=STA_IF):
+        self.interface = interface
+        self._active = False
+        self._config = {}
+
+    def active(self, state=None):
+        if state is None:
+            return self._active
+        self._active = bool(state)
+
+    def config(self, *args, **kwargs):
+        if args:
+            return self._config.get(args[0])
+        self._config.update(kwargs)
+
+    def connect(self, ssid=None, key=None):
+        self._config['ssid'] = ssid
+
+    def isconnected(self):
+        return self._active
+
+    def ifconfig(self, config=None):
+        if self.interface == AP_IF:
+            return ('192.168.4.1', '255.255.255.0', '192.168.4.1', '8.8.8.8')
+        return ('127.0.0.1', '255.255.255.0', '127.0.0.1', '8.8.8.8')
@@ -0,0 +1,53 @@
+# Stand-in for the time module: MicroPython's sleep/ticks functions on the
+# virtual clock. Anything else (strftime, perf_counter, ...) is the real one.
+import time as _time
+
+_sim = None
+
+
+def _clock():
+    return _sim.clock
+
+
+def sleep(seconds):
+    _clock().advance(seconds * 1000000)
+
+
+def sleep_ms(ms):
+    _clock().advance(ms * 1000)
+
+
+def sleep_us(us):
+    _clock().advance(us)
+
+
+def ticks_ms():
+    return _clock().now_us // 1000
+
+
+def ticks_us():
+    return _clock().now_us
+
+
+def ticks_cpu():
+    return _clock().now_us
+
+
+def ticks_add(ticks, delta):
+    return ticks + delta
+
+
+def ticks_diff(ticks1, ticks2):
+    return ticks1 - ticks2
+
+
+def time():
+    return _clock().now_us / 1000000
+
+
+def monotonic():
+    return _clock().now_us / 1000000
+
+
+def __getattr__(name):
+    return getattr(_time, name)
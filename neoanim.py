@@ -0,0 +1,255 @@
+# Frame-based NeoPixel animation engine.
+# An effect renders a whole frame into the NeoPixel buffer and the animator
+# writes it out once per frame. Frames are advanced by tick(), which is called
+# from a main loop or a uasyncio task (run), so animations never block the
+# caller. Not from a machine.Timer: its callback can run in the middle of the
+# caller's own play() or pixel writes and put out a half-drawn frame. play()
+# replaces whatever is running, so a new command cancels the old animation mid-way.
+import time
+
+try:
+    import uasyncio as asyncio
+except ImportError:
+    import asyncio
+
+try:
+    from time import ticks_ms, ticks_us, ticks_add, ticks_diff
+except ImportError:
+    # Plain Python on the laptop (benchmarks and simulations)
+    def ticks_ms():
+        return int(time.monotonic() * 1000)
+
+    def ticks_us():
+        return time.perf_counter_ns() // 1000
+
+    def ticks_add(ticks, delta):
+        return ticks + delta
+
+    def ticks_diff(ticks1, ticks2):
+        return ticks1 - ticks2
+
+
+# Rainbow color function
+def wheel(pos):
+    """Generate rainbow colors across 0-255 positions."""
+    if pos < 85:
+        return (pos * 3, 255 - pos * 3, 0)
+    elif pos < 170:
+        pos -= 85
+        return (255 - pos * 3, 0, pos * 3)
+    else:
+        pos -= 170
+        return (0, pos * 3, 255 - pos * 3)
+
+
+class Fill:
+    def __init__(self, color):
+        """Set every pixel to color in a single frame."""
+        self.color = color
+        self.interval_ms = 0
+
+    def start(self, num_leds):
+        pass
+
+    def render(self, neo):
+        neo.fill(self.color)
+        return False
+
+
+class Wipe:
+    def __init__(self, color, interval_ms=10, step=1):
+        """
+        Light the strip up in order, step pixels per frame.
+
+        Args:
+            color (tuple): (r, g, b) colour to wipe in.
+            interval_ms (int): Time between frames.
+            step (int): Pixels added per frame.
+        """
+        self.color = color
+        self.interval_ms = interval_ms
+        self.step = step
+        self.num_leds = 0
+        self.i = 0
+
+    def start(self, num_leds):
+        self.num_leds = num_leds
+        self.i = 0
+
+    def render(self, neo):
+        color = self.color
+        stop = min(self.i + self.step, self.num_leds)
+        for i in range(self.i, stop):
+            neo[i] = color
+        self.i = stop
+        return stop < self.num_leds
+
+
+# NeoPixel byte order: colour component k goes to byte ORDER[k] of the pixel (GRB)
+GRB = (1, 0, 2, 3)
+
+
+def palette(order=GRB):
+    """Return the 256 wheel() colours as a 768-byte buffer in the strip's byte order."""
+    pal = bytearray(256 * 3)
+    for pos in range(256):
+        color = wheel(pos)
+        for k in range(3):
+            pal[pos * 3 + order[k]] = color[k]
+    return pal
+
+
+class Rainbow:
+    def __init__(self, interval_ms=50, cycles=None, lut=True):
+        """
+        Rotate the colour wheel around the strip, one step per frame.
+
+        Args:
+            interval_ms (int): Time between frames.
+            cycles (int, optional): Number of full 256-step cycles to run. None runs forever.
+            lut (bool): Copy precomputed frames straight into the NeoPixel buffer instead of
+                calling wheel() for every pixel. Needs an RGB strip with a .buf attribute.
+                Only exact when the strip length divides 256; otherwise some pixels are one
+                wheel step ahead (up to 3 per colour byte) of what wheel() would give.
+        """
+        self.interval_ms = interval_ms
+        self.cycles = cycles
+        self.lut = lut
+        self.num_leds = 0
+        self.j = 0
+        self._rings = None
+
+    def start(self, num_leds):
+        self.num_leds = num_leds
+        self.j = 0
+        self._rings = None
+
+    def _build_rings(self, neo):
+        """
+        Precompute the strip for every sub-pixel phase of the rotation.
+
+        Frame j is ring p rotated by m whole pixels, where m pixels cover
+        m * 256 // n wheel steps and p is the remainder. Each ring holds the
+        strip twice over so a rotation is one contiguous slice.
+
+        This is an approximation unless n divides 256: pixel i of the rotated
+        ring is at (i + m) * 256 // n, which rounds down once instead of twice
+        and so can be one step past i * 256 // n + m * 256 // n. An exact table
+        would need all 256 frames (256 * n * 3 bytes), too much for long strips.
+        """
+        n = self.num_leds
+        pal = palette(getattr(neo, 'ORDER', GRB))
+        phases = 256 // n + 2  # enough for the largest remainder, including rounding
+        rings = []
+        for p in range(phases):
+            ring = bytearray(2 * n * 3)
+            for i in range(2 * n):
+                pos = ((i * 256 // n + p) & 255) * 3
+                ring[i * 3:i * 3 + 3] = pal[pos:pos + 3]
+            rings.append(memoryview(ring))
+        self._rings = rings
+
+    def render(self, neo):
+        n = self.num_leds
+        j = self.j
+        buf = getattr(neo, 'buf', None)
+        if self.lut and buf is not None and len(buf) == n * 3:
+            if self._rings is None:
+                self._build_rings(neo)
+            step = j & 255
+            m = step * n // 256  # whole pixels rotated
+            p = step - m * 256 // n  # remaining wheel steps
+            buf[0:n * 3] = self._rings[p][m * 3:(m + n) * 3]
+        else:
+            for i in range(n):
+                neo[i] = wheel(((i * 256 // n) + j) & 255)
+        self.j = j + 1
+        return self.cycles is None or self.j < 256 * self.cycles
+
+
+def bench_rainbow(neo, frames=256, lut=True, write=True):
+    """
+    Render frames of Rainbow as fast as possible and return (frames per second, ms per frame).
+
+    With write=False only the rendering is timed, which shows the CPU cost on its own.
+    """
+    effect = Rainbow(interval_ms=0, lut=lut)
+    effect.start(len(neo))
+    effect.render(neo)  # Build the lookup tables outside the timed loop
+    start = ticks_us()
+    for _ in range(frames):
+        effect.render(neo)
+        if write:
+            neo.write()
+    elapsed = max(1, ticks_diff(ticks_us(), start))
+    return frames * 1000000 / elapsed, elapsed / frames / 1000
+
+
+class Animator:
+    def __init__(self, neo, num_leds=None, clock=ticks_ms):
+        """
+        Drive one NeoPixel strip with a single running effect.
+
+        Args:
+            neo (NeoPixel): The strip to draw on.
+            num_leds (int, optional): Number of pixels. Defaults to len(neo).
+            clock (callable): Millisecond tick source.
+        """
+        self.neo = neo
+        self.num_leds = len(neo) if num_leds is None else num_leds
+        self._clock = clock
+        self.effect = None
+        self._due = 0
+        self.frames = 0  # strip writes so far
+
+    @property
+    def busy(self):
+        return self.effect is not None
+
+    def play(self, effect):
+        """
+        Start effect straight away, cancelling whatever was running.
+        The first frame is written before this returns.
+        """
+        effect.start(self.num_leds)
+        self.effect = effect
+        self._due = self._clock()
+        self.tick(self._due)
+
+    def cancel(self):
+        """Stop the running effect, leaving the strip as it is."""
+        self.effect = None
+
+    def tick(self, now=None):
+        """
+        Render and write the next frame if it is due.
+
+        Returns:
+            bool: True while an effect is still running.
+        """
+        effect = self.effect
+        if effect is None:
+            return False
+        if now is None:
+            now = self._clock()
+        if ticks_diff(now, self._due) < 0:
+            return True
+        more = effect.render(self.neo)
+        self.neo.write()  # One write per frame
+        self.frames += 1
+        if more and self.effect is effect:
+            self._due = ticks_add(self._due, effect.interval_ms)
+            if ticks_diff(now, self._due) > effect.interval_ms:
+                self._due = now  # Fell behind; don't try to catch up with a burst of frames
+        elif self.effect is effect:
+            self.effect = None
+        return self.effect is not None
+
+    async def run(self, idle_ms=20):
+        """Tick forever as a uasyncio task, sleeping until the next frame is due."""
+        while True:
+            self.tick()
+            wait = idle_ms
+            if self.effect is not None:
+                wait = max(0, min(idle_ms, ticks_diff(self._due, self._clock())))
+            await asyncio.sleep(wait / 1000)
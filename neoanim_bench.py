@@ -0,0 +1,67 @@
+# Host-side frames-per-second benchmark for the rainbow effect.
+# Compares the per-pixel wheel() path with the palette lookup path for 16, 60
+# and 300 LEDs. The fake strip stores pixels exactly like MicroPython's
+# NeoPixel (a GRB bytearray) and its write() does nothing, so the numbers are
+# the rendering cost alone; the WS2812 wire time (30 us per LED + 50 us reset)
+# is shown separately as the ceiling any strip of that length can reach.
+# Before timing, every frame of both paths is compared: the palette path must
+# match wheel() exactly when the length divides 256, and be within one wheel
+# step (3 per colour byte) otherwise.
+from neoanim import GRB, Rainbow, bench_rainbow
+
+
+class FakeNeoPixel:
+    ORDER = GRB
+
+    def __init__(self, n):
+        self.n = n
+        self.bpp = 3
+        self.buf = bytearray(n * 3)
+
+    def __len__(self):
+        return self.n
+
+    def __setitem__(self, i, v):
+        offset = i * self.bpp
+        for k in range(self.bpp):
+            self.buf[offset + self.ORDER[k]] = v[k]
+
+    def fill(self, v):
+        for i in range(self.n):
+            self[i] = v
+
+    def write(self):
+        pass
+
+
+def compare(n):
+    """Render all 256 frames both ways. Returns (frames that differ, largest byte difference)."""
+    fast, slow = FakeNeoPixel(n), FakeNeoPixel(n)
+    lut, plain = Rainbow(lut=True), Rainbow(lut=False)
+    lut.start(n)
+    plain.start(n)
+    differ = worst = 0
+    for _ in range(256):
+        lut.render(fast)
+        plain.render(slow)
+        d = max(abs(a - b) for a, b in zip(fast.buf, slow.buf))
+        differ += d > 0
+        worst = max(worst, d)
+    return differ, worst
+
+
+def main(frames=1024):
+    for n in (9, 16, 60, 300):
+        differ, worst = compare(n)
+        assert worst <= (0 if 256 % n == 0 else 3), (n, differ, worst)
+        print('{:4d} LEDs: palette frames differing from wheel() {:3d}/256, by at most {}'.format(n, differ, worst))
+    print('LEDs  wheel fps  palette fps  speed-up  wire limit fps')
+    for n in (16, 60, 300):
+        slow, _ = bench_rainbow(FakeNeoPixel(n), frames=frames, lut=False)
+        fast, _ = bench_rainbow(FakeNeoPixel(n), frames=frames, lut=True)
+        wire = 1e6 / (30 * n + 50)
+        print('{:4d}  {:9.0f}  {:11.0f}  {:7.1f}x  {:14.0f}'.format(n, slow, fast, fast / slow, wire))
+
+
+if __name__ == '__main__':
+    main()
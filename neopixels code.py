@@ -1,34 +1,29 @@
 import time
 import neopixel
 from machine import Pin
+from neoanim import Animator, Rainbow, bench_rainbow
 
 NUM_LEDS = 16  # Number of LEDs
 PIN = 4  # GPIO pin
 
-np = neopixel.NeoPixel(Pin(PIN), NUM_LEDS)
+BENCHMARK = False  # Set to True to print achievable frame rates before the rainbow starts
 
-# Rainbow color function
-def wheel(pos):
-    """Generate rainbow colors across 0-255 positions."""
-    if pos < 85:
-        return (pos * 3, 255 - pos * 3, 0)
-    elif pos < 170:
-        pos -= 85
-        return (255 - pos * 3, 0, pos * 3)
-    else:
-        pos -= 170
-        return (0, pos * 3, 255 - pos * 3)
+np = neopixel.NeoPixel(Pin(PIN), NUM_LEDS)
+anim = Animator(np)
 
-# Rainbow cycle function
-def rainbow_cycle(wait):
-    for j in range(256):
-        for i in range(NUM_LEDS):
-            pixel_index = (i * 256 // NUM_LEDS) + j
-            np[i] = wheel(pixel_index & 255)
-        np.write()
-        time.sleep(wait)
+if BENCHMARK:
+    # Longer strips just shift the extra data out past the last LED
+    print("LEDs  wheel fps  palette fps")
+    for n in (16, 60, 300):
+        strip = neopixel.NeoPixel(Pin(PIN), n)
+        slow, _ = bench_rainbow(strip, frames=64, lut=False)
+        fast, _ = bench_rainbow(strip, frames=64, lut=True)
+        print("{:4d}  {:9.1f}  {:11.1f}".format(n, slow, fast))
+    np.fill((0, 0, 0))
+    np.write()
 
-# Run rainbow effect
+# Run rainbow effect, one strip write every 50 ms
+anim.play(Rainbow(interval_ms=50))
 while True:
-    rainbow_cycle(0.05)
-# Write your code here :-)
+    anim.tick()
+    time.sleep_ms(1)
@@ -0,0 +1,469 @@
+# Load generator for the Scorpion /control endpoint.
+# Replays a weighted command mix at a target rate from several controllers and
+# reports latency percentiles, errors, timeouts and how full the server's
+# accept queue got. By default it starts each server mode on localhost in turn
+# (in its own process) so the two can be compared:
+#
+#   legacy  a CPython copy of the original ESP32 loop: s.listen(1), one blocking
+#           client at a time, relays and LED wipe run before the reply is sent
+#   async   ControlServer from scorpion_server.py with the stand-in router
+#
+#   python scorpion_loadgen.py
+#   python scorpion_loadgen.py --server legacy --rate 20 --controllers 3 --burst 4
+#   python scorpion_loadgen.py --target 192.168.4.1:80 --rate 10
+#
+# The load is open-loop: every command starts at its scheduled time whether or
+# not earlier ones have finished, and latency is measured from that scheduled
+# time, so a slow server cannot hide its queueing by slowing the generator down.
+import argparse
+import asyncio
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+from bench_util import free_port, percentile
+from scorpion_server import ControlServer, fake_router
+
+# What the speech client sends, weighted roughly by how often it is said
+DEFAULT_MIX = 'LIGHT_ON=2,LIGHT_OFF=2,LIGHT_HOLD=1,MOVE_LEFT=2,MOVE_RIGHT=2,MOVE_MID=1'
+
+# Work the original loop did before replying: SRControl.update() pulsed 8 clock
+# edges and the latch with 1 ms sleeps either side (18 ms), then a 9 LED wipe
+# at 10 ms per LED. MOVE_MID only moved the servo.
+LEGACY_COMMANDS = (
+    ('LIGHT_ON', 108, 'Scorpion arm engaged'),
+    ('LIGHT_OFF', 108, 'Scorpion arm disengaged'),
+    ('LIGHT_HOLD', 108, 'Holding'),
+    ('MOVE_LEFT', 90, 'Moved left'),
+    ('MOVE_RIGHT', 90, 'Moved right'),
+    ('MOVE_MID', 0, 'Moved to the middle'),
+)
+
+SLOW_CONNECT_MS = 900  # a dropped SYN is retried after 1 s
+
+
+#server modes, each run in its own process by --serve
+def legacy_server(host, port):
+    """The original accept loop from the ESP32 script, with sleeps in place of the hardware."""
+    s = socket.socket()
+    s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    s.bind((host, port))
+    s.listen(1)
+    while True:
+        try:
+            cl, addr = s.accept()
+            request = cl.recv(1024).decode()
+            response = 'Unknown command'
+            for command, work_ms, reply in LEGACY_COMMANDS:
+                if 'GET /control?command=' + command in request:
+                    time.sleep(work_ms / 1000)
+                    response = reply
+                    break
+            cl.send(b'HTTP/1.1 200 OK\r\nContent-Type: text/plain\r\n\r\n')
+            cl.send(response.encode())
+            cl.close()
+        except Exception:
+            try:
+                cl.close()
+            except Exception:
+                pass
+
+
+def async_server(host, port, backlog):
+    async def run():
+        server = ControlServer(fake_router(), host=host, port=port, backlog=backlog)
+        await server.start()
+        while True:
+            await asyncio.sleep(3600)
+
+    asyncio.run(run())
+
+
+def spawn_server(mode, port, backlog):
+    """Start a server mode in a child process and wait until it accepts connections."""
+    proc = subprocess.Popen([sys.executable, __file__, '--serve', mode, '--port', str(port),
+                             '--backlog', str(backlog)])
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=0.5).close()
+            return proc
+        except OSError:
+            if proc.poll() is not None:
+                break
+            time.sleep(0.05)
+    proc.kill()
+    raise RuntimeError('{} server did not start'.format(mode))
+
+
+#accept queue, read from the kernel (Linux only)
+def _listen_queue(port):
+    """Return the number of connections waiting in accept() on the socket listening on port, or None."""
+    with open('/proc/net/tcp') as f:
+        next(f)
+        for line in f:
+            fields = line.split()
+            if fields[3] == '0A' and int(fields[1].rsplit(':', 1)[1], 16) == port:
+                return int(fields[4].split(':')[1], 16)  # rx_queue is the accept queue for a listener
+    return None
+
+
+def _listen_overflows():
+    """System-wide count of connections dropped because an accept queue was full."""
+    with open('/proc/net/netstat') as f:
+        lines = f.readlines()
+    for names, values in zip(lines[::2], lines[1::2]):
+        if names.startswith('TcpExt:'):
+            return int(dict(zip(names.split(), values.split())).get('ListenOverflows', 0))
+    return 0
+
+
+class AcceptQueueMonitor:
+    def __init__(self, port, backlog, interval=0.002):
+        """
+        Sample a listening socket's accept queue from a background thread.
+
+        Args:
+            port (int): Local port of the listening socket.
+            backlog (int): The backlog the server passed to listen().
+            interval (float): Seconds between samples.
+        """
+        self.port = port
+        self.limit = backlog
+        self.interval = interval
+        self.samples = 0
+        self.full = 0  # samples where the kernel would refuse another connection
+        self.max_queued = 0
+        self.overflows = None
+        self._stop = threading.Event()
+        self._thread = None
+        self._overflows_before = 0
+
+    def start(self):
+        try:
+            if _listen_queue(self.port) is None:
+                return self
+            self._overflows_before = _listen_overflows()
+        except OSError:
+            return self
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            queued = _listen_queue(self.port)
+            if queued is None:
+                continue
+            self.samples += 1
+            if queued > self.max_queued:
+                self.max_queued = queued
+            if queued > self.limit:  # Linux lets the queue reach limit + 1 before dropping SYNs
+                self.full += 1
+
+    def stop(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self.overflows = _listen_overflows() - self._overflows_before
+        return self
+
+
+#load generation
+def parse_mix(text):
+    """
+    Parse a command mix such as 'LIGHT_ON=2,MOVE?deg=37=1' into targets and weights.
+
+    Returns:
+        tuple: (list of request targets, list of weights)
+    """
+    targets, weights = [], []
+    for item in text.split(','):
+        command, sep, weight = item.strip().rpartition('=')
+        if not sep or not command:
+            raise ValueError('Mix entries look like COMMAND=weight, got ' + repr(item))
+        targets.append('/control?command=' + command)
+        weights.append(float(weight))
+    return targets, weights
+
+
+async def _read_response(reader):
+    """Read one response. Returns (status, body, server closes the connection)."""
+    line = await reader.readline()
+    if not line:
+        raise ConnectionError('Connection closed before the response')
+    status = int(line.split()[1])
+    length = None
+    close = False
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.partition(b':')
+        name = name.strip().lower()
+        if name == b'content-length':
+            length = int(value)
+        elif name == b'connection' and value.strip().lower() == b'close':
+            close = True
+    if length is None:
+        # The legacy loop sends no Content-Length and just closes
+        return status, await reader.read(), True
+    return status, await reader.readexactly(length), close
+
+
+def _request_bytes(host, target, keep_alive):
+    return 'GET {} HTTP/1.1\r\nHost: {}\r\nConnection: {}\r\n\r\n'.format(
+        target, host, 'keep-alive' if keep_alive else 'close').encode()
+
+
+class LoadStats:
+    def __init__(self):
+        self.latency_ms = []  # scheduled start to full response, for 200 responses
+        self.connect_ms = []
+        self.ok = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.statuses = {}
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.last_done = 0.0
+
+    def begin(self):
+        self.in_flight += 1
+        if self.in_flight > self.max_in_flight:
+            self.max_in_flight = self.in_flight
+
+    def done(self, scheduled, status=None, error=None):
+        now = time.perf_counter()
+        self.in_flight -= 1
+        self.last_done = now
+        if isinstance(error, asyncio.TimeoutError):
+            self.timeouts += 1
+        elif error is not None or status != 200:
+            self.errors += 1
+            key = status if error is None else type(error).__name__
+            self.statuses[key] = self.statuses.get(key, 0) + 1
+        else:
+            self.ok += 1
+            self.latency_ms.append((now - scheduled) * 1000)
+
+
+class LoadGenerator:
+    def __init__(self, host, port, mix=DEFAULT_MIX, rate=10, seconds=5, controllers=3, burst=1,
+                 keep_alive=False, timeout=5, seed=1):
+        """
+        Replay a command mix against a control server at a target rate.
+
+        Args:
+            host (str): Server address.
+            port (int): Server port.
+            mix (str): Weighted commands, e.g. 'LIGHT_ON=2,MOVE_MID=1' (see parse_mix()).
+            rate (float): Total commands per second across all controllers.
+            seconds (float): How long to keep scheduling commands.
+            controllers (int): Independent senders, like several speech clients.
+            burst (int): Commands each controller sends back to back per tick. With bursts
+                every controller ticks at the same moment, so their bursts collide.
+            keep_alive (bool): One persistent connection per controller instead of a new
+                connection per command (what requests.get() does now).
+            timeout (float): Seconds before a command counts as timed out.
+            seed (int): Seed for the command choice, so runs are repeatable.
+        """
+        self.host = host
+        self.port = port
+        self.targets, self.weights = parse_mix(mix)
+        self.rate = rate
+        self.seconds = seconds
+        self.controllers = controllers
+        self.burst = burst
+        self.keep_alive = keep_alive
+        self.timeout = timeout
+        self.random = random.Random(seed)
+        self.stats = LoadStats()
+        self.scheduled = 0
+        self.elapsed = 0.0
+
+    def schedule(self, start):
+        """Return the sorted (time, controller, target) list for the whole run."""
+        period = self.burst * self.controllers / self.rate
+        ticks = int(self.seconds / period)
+        plan = []
+        for c in range(self.controllers):
+            offset = 0 if self.burst > 1 else c * period / self.controllers
+            for k in range(ticks):
+                for _ in range(self.burst):
+                    target = self.random.choices(self.targets, self.weights)[0]
+                    plan.append((start + offset + k * period, c, target))
+        plan.sort(key=lambda entry: entry[0])
+        return plan
+
+    async def _one_shot(self, target, scheduled):
+        stats = self.stats
+        stats.begin()
+        writer = None
+
+        async def exchange():
+            nonlocal writer
+            start = time.perf_counter()
+            reader, writer = await asyncio.open_connection(self.host, self.port)
+            stats.connect_ms.append((time.perf_counter() - start) * 1000)
+            writer.write(_request_bytes(self.host, target, False))
+            return (await _read_response(reader))[0]
+
+        try:
+            status = await asyncio.wait_for(exchange(), self.timeout)
+            stats.done(scheduled, status)
+        except (asyncio.TimeoutError, OSError, ValueError, IndexError, asyncio.IncompleteReadError) as e:
+            stats.done(scheduled, error=e)
+        finally:
+            if writer is not None:
+                writer.close()
+
+    async def _controller(self, queue):
+        """Send one controller's commands in order over a kept-alive connection."""
+        stats = self.stats
+        reader = writer = None
+        while True:
+            target, scheduled = await queue.get()
+            if target is None:
+                break
+            stats.begin()
+
+            async def exchange():
+                nonlocal reader, writer
+                if writer is None:
+                    start = time.perf_counter()
+                    reader, writer = await asyncio.open_connection(self.host, self.port)
+                    stats.connect_ms.append((time.perf_counter() - start) * 1000)
+                writer.write(_request_bytes(self.host, target, True))
+                return await _read_response(reader)
+
+            try:
+                status, _, close = await asyncio.wait_for(exchange(), self.timeout)
+                stats.done(scheduled, status)
+            except (asyncio.TimeoutError, OSError, ValueError, IndexError, asyncio.IncompleteReadError) as e:
+                stats.done(scheduled, error=e)
+                close = True
+            if close and writer is not None:
+                writer.close()
+                reader = writer = None
+        if writer is not None:
+            writer.close()
+
+    async def run(self):
+        start = time.perf_counter() + 0.05
+        plan = self.schedule(start)
+        self.scheduled = len(plan)
+        tasks = []
+        queues = []
+        if self.keep_alive:
+            queues = [asyncio.Queue() for _ in range(self.controllers)]
+            tasks = [asyncio.create_task(self._controller(q)) for q in queues]
+        for when, controller, target in plan:
+            delay = when - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            if self.keep_alive:
+                queues[controller].put_nowait((target, when))
+            else:
+                tasks.append(asyncio.create_task(self._one_shot(target, when)))
+        for q in queues:
+            q.put_nowait((None, None))
+        await asyncio.gather(*tasks)
+        self.elapsed = max(self.stats.last_done, start) - start
+        return self.stats
+
+
+#reporting
+HEADER = ('{:7s} {:>6s} {:>5s} {:>5s} {:>4s} {:>4s} {:>7s} {:>8s} {:>8s} {:>8s} {:>8s} {:>5s} {:>7s} {:>6s} {:>5s}'.format(
+    'server', 'rate/s', 'sent', 'ok', 'err', 't/o', 'got/s', 'p50 ms', 'p95 ms', 'p99 ms', 'max ms',
+    'slowc', 'acceptq', 'full%', 'ovfl'))
+
+
+def report_row(name, gen, monitor):
+    stats = gen.stats
+    lat = stats.latency_ms
+    pct = ['{:8.1f}'.format(percentile(lat, p)) if lat else '{:>8s}'.format('-') for p in (50, 95, 99)]
+    slow = sum(1 for ms in stats.connect_ms if ms >= SLOW_CONNECT_MS)
+    if monitor.samples:
+        queue = '{}/{}'.format(monitor.max_queued, monitor.limit)
+        full = '{:6.1f}'.format(100.0 * monitor.full / monitor.samples)
+        overflows = '{:5d}'.format(monitor.overflows)
+    else:
+        queue, full, overflows = '-', '{:>6s}'.format('-'), '{:>5s}'.format('-')
+    return '{:7s} {:6g} {:5d} {:5d} {:4d} {:4d} {:7.1f} {} {} {} {:8.1f} {:5d} {:>7s} {} {}'.format(
+        name, gen.rate, gen.scheduled, stats.ok, stats.errors, stats.timeouts,
+        stats.ok / gen.elapsed if gen.elapsed else 0.0, pct[0], pct[1], pct[2],
+        max(lat) if lat else 0.0, slow, queue, full, overflows)
+
+
+def run_load(name, host, port, rate, backlog, args):
+    gen = LoadGenerator(host, port, mix=args.mix, rate=rate, seconds=args.seconds,
+                        controllers=args.controllers, burst=args.burst, keep_alive=args.keep_alive,
+                        timeout=args.timeout, seed=args.seed)
+    monitor = AcceptQueueMonitor(port, backlog)
+    if host in ('127.0.0.1', 'localhost'):
+        monitor.start()
+    asyncio.run(gen.run())
+    monitor.stop()
+    print(report_row(name, gen, monitor))
+    if gen.stats.statuses:
+        print('        errors: ' + ', '.join('{}={}'.format(k, v) for k, v in sorted(gen.stats.statuses.items(), key=str)))
+    sys.stdout.flush()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load generator for the Scorpion /control endpoint.')
+    parser.add_argument('--server', choices=('legacy', 'async', 'both'), default='both',
+                        help='server mode to start on localhost (default: both, one after the other)')
+    parser.add_argument('--target', help='host:port of a running server (e.g. the ESP32) instead')
+    parser.add_argument('--rate', default='5,10,20,40', help='commands per second; a comma list runs a sweep')
+    parser.add_argument('--seconds', type=float, default=3, help='seconds of load per rate')
+    parser.add_argument('--controllers', type=int, default=3, help='independent senders')
+    parser.add_argument('--burst', type=int, default=1, help='commands per controller per tick')
+    parser.add_argument('--mix', default=DEFAULT_MIX, help='weighted commands, e.g. LIGHT_ON=2,MOVE?deg=37=1')
+    parser.add_argument('--keep-alive', action='store_true', help='one persistent connection per controller')
+    parser.add_argument('--timeout', type=float, default=5, help='seconds before a command times out')
+    parser.add_argument('--backlog', type=int, default=5,
+                        help='listen backlog for the async server (and of --target, for the full%% column)')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--serve', choices=('legacy', 'async'), help=argparse.SUPPRESS)
+    parser.add_argument('--port', type=int, default=8080, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve == 'legacy':
+        legacy_server('127.0.0.1', args.port)
+        return
+    if args.serve == 'async':
+        async_server('127.0.0.1', args.port, args.backlog)
+        return
+
+    rates = [float(r) for r in args.rate.split(',')]
+    print('{} controller(s), burst {}, {}, {} s per rate, timeout {} s'.format(
+        args.controllers, args.burst, 'keep-alive' if args.keep_alive else 'new connection per command',
+        args.seconds, args.timeout))
+    print(HEADER)
+    if args.target:
+        host, _, port = args.target.rpartition(':')
+        for rate in rates:
+            run_load('target', host, int(port), rate, args.backlog, args)
+        return
+
+    for mode in (('legacy', 'async') if args.server == 'both' else (args.server,)):
+        for rate in rates:
+            # A fresh server per rate, so one overloaded run does not spill into the next
+            port = free_port(socket.SOCK_STREAM)
+            proc = spawn_server(mode, port, args.backlog)
+            try:
+                run_load(mode, '127.0.0.1', port, rate, 1 if mode == 'legacy' else args.backlog, args)
+            finally:
+                proc.kill()
+                proc.wait()
+    print('slowc: connects over {} ms (SYN dropped and retried); acceptq: deepest accept queue / backlog; '
+          'full%: samples with the queue full; ovfl: ListenOverflows during the run'.format(SLOW_CONNECT_MS))
+
+
+if __name__ == '__main__':
+    main()
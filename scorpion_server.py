@@ -0,0 +1,525 @@
+# Asynchronous HTTP control server for the Scorpion arm.
+# The same code runs under uasyncio on the ESP32 and under asyncio on a laptop,
+# so it can be load-tested locally (python scorpion_server.py).
+import gc
+
+try:
+    import uasyncio as asyncio
+except ImportError:
+    import asyncio
+
+try:
+    from time import ticks_us, ticks_diff
+except ImportError:
+    # Plain Python on the laptop
+    from time import perf_counter_ns
+
+    def ticks_us():
+        return perf_counter_ns() // 1000
+
+    def ticks_diff(ticks1, ticks2):
+        return ticks1 - ticks2
+
+# gc.mem_alloc()/mem_free() only exist on MicroPython
+_mem_alloc = getattr(gc, 'mem_alloc', None) or (lambda: 0)
+_mem_free = getattr(gc, 'mem_free', None)
+
+STATUS_TEXT = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 413: 'Payload Too Large'}
+
+
+def _unquote(text):
+    """Decode '+' and %XX escapes in a query string value."""
+    if '%' not in text and '+' not in text:
+        return text
+    text = text.replace('+', ' ')
+    parts = text.split('%')
+    out = [parts[0]]
+    for part in parts[1:]:
+        try:
+            out.append(chr(int(part[:2], 16)) + part[2:])
+        except ValueError:
+            out.append('%' + part)
+    return ''.join(out)
+
+
+def parse_target(target):
+    """
+    Split a request target into its path and query parameters.
+
+    Args:
+        target (str): e.g. '/control?command=INFLATE&chip=2&ms=1500'
+
+    Returns:
+        tuple: (path, params) with params as a dict of str -> str.
+    """
+    path, _, query = target.partition('?')
+    params = {}
+    if query:
+        for pair in query.split('&'):
+            if pair:
+                name, _, value = pair.partition('=')
+                params[_unquote(name)] = _unquote(value)
+    return path, params
+
+
+def param_int(params, name, default=None, lo=None, hi=None):
+    """Read an integer query parameter, raising ValueError if it is missing or out of range."""
+    value = params.get(name)
+    if value is None or value == '':
+        if default is None:
+            raise ValueError('Missing parameter: ' + name)
+        return default
+    try:
+        value = int(value)
+    except ValueError:
+        raise ValueError('Parameter {} must be a whole number'.format(name))
+    if (lo is not None and value < lo) or (hi is not None and value > hi):
+        raise ValueError('Parameter {} must be between {} and {}'.format(name, lo, hi))
+    return value
+
+
+def param_rgb(params, name='rgb'):
+    """Read a colour given as six hex digits (e.g. ff0000) and return an (r, g, b) tuple."""
+    value = params.get(name, '')
+    if value.startswith('#'):
+        value = value[1:]
+    if len(value) != 6:
+        raise ValueError('Parameter {} must be six hex digits'.format(name))
+    try:
+        return int(value[0:2], 16), int(value[2:4], 16), int(value[4:6], 16)
+    except ValueError:
+        raise ValueError('Parameter {} must be six hex digits'.format(name))
+
+
+def _hash_span(buf, start, stop):
+    """Hash buf[start:stop] to a small int without slicing (and so without allocating)."""
+    h = 0
+    for i in range(start, stop):
+        h = (h * 31 + buf[i]) & 0x3FFFFFFF
+    return h
+
+
+def _span_equals(buf, start, stop, const):
+    if stop - start != len(const):
+        return False
+    for i in range(len(const)):
+        if buf[start + i] != const[i]:
+            return False
+    return True
+
+
+def _match_ci(buf, pos, stop, lower_const):
+    """True if buf[pos:] starts with lower_const, ignoring ASCII case."""
+    if stop - pos < len(lower_const):
+        return False
+    for i in range(len(lower_const)):
+        c = buf[pos + i]
+        if 65 <= c <= 90:
+            c += 32
+        if c != lower_const[i]:
+            return False
+    return True
+
+
+def _find_byte(buf, start, stop, byte):
+    for i in range(start, stop):
+        if buf[i] == byte:
+            return i
+    return -1
+
+
+def _find_head_end(buf, stop):
+    """Return the index just past the blank line ending the request head, or -1."""
+    for i in range(1, stop):
+        if buf[i] == 10 and (buf[i - 1] == 10 or (i >= 3 and buf[i - 1] == 13 and buf[i - 2] == 10)):
+            return i + 1
+    return -1
+
+
+_NO_PARAMS = {}  # Shared by every request without parameters; handlers must not modify it
+
+
+class Router:
+    def __init__(self):
+        """
+        Map command names to handlers with a dict lookup.
+
+        A command can be sent either as /control?command=NAME&key=value (what the
+        speech client sends) or as /NAME?key=value.
+        """
+        self.routes = {}
+        self._table = {}  # hash of the command bytes -> [(command bytes, handler)]
+
+    def add(self, command, handler):
+        """
+        Register handler for command.
+
+        Args:
+            command (str): Command name, e.g. 'INFLATE'.
+            handler (callable): Called with the query parameters (dict, read-only) and returns
+                (body, work) like ControlServer's dispatch. May raise ValueError for bad parameters.
+        """
+        self.routes[command] = handler
+        name = command.encode()
+        bucket = self._table.setdefault(_hash_span(name, 0, len(name)), [])
+        for i, (other, _) in enumerate(bucket):
+            if other == name:
+                bucket[i] = (name, handler)
+                return
+        bucket.append((name, handler))
+
+    def route(self, command):
+        """Decorator form of add()."""
+        def register(handler):
+            self.add(command, handler)
+            return handler
+        return register
+
+    def _lookup(self, buf, start, stop):
+        bucket = self._table.get(_hash_span(buf, start, stop))
+        if bucket is not None:
+            for name, handler in bucket:
+                if _span_equals(buf, start, stop, name):
+                    return handler
+        return None
+
+    def dispatch(self, target):
+        """Look up and run the handler for a request target. Returns None for an unknown command."""
+        path, params = parse_target(target)
+        if path == '/control':
+            # The parameter name is case-insensitive, as in dispatch_span()
+            command = ''
+            for name in params:
+                if name.lower() == 'command':
+                    command = params.pop(name)
+                    break
+            # Also accept the parameters folded into the command, e.g. command=MOVE?deg=37
+            if '?' in command:
+                command, _, extra = command.partition('?')
+                params.update(parse_target('?' + extra)[1])
+        else:
+            command = path[1:]
+        handler = self.routes.get(command)
+        if handler is None:
+            return None
+        return handler(params)
+
+    def dispatch_span(self, buf, start, stop):
+        """
+        Same as dispatch() for a target held in buf[start:stop].
+
+        Commands without parameters are matched in place, so the buffer is only
+        decoded when there are parameters to hand to the handler.
+        """
+        query = _find_byte(buf, start, stop, 63)  # '?'
+        if query < 0:
+            query = stop
+        if _span_equals(buf, start, query, b'/control'):
+            # Only the plain form is matched in place: ?command=NAME with nothing after it
+            if _match_ci(buf, query + 1, stop, b'command=') \
+                    and _find_byte(buf, query + 9, stop, 38) < 0 and _find_byte(buf, query + 9, stop, 63) < 0:
+                handler = self._lookup(buf, query + 9, stop)
+                return None if handler is None else handler(_NO_PARAMS)
+        elif query == stop and stop > start + 1:
+            handler = self._lookup(buf, start + 1, stop)
+            return None if handler is None else handler(_NO_PARAMS)
+        return self.dispatch(bytes(buf[start:stop]).decode())
+
+
+class HeapStats:
+    def __init__(self, threshold=16384, every=0):
+        """
+        Count heap use per request and schedule garbage collection between requests.
+
+        Args:
+            threshold (int): Collect when fewer than this many bytes of heap are free.
+            every (int): Also collect after this many requests (0 = only on threshold).
+                Used on hosts where gc.mem_free() is not available.
+        """
+        self.threshold = threshold
+        self.every = every
+        self.requests = 0
+        self.alloc_requests = 0  # requests that allocated any heap
+        self.last_alloc = 0
+        self.total_alloc = 0
+        self.collections = 0
+        self.unscheduled = 0  # automatic collections that ran mid-request
+        self.pause_us = 0
+        self.max_pause_us = 0
+        self._since_collect = 0
+        self._before = 0
+
+    def begin(self):
+        self._before = _mem_alloc()
+
+    def end(self):
+        """Record the heap allocated since begin()."""
+        self.requests += 1
+        self._since_collect += 1
+        delta = _mem_alloc() - self._before
+        if delta < 0:
+            self.unscheduled += 1
+            delta = 0
+        self.last_alloc = delta
+        self.total_alloc += delta
+        if delta:
+            self.alloc_requests += 1
+
+    def collect(self):
+        """Run a collection now and record how long it paused for."""
+        start = ticks_us()
+        gc.collect()
+        pause = ticks_diff(ticks_us(), start)
+        self.collections += 1
+        self.pause_us += pause
+        if pause > self.max_pause_us:
+            self.max_pause_us = pause
+        self._since_collect = 0
+
+    def idle(self):
+        """Call between requests: collect if the heap is low or enough requests have passed."""
+        if (_mem_free is not None and _mem_free() < self.threshold) \
+                or (self.every and self._since_collect >= self.every):
+            self.collect()
+
+    def report(self):
+        return ('requests={} alloc_requests={} last_alloc={} total_alloc={} mem_free={} '
+                'gc={} unscheduled_gc={} gc_pause_us={} max_gc_pause_us={}').format(
+            self.requests, self.alloc_requests, self.last_alloc, self.total_alloc,
+            _mem_free() if _mem_free is not None else -1,
+            self.collections, self.unscheduled, self.pause_us, self.max_pause_us)
+
+
+def _response(status, body, keep_alive):
+    body = body.encode()
+    head = 'HTTP/1.1 {} {}\r\nContent-Type: text/plain\r\nContent-Length: {}\r\nConnection: {}\r\n\r\n'.format(
+        status, STATUS_TEXT[status], len(body), 'keep-alive' if keep_alive else 'close')
+    return head.encode() + body
+
+RESPONSE_404 = (_response(404, 'Unknown command', False), _response(404, 'Unknown command', True))
+RESPONSE_400 = (_response(400, 'Bad request', False), _response(400, 'Bad request', True))
+RESPONSE_413 = _response(413, 'Request too large', False)
+
+
+async def _readinto(reader, mv):
+    """Read into a memoryview; asyncio on the laptop has no readinto so it copies instead."""
+    if hasattr(reader, 'readinto'):
+        return await reader.readinto(mv)
+    data = await reader.read(len(mv))
+    mv[:len(data)] = data
+    return len(data)
+
+
+class ControlServer:
+    def __init__(self, dispatch, host='0.0.0.0', port=80, idle_timeout=10, backlog=5,
+                 max_clients=4, buffer_size=512, heap=None):
+        """
+        Serve HTTP/1.1 requests to several clients at once, with keep-alive.
+
+        Args:
+            dispatch (Router or callable): A Router, or a callable taking the request target
+                (e.g. '/control?command=MOVE_MID'). Returns (body, work) where work is a coroutine
+                to run as a task after the response is sent (or None), or returns None for an
+                unknown request. A ValueError is answered with 400 and its message.
+            host (str): Address to listen on.
+            port (int): TCP port to listen on.
+            idle_timeout (int): Seconds a kept-alive connection may sit idle before it is closed.
+            backlog (int): Pending connections the listening socket will queue.
+            max_clients (int): Receive buffers preallocated up front; extra clients get their own.
+            buffer_size (int): Size of each receive buffer, and so the largest request head accepted.
+            heap (HeapStats, optional): Heap counters and GC scheduling. A default one is created.
+        """
+        self.dispatch = dispatch
+        self.host = host
+        self.port = port
+        self.idle_timeout = idle_timeout
+        self.backlog = backlog
+        self.buffer_size = buffer_size
+        self.heap = heap or HeapStats()
+        self.server = None
+        self.requests = 0
+        self.clients = 0
+        self._buffers = [bytearray(buffer_size) for _ in range(max_clients)]
+        self._responses = {}  # body -> (close response, keep-alive response) bytes
+        self.max_cached_responses = 32
+
+    async def start(self):
+        """Start listening. Returns once the socket is bound; clients are served as tasks."""
+        self.server = await asyncio.start_server(self._serve_client, self.host, self.port, backlog=self.backlog)
+        return self.server
+
+    def _ok(self, body, keep_alive):
+        """Return the prebuilt 200 response for body, building and caching it on first use."""
+        cached = self._responses.get(body)
+        if cached is None:
+            cached = (_response(200, body, False), _response(200, body, True))
+            if len(self._responses) < self.max_cached_responses:
+                self._responses[body] = cached
+        return cached[keep_alive]
+
+    def _handle(self, buf, head_end):
+        """
+        Parse the request head in buf[:head_end] and run its command.
+
+        Returns:
+            tuple: (response bytes, work, keep_alive, body length to skip)
+        """
+        line_end = _find_byte(buf, 0, head_end, 10)
+        is_get = _span_equals(buf, 0, 4, b'GET ')
+        target_end = _find_byte(buf, 4, line_end, 32) if is_get else -1
+        if target_end < 0:
+            return RESPONSE_400[0], None, False, 0
+        keep_alive = _match_ci(buf, target_end + 1, line_end, b'http/1.1')
+
+        # Only Connection and Content-Length matter here
+        length = 0
+        pos = line_end + 1
+        while pos < head_end:
+            eol = _find_byte(buf, pos, head_end, 10)
+            if _match_ci(buf, pos, eol, b'connection:'):
+                value = pos + 11
+                while value < eol and buf[value] == 32:
+                    value += 1
+                if _match_ci(buf, value, eol, b'close'):
+                    keep_alive = False
+                elif _match_ci(buf, value, eol, b'keep-alive'):
+                    keep_alive = True
+            elif _match_ci(buf, pos, eol, b'content-length:'):
+                for i in range(pos + 15, eol):
+                    if 48 <= buf[i] <= 57:
+                        length = length * 10 + buf[i] - 48
+            pos = eol + 1
+
+        try:
+            if isinstance(self.dispatch, Router):
+                result = self.dispatch.dispatch_span(buf, 4, target_end)
+            else:
+                result = self.dispatch(bytes(buf[4:target_end]).decode())
+        except ValueError as e:
+            return _response(400, str(e), keep_alive), None, keep_alive, length
+        if result is None:
+            return RESPONSE_404[keep_alive], None, keep_alive, length
+        body, work = result
+        return self._ok(body, keep_alive), work, keep_alive, length
+
+    async def _serve_client(self, reader, writer):
+        self.clients += 1
+        buf = self._buffers.pop() if self._buffers else bytearray(self.buffer_size)
+        mv = memoryview(buf)
+        filled = 0
+        try:
+            while True:
+                head_end = _find_head_end(buf, filled)
+                while head_end < 0:
+                    if filled == len(buf):
+                        writer.write(RESPONSE_413)
+                        await writer.drain()
+                        return
+                    if filled:
+                        n = await _readinto(reader, mv[filled:])
+                    else:
+                        # Between requests: tidy the heap, then wait for the next one
+                        self.heap.idle()
+                        try:
+                            n = await asyncio.wait_for(_readinto(reader, mv), self.idle_timeout)
+                        except asyncio.TimeoutError:
+                            return
+                    if not n:
+                        return
+                    filled += n
+                    head_end = _find_head_end(buf, filled)
+
+                self.heap.begin()
+                response, work, keep_alive, skip = self._handle(buf, head_end)
+                self.requests += 1
+                writer.write(response)
+                await writer.drain()
+                # Acknowledge first, then let the actuators run alongside other clients
+                if work is not None:
+                    asyncio.create_task(work)
+
+                # Keep any pipelined bytes after this request (and its discarded body)
+                consumed = head_end + skip
+                if consumed > filled:
+                    extra = consumed - filled
+                    while extra > 0:
+                        n = await _readinto(reader, mv[:min(len(buf), extra)])
+                        if not n:
+                            return
+                        extra -= n
+                    filled = 0
+                else:
+                    for i in range(consumed, filled):
+                        buf[i - consumed] = buf[i]
+                    filled -= consumed
+                self.heap.end()
+                if not keep_alive:
+                    return
+        except Exception as e:
+            print('Error:', e)
+        finally:
+            self.clients -= 1
+            self._buffers.append(buf)
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except Exception:
+                pass
+
+
+#stand-in for the Scorpion actuators so the server can be load-tested on a laptop
+async def _fake_actuator(ms):
+    await asyncio.sleep(ms / 1000)
+
+
+def fake_router(animation_ms=90):
+    """Build a Router with the same commands as the ESP32, with sleeps in place of the hardware."""
+    router = Router()
+
+    def fixed(body, ms):
+        return lambda params: (body, _fake_actuator(ms) if ms else None)
+
+    router.add('LIGHT_ON', fixed('Scorpion arm engaged', animation_ms))
+    router.add('LIGHT_OFF', fixed('Scorpion arm disengaged', animation_ms))
+    router.add('LIGHT_HOLD', fixed('Holding', animation_ms))
+    router.add('MOVE_LEFT', fixed('Moved left', animation_ms))
+    router.add('MOVE_RIGHT', fixed('Moved right', animation_ms))
+    router.add('MOVE_MID', fixed('Moved to the middle', 0))
+
+    @router.route('MOVE')
+    def move(params):
+        return 'Moved to {}'.format(param_int(params, 'deg', lo=0, hi=180)), None
+
+    @router.route('INFLATE')
+    def inflate(params):
+        chip = param_int(params, 'chip', 0, 0, 7)
+        return 'Inflating chip {}'.format(chip), _fake_actuator(animation_ms)
+
+    @router.route('LED')
+    def led(params):
+        return 'LED {},{},{}'.format(*param_rgb(params)), _fake_actuator(animation_ms)
+
+    return router
+
+
+def main():
+    import sys
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8080
+
+    async def run():
+        router = fake_router()
+        server = ControlServer(router, host='127.0.0.1', port=port, backlog=64, heap=HeapStats(every=1000))
+        router.add('STATS', lambda params: (server.heap.report(), None))
+        await server.start()
+        print('Stand-in Scorpion server on http://127.0.0.1:{}/control?command=...'.format(port))
+        while True:
+            await asyncio.sleep(3600)
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
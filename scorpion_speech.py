@@ -0,0 +1,648 @@
+# Host-side pieces of the Scorpion speech client.
+# The recognition loop in "ODTL_Final Project_Scorpion_IDLE speech_to_text.py"
+# only turns speech into command names; sending them to the ESP32 happens on a
+# separate thread here, so a slow or unreachable arm never holds up the audio.
+import json
+import os
+import queue
+import threading
+import time
+from collections import deque
+
+import numpy as np
+import requests
+
+# Spoken keyword(s) -> ESP32 command. The table is a file so the recognizer
+# grammar and the command mapping always come from the same list.
+COMMANDS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'scorpion_commands.json')
+
+
+def load_commands(path=COMMANDS_FILE):
+    """
+    Load the command table: each ESP32 command with the spoken keywords that trigger it.
+
+    Returns:
+        tuple: ((keywords, command), ...) in file order, which is also the order they are checked in.
+    """
+    with open(path) as f:
+        table = json.load(f)
+    return tuple((tuple(word.lower() for word in keywords), command) for command, keywords in table.items())
+
+
+COMMANDS = load_commands()
+
+
+def command_for(text, commands=COMMANDS):
+    """Return the ESP32 command for a recognised phrase, or None if it holds no keyword."""
+    text = text.lower()
+    for keywords, command in commands:
+        for keyword in keywords:
+            if keyword in text:
+                return command
+    return None
+
+
+def command_grammar(commands=COMMANDS):
+    """
+    The phrase list for a grammar-restricted KaldiRecognizer: every keyword, plus
+    [unk] so other speech is matched to that instead of forced onto a command.
+
+    Returns:
+        str: JSON for KaldiRecognizer(model, sample_rate, grammar).
+    """
+    phrases = []
+    for keywords, _ in commands:
+        for keyword in keywords:
+            if keyword not in phrases:
+                phrases.append(keyword)
+    return json.dumps(phrases + ['[unk]'])
+
+
+def _words(text):
+    """Drop the [unk] placeholders a grammar recognizer puts in for speech outside the grammar."""
+    if '[unk]' not in text:
+        return text
+    return ' '.join(word for word in text.split() if word != '[unk]')
+
+
+def _median(values):
+    values = sorted(values)
+    return values[len(values) // 2]
+
+
+class CommandDetector:
+    def __init__(self, recognizer, sample_rate=16000, partial=False, min_conf=0.5, stable=2,
+                 measure=False, commands=COMMANDS, gate=None, max_age=None, log=print):
+        """
+        Feed audio to a Vosk recognizer and say which commands to send.
+
+        By default a command is sent when the recognizer finishes an utterance,
+        which needs a moment of silence after the word. With partial=True it is
+        sent as soon as the keyword shows up in PartialResult(), and the same
+        command in that utterance's final result is not sent again.
+
+        Args:
+            recognizer (KaldiRecognizer): The recognizer to feed.
+            sample_rate (int): Sample rate of the 16-bit mono audio.
+            partial (bool): Fire commands from partial results.
+            min_conf (float): Lowest word confidence a partial keyword may have.
+            stable (int): Partial results in a row the keyword must appear in before it fires.
+            measure (bool): Time both strategies on every command, whichever one is sending.
+            commands (tuple): Command table, as returned by load_commands().
+            gate (EnergyGate, optional): Skip decoding blocks it judges silent.
+            max_age (float, optional): Drop a command if its keyword was spoken more than this many
+                seconds ago, rather than move the arm late.
+            log (callable): Called with one line per recognised phrase, or None for no logging.
+        """
+        self.recognizer = recognizer
+        self.commands = commands
+        self.gate = gate
+        self.max_age = max_age
+        self.sample_rate = sample_rate
+        self.partial = partial
+        self.min_conf = min_conf
+        self.stable = stable
+        self.measure = measure
+        self.log = log
+        recognizer.SetWords(True)
+        if (partial or measure) and hasattr(recognizer, 'SetPartialWords'):
+            recognizer.SetPartialWords(True)  # word times and confidences in partial results
+        self.early = 0
+        self.suppressed = 0
+        self.stale = 0
+        self.timings = {}  # command -> {'partial': [ms], 'final': [ms]} from the end of the word to dispatch
+        self.audio_s = 0.0
+        self.decode_s = 0.0  # wall time spent in the recognizer
+        self.decode_cpu_s = 0.0  # CPU time of this thread spent in the recognizer
+        self._fed = 0  # samples given to the recognizer so far
+        self._arrivals = deque((), 256)  # (sample count at the end of a block, when the block arrived)
+        self._candidate = None
+        self._seen = 0
+        self._fired = None  # (command, time) sent early in the current utterance
+
+    def _wall_time(self, seconds):
+        """perf_counter() time at which the audio seconds into the stream was captured, or None."""
+        sample = seconds * self.sample_rate
+        for end, arrived in self._arrivals:
+            if end >= sample:
+                return arrived - (end - sample) / self.sample_rate
+        return None
+
+    def _keyword(self, result, key):
+        """Find the first command word in a result. Returns (command, word dict or None)."""
+        words = result.get(key)
+        if words:
+            for word in words:
+                command = command_for(word['word'], self.commands)
+                if command:
+                    return command, word
+            return None, None
+        text = result.get('text') or result.get('partial') or ''
+        return command_for(text, self.commands), None
+
+    def _record(self, command, strategy, word, now):
+        if word is None:
+            return None
+        spoken = self._wall_time(word['end'])
+        if spoken is None:
+            return None
+        ms = (now - spoken) * 1000
+        self.timings.setdefault(command, {'partial': [], 'final': []})[strategy].append(ms)
+        return ms
+
+    def _spoken(self, word, now):
+        """perf_counter() time the keyword ended, or when the newest audio arrived if the word has no times."""
+        spoken = None if word is None else self._wall_time(word['end'])
+        if spoken is None:
+            spoken = self._arrivals[-1][1] if self._arrivals else now
+        return spoken
+
+    def _stale(self, command, spoken, now):
+        """True (and logged) if the audio a command came from is older than max_age."""
+        if self.max_age is None:
+            return False
+        age = now - spoken
+        if age <= self.max_age:
+            return False
+        self.stale += 1
+        if self.log:
+            self.log(f"Dropped {command}: the word was spoken {age:.1f} s ago")
+        return True
+
+    def discard(self):
+        """Throw away the utterance in progress, e.g. after audio was dropped from the middle of it."""
+        if hasattr(self.recognizer, 'Reset'):
+            self.recognizer.Reset()
+        else:
+            self.recognizer.FinalResult()
+        self._fired = None
+        self._candidate = None
+
+    def feed(self, data, arrived=None):
+        """
+        Feed one block of audio.
+
+        Args:
+            data (bytes): 16-bit mono samples.
+            arrived (float, optional): perf_counter() time the block was captured; defaults to now.
+
+        Returns:
+            list: (command, spoken) to send now (usually empty); spoken is the perf_counter()
+            time the keyword ended, for CommandSender.send().
+        """
+        if arrived is None:
+            arrived = time.perf_counter()
+        self.audio_s += len(data) / 2 / self.sample_rate
+        if self.gate is None:
+            return self._decode(data, arrived)
+        blocks, ended = self.gate.process(data, arrived)
+        commands = []
+        for block, block_arrived in blocks:
+            commands += self._decode(block, block_arrived)
+        if ended:
+            # Don't wait for the recognizer to hear the trailing silence it would need to end the utterance
+            commands += self.flush()
+        return commands
+
+    def _decode(self, data, arrived):
+        start = time.perf_counter()
+        cpu = time.thread_time()
+        self._fed += len(data) // 2
+        self._arrivals.append((self._fed, arrived))
+        if self.recognizer.AcceptWaveform(data):
+            result = json.loads(self.recognizer.Result())
+            handle = self._final
+        elif self.partial or self.measure:
+            result = json.loads(self.recognizer.PartialResult())
+            handle = self._partial
+        else:
+            result = handle = None
+        end = time.perf_counter()
+        self.decode_s += end - start
+        self.decode_cpu_s += time.thread_time() - cpu
+        if handle is None:
+            return []
+        # Replayed audio can be stamped ahead of the real clock; count only the decode time then
+        return handle(result, max(end, arrived + end - start))
+
+    def flush(self):
+        """End of the audio: finish the utterance in progress. Returns the (command, spoken) to send."""
+        start = time.perf_counter()
+        cpu = time.thread_time()
+        result = json.loads(self.recognizer.FinalResult())
+        end = time.perf_counter()
+        self.decode_s += end - start
+        self.decode_cpu_s += time.thread_time() - cpu
+        arrived = self._arrivals[-1][1] if self._arrivals else end
+        return self._final(result, max(end, arrived + end - start))
+
+    def usage(self):
+        """Real-time factor (decode time / audio time), the CPU the recognizer used, and the gate's counts."""
+        if not self.audio_s:
+            return 'no audio decoded'
+        line = 'audio {:.1f} s, decode {:.2f} s, real-time factor {:.3f}, CPU {:.1f}% of one core'.format(
+            self.audio_s, self.decode_s, self.decode_s / self.audio_s, 100 * self.decode_cpu_s / self.audio_s)
+        if self.gate is not None:
+            line += '; ' + self.gate.stats()
+        return line
+
+    def _partial(self, result, now):
+        if not _words(result.get('partial', '')):
+            self._candidate = None
+            return []
+        command, word = self._keyword(result, 'partial_result')
+        if word is not None and word.get('conf', 1.0) < self.min_conf:
+            command = None
+        if command != self._candidate:
+            self._candidate = command
+            self._seen = 0
+        self._seen += 1
+        if command is None or self._seen < self.stable or self._fired is not None:
+            return []
+        self._fired = (command, now)
+        self._record(command, 'partial', word, now)
+        spoken = self._spoken(word, now)
+        if not self.partial or self._stale(command, spoken, now):
+            return []
+        self.early += 1
+        if self.log:
+            self.log(f"Heard {result['partial']!r} so far: {command}")
+        return [(command, spoken)]
+
+    def _final(self, result, now):
+        fired = self._fired
+        self._fired = None
+        self._candidate = None
+        text = _words(result.get('text', ''))
+        if not text:
+            return []
+        if self.log:
+            self.log(f"You said: {text}")
+        command, word = self._keyword(result, 'result')
+        if command is None:
+            return []
+        ms = self._record(command, 'final', word, now)
+        if self.measure and self.log and ms is not None:
+            early = self.timings[command]['partial']
+            if fired is not None and fired[0] == command and early:
+                self.log(f"{command}: partial {early[-1]:.0f} ms, final {ms:.0f} ms after the word ended")
+            else:
+                self.log(f"{command}: final {ms:.0f} ms after the word ended (no partial)")
+        if self.partial and fired is not None and fired[0] == command:
+            self.suppressed += 1
+            return []
+        spoken = self._spoken(word, now)
+        if self._stale(command, spoken, now):
+            return []
+        return [(command, spoken)]
+
+    def report(self):
+        """Per-command median time from the end of the keyword to dispatch, for both strategies."""
+        lines = ['{:12s} {:>5s} {:>11s} {:>9s}'.format('command', 'count', 'partial ms', 'final ms')]
+        for command, times in sorted(self.timings.items()):
+            cells = ['{:.0f}'.format(_median(times[k])) if times[k] else '-' for k in ('partial', 'final')]
+            lines.append('{:12s} {:5d} {:>11s} {:>9s}'.format(
+                command, max(len(times['partial']), len(times['final'])), cells[0], cells[1]))
+        lines.append('fired early {}, final duplicates suppressed {}'.format(self.early, self.suppressed))
+        return '\n'.join(lines)
+
+
+class EnergyGate:
+    def __init__(self, sample_rate=16000, frame_ms=20, margin_db=12, min_db=-55, hangover_ms=500,
+                 preroll_ms=300, adapt_s=5):
+        """
+        Voice activity gate that keeps silent blocks away from the recognizer.
+
+        Each block is split into frames and a frame counts as speech when its
+        RMS level is margin_db above the noise floor. The floor follows the
+        quietest frames: straight down, and up with a time constant of adapt_s.
+        Blocks keep passing for hangover_ms after the last speech frame so word
+        endings are decoded, and when speech starts the last preroll_ms of the
+        skipped audio is passed first so onsets are not clipped.
+
+        Args:
+            sample_rate (int): Sample rate of the 16-bit mono audio.
+            frame_ms (int): Frame length for the level measurement.
+            margin_db (float): How far above the noise floor speech must be.
+            min_db (float): Speech threshold never goes below this (dBFS), so digital silence stays silent.
+            hangover_ms (int): Keep decoding this long after the last speech frame.
+            preroll_ms (int): Skipped audio replayed in front of a speech onset.
+            adapt_s (float): Time constant for the noise floor rising.
+        """
+        self.sample_rate = sample_rate
+        self.frame = sample_rate * frame_ms // 1000
+        self.margin_db = margin_db
+        self.min_db = min_db
+        self.hangover = sample_rate * hangover_ms // 1000
+        self.preroll = sample_rate * preroll_ms // 1000 * 2  # in bytes
+        self.adapt_s = adapt_s
+        self.floor_db = None
+        self.decoded = 0
+        self.skipped = 0
+        self._since_speech = self.hangover  # samples since the last speech frame
+        self._skipped_audio = deque()  # (bytes, arrived) of recently skipped blocks
+        self._skipped_bytes = 0
+        self._open = False
+
+    def levels(self, data):
+        """Return the level of every whole frame in a block, in dBFS."""
+        x = np.frombuffer(data, dtype=np.int16)
+        n = len(x) // self.frame
+        frames = x[:n * self.frame].reshape(n, self.frame).astype(np.float32)
+        rms = np.sqrt(np.mean(frames * frames, axis=1))
+        return 20 * np.log10(rms / 32768 + 1e-9)
+
+    def process(self, data, arrived=None):
+        """
+        Gate one block.
+
+        Args:
+            data (bytes): 16-bit mono samples.
+            arrived (float, optional): When the block was captured, passed through with it.
+
+        Returns:
+            tuple: (list of (bytes, arrived) to decode, True if speech just ended and the
+            recognizer should finish the utterance now).
+        """
+        samples = len(data) // 2
+        db = self.levels(data)
+        if not len(db):
+            return [(data, arrived)] if self._open else [], False
+
+        quiet = float(np.percentile(db, 10))
+        if self.floor_db is None or quiet < self.floor_db:
+            self.floor_db = quiet
+        else:
+            self.floor_db += min(1.0, samples / self.sample_rate / self.adapt_s) * (quiet - self.floor_db)
+        speech = np.flatnonzero(db > max(self.floor_db + self.margin_db, self.min_db))
+
+        was_speaking = self._since_speech < self.hangover
+        if len(speech):
+            self._since_speech = samples - (speech[-1] + 1) * self.frame
+        else:
+            self._since_speech += samples
+
+        if not len(speech) and not was_speaking:
+            # Silence: keep only enough of it for the next pre-roll
+            self.skipped += 1
+            self._skipped_audio.append((data, arrived))
+            self._skipped_bytes += len(data)
+            while self._skipped_bytes - len(self._skipped_audio[0][0]) >= self.preroll:
+                self._skipped_bytes -= len(self._skipped_audio.popleft()[0])
+            ended = self._open
+            self._open = False
+            return [], ended
+
+        self.decoded += 1
+        out = []
+        if not self._open and self._skipped_audio:
+            tail = b''.join(block for block, _ in self._skipped_audio)[-self.preroll:]
+            out.append((tail, self._skipped_audio[-1][1]))
+        self._skipped_audio.clear()
+        self._skipped_bytes = 0
+        self._open = True
+        out.append((data, arrived))
+        return out, False
+
+    def stats(self):
+        total = self.decoded + self.skipped
+        return 'blocks decoded {}, skipped {} ({:.0f}%), noise floor {} dBFS'.format(
+            self.decoded, self.skipped, 100 * self.skipped / total if total else 0,
+            '-' if self.floor_db is None else '{:.0f}'.format(self.floor_db))
+
+
+class AudioRing:
+    def __init__(self, capacity=32, max_lag=1.0, clock=time.perf_counter):
+        """
+        Fixed-size queue of audio blocks between the sound card callback and the recognizer.
+
+        put() never blocks: when the ring is full the oldest block is overwritten.
+        get() skips blocks that have waited longer than max_lag, so after a stall
+        the recognizer jumps forward to live audio instead of working through a
+        backlog of things said seconds ago.
+
+        Args:
+            capacity (int): Blocks the ring holds.
+            max_lag (float): Seconds a block may wait before it is skipped.
+            clock (callable): Time source, the same one the blocks are stamped with.
+        """
+        self.capacity = capacity
+        self.max_lag = max_lag
+        self.clock = clock
+        self.overflows = 0  # blocks overwritten because the ring was full
+        self.skipped = 0  # blocks skipped as too old
+        self._blocks = [None] * capacity
+        self._stamps = [0.0] * capacity
+        self._head = 0
+        self._count = 0
+        self._gap = False
+        self._cond = threading.Condition()
+        self._reset_window()
+
+    def _reset_window(self):
+        self._window_start = self.clock()
+        self._max_depth = 0
+        self._gets = 0
+        self._lag_total = 0.0
+        self._lag_max = 0.0
+
+    def __len__(self):
+        return self._count
+
+    def put(self, data, arrived=None):
+        """Add a block; safe to call from the audio callback."""
+        with self._cond:
+            if self._count == self.capacity:
+                self._blocks[self._head] = None
+                self._head = (self._head + 1) % self.capacity
+                self._count -= 1
+                self.overflows += 1
+                self._gap = True
+            i = (self._head + self._count) % self.capacity
+            self._blocks[i] = data
+            self._stamps[i] = self.clock() if arrived is None else arrived
+            self._count += 1
+            if self._count > self._max_depth:
+                self._max_depth = self._count
+            self._cond.notify()
+
+    def get(self, timeout=None):
+        """
+        Take the oldest block that is still fresh enough.
+
+        Returns:
+            tuple: (data, arrived, gap) where gap is True if audio just before this block
+            was dropped, so the recognizer should not join the two together.
+
+        Raises:
+            queue.Empty: Nothing arrived within timeout seconds.
+        """
+        with self._cond:
+            while True:
+                while self._count == 0:
+                    if not self._cond.wait(timeout):
+                        raise queue.Empty
+                now = self.clock()
+                while self._count and now - self._stamps[self._head] > self.max_lag:
+                    self._blocks[self._head] = None
+                    self._head = (self._head + 1) % self.capacity
+                    self._count -= 1
+                    self.skipped += 1
+                    self._gap = True
+                if self._count:
+                    break
+            data = self._blocks[self._head]
+            arrived = self._stamps[self._head]
+            self._blocks[self._head] = None
+            self._head = (self._head + 1) % self.capacity
+            self._count -= 1
+            gap = self._gap
+            self._gap = False
+            lag = now - arrived
+            self._gets += 1
+            self._lag_total += lag
+            if lag > self._lag_max:
+                self._lag_max = lag
+        return data, arrived, gap
+
+    def stats(self):
+        """Depth, enqueue-to-decode lag and drops since the last call."""
+        with self._cond:
+            line = 'queue depth {} (max {}/{}), lag avg {:.0f} ms max {:.0f} ms, overwritten {}, skipped as stale {}'.format(
+                self._count, self._max_depth, self.capacity,
+                1000 * self._lag_total / self._gets if self._gets else 0, 1000 * self._lag_max,
+                self.overflows, self.skipped)
+            self._reset_window()
+        return line
+
+
+def make_detector(model, sample_rate=16000, grammar=False, vad=True, **options):
+    """
+    Build a recognizer for model and wrap it in a CommandDetector.
+
+    Args:
+        model (vosk.Model): The loaded model.
+        sample_rate (int): Sample rate of the audio that will be fed.
+        grammar (bool): Restrict the recognizer to the command words (see command_grammar()).
+        vad (bool): Put an EnergyGate in front of the recognizer.
+        **options: Passed on to CommandDetector (partial, measure, max_age, log, ...).
+    """
+    from vosk import KaldiRecognizer
+    if grammar:
+        recognizer = KaldiRecognizer(model, sample_rate, command_grammar(options.get('commands', COMMANDS)))
+    else:
+        recognizer = KaldiRecognizer(model, sample_rate)
+    gate = EnergyGate(sample_rate) if vad else None
+    return CommandDetector(recognizer, sample_rate, gate=gate, **options)
+
+
+class CommandSender:
+    def __init__(self, url, timeout=5, max_pending=16, max_age=None, log=print):
+        """
+        Send commands to the ESP32 from a background thread over one kept-alive connection.
+
+        Args:
+            url (str): The control endpoint, e.g. 'http://192.168.4.1/control'.
+            timeout (float): Seconds to wait for the ESP32 before giving up on a command.
+            max_pending (int): Commands that may wait to be sent; beyond this send() drops them.
+            max_age (float, optional): Drop a command instead of sending it if its keyword was
+                spoken more than this many seconds ago, e.g. after the network stalled.
+            log (callable): Called with one line per command sent, or None for no logging.
+        """
+        self.url = url
+        self.timeout = timeout
+        self.log = log
+        self.session = requests.Session()
+        self.sent = 0
+        self.failed = 0
+        self.dropped = 0
+        self.stale = 0
+        self.max_age = max_age
+        self.latencies_ms = []  # send() to response, per command that got one
+        self._queue = queue.Queue(max_pending)
+        self._thread = threading.Thread(target=self._run, name='CommandSender', daemon=True)
+        self._thread.start()
+
+    def send(self, command, spoken=None):
+        """
+        Queue a command and return at once.
+
+        Args:
+            command (str): The ESP32 command.
+            spoken (float, optional): perf_counter() time the keyword was spoken, checked
+                against max_age just before sending; defaults to now.
+
+        Returns:
+            bool: False if the queue was full and the command was dropped.
+        """
+        try:
+            queued = time.perf_counter()
+            self._queue.put_nowait((command, queued, queued if spoken is None else spoken))
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            try:
+                self._send(*item)
+            except Exception as e:
+                # Anything but a network error is a bug; don't let it stop the thread and strand the queue
+                self.failed += 1
+                if self.log:
+                    self.log(f"Error sending {item!r} to ESP32: {type(e).__name__}: {e}")
+
+    def _send(self, command, queued, spoken):
+        start = time.perf_counter()
+        if self.max_age is not None and start - spoken > self.max_age:
+            self.stale += 1
+            if self.log:
+                self.log(f"Dropped {command}: the word was spoken {start - spoken:.1f} s ago")
+            return
+        try:
+            response = self.session.get(self.url, params={'command': command}, timeout=self.timeout)
+            done = time.perf_counter()
+            self.sent += 1
+            self.latencies_ms.append((done - queued) * 1000)
+            if self.log:
+                self.log(f"ESP32 response to {command}: {response.text} (Status: {response.status_code}) "
+                         f"in {(done - queued) * 1000:.1f} ms, {(start - queued) * 1000:.1f} ms of it queued")
+        except requests.RequestException as e:
+            self.failed += 1
+            if self.log:
+                self.log(f"Error sending {command} to ESP32 after {(time.perf_counter() - queued) * 1000:.0f} ms: {e}")
+
+    def summary(self):
+        lat = sorted(self.latencies_ms)
+        if not lat:
+            return 'sent={} failed={} dropped={} stale={}'.format(self.sent, self.failed, self.dropped, self.stale)
+        return 'sent={} failed={} dropped={} stale={} p50={:.1f} ms max={:.1f} ms'.format(
+            self.sent, self.failed, self.dropped, self.stale, lat[len(lat) // 2], lat[-1])
+
+    def close(self, wait=True):
+        """
+        Stop the sender thread.
+
+        Args:
+            wait (bool): Send the commands already queued and wait for them; otherwise
+                drop them (counted as dropped) and return at once, even if the ESP32 hangs.
+        """
+        if wait:
+            self._queue.put(None)  # Behind the queued commands
+            self._thread.join()
+            self.session.close()
+            return
+        try:
+            while True:
+                self._queue.get_nowait()
+                self.dropped += 1
+        except queue.Empty:
+            pass
+        try:
+            self._queue.put_nowait(None)
+        except queue.Full:
+            pass  # Raced with a late send(); the thread is a daemon and won't hold up exit
@@ -0,0 +1,229 @@
+# Binary UDP control channel for the Scorpion arm.
+# A command is one 7-byte datagram: opcode (u8), sequence number (u16) and
+# argument (u32), big-endian. The ESP32 answers every datagram with a 4-byte
+# ack: opcode | 0x80, the same sequence number, and a status byte. Retries
+# reuse the sequence number, so a repeated command is acked but not re-run.
+import socket
+import struct
+import time
+
+try:
+    import uasyncio as asyncio
+except ImportError:
+    import asyncio
+
+PORT = 4210
+COMMAND = '>BHI'
+ACK = '>BHB'
+COMMAND_SIZE = struct.calcsize(COMMAND)
+ACK_SIZE = struct.calcsize(ACK)
+
+# Ack status codes
+OK = 0
+BAD_ARG = 1
+UNKNOWN = 2
+ERROR = 3
+BAD_PACKET = 4
+
+PING = 0x7F
+ALL_CHIPS = 0xFF
+
+
+def _no_params(arg):
+    return {}
+
+
+def _deg(arg):
+    return {'deg': str(arg)}
+
+
+def _chip_ms(arg):
+    # chip in the top byte, duration in ms in the low 24 bits (0 = stay on)
+    return {'chip': str(arg >> 24), 'ms': str(arg & 0xFFFFFF)}
+
+
+def _chip(arg):
+    return {} if arg == ALL_CHIPS else {'chip': str(arg)}
+
+
+def _rgb(arg):
+    return {'rgb': '{:06x}'.format(arg & 0xFFFFFF)}
+
+
+# opcode -> (HTTP route name, argument -> query parameters)
+OPCODES = {
+    0x01: ('LIGHT_ON', _no_params),
+    0x02: ('LIGHT_OFF', _no_params),
+    0x03: ('LIGHT_HOLD', _no_params),
+    0x04: ('MOVE_LEFT', _no_params),
+    0x05: ('MOVE_RIGHT', _no_params),
+    0x06: ('MOVE_MID', _no_params),
+    0x10: ('MOVE', _deg),
+    0x11: ('INFLATE', _chip_ms),
+    0x12: ('DEFLATE', _chip_ms),
+    0x13: ('HOLD', _chip),
+    0x14: ('LED', _rgb),
+}
+OPCODE_FOR = {name: opcode for opcode, (name, _) in OPCODES.items()}
+
+
+class UDPControl:
+    def __init__(self, router, host='0.0.0.0', port=PORT, poll_ms=2):
+        """
+        Listen for binary command datagrams and run them through the HTTP route table.
+
+        Args:
+            router (Router): The same Router the HTTP server uses, so both channels drive
+                the same SRControl/Servo/NeoPixel actions.
+            host (str): Address to bind to.
+            port (int): UDP port to bind to.
+            poll_ms (int): How often the socket is polled while idle.
+        """
+        self.router = router
+        self.poll_ms = poll_ms
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind(socket.getaddrinfo(host, port)[0][-1])
+        self.sock.setblocking(False)
+        self._ack = bytearray(ACK_SIZE)
+        self._last_seq = {}  # client address -> (seq, status) of the last datagram run
+        self.received = 0
+        self.duplicates = 0
+
+    def handle(self, packet, addr):
+        """
+        Run one datagram and return the ack bytes to send back.
+        """
+        if len(packet) != COMMAND_SIZE:
+            struct.pack_into(ACK, self._ack, 0, 0xFF, 0, BAD_PACKET)
+            return self._ack
+        opcode, seq, arg = struct.unpack(COMMAND, packet)
+        self.received += 1
+
+        last = self._last_seq.get(addr)
+        if last is not None and last[0] == seq:
+            # A retry of a command that already ran: ack again, don't run it twice
+            self.duplicates += 1
+            status = last[1]
+        else:
+            status = self._run(opcode, arg)
+            if len(self._last_seq) > 8 and addr not in self._last_seq:
+                self._last_seq.clear()
+            self._last_seq[addr] = (seq, status)
+        struct.pack_into(ACK, self._ack, 0, opcode | 0x80, seq, status)
+        return self._ack
+
+    def _run(self, opcode, arg):
+        if opcode == PING:
+            return OK
+        entry = OPCODES.get(opcode)
+        if entry is None:
+            return UNKNOWN
+        name, to_params = entry
+        handler = self.router.routes.get(name)
+        if handler is None:
+            return UNKNOWN
+        try:
+            result = handler(to_params(arg))
+        except ValueError:
+            return BAD_ARG
+        except Exception as e:
+            print('Error:', e)
+            return ERROR
+        body, work = result
+        if work is not None:
+            asyncio.create_task(work)
+        return OK
+
+    async def serve(self):
+        """Receive and answer datagrams forever. Run this as a task next to the HTTP server."""
+        sock = self.sock
+        while True:
+            try:
+                packet, addr = sock.recvfrom(16)
+            except OSError:
+                await asyncio.sleep(self.poll_ms / 1000)
+                continue
+            try:
+                sock.sendto(self.handle(packet, addr), addr)
+            except OSError as e:
+                print('Error:', e)
+
+
+class UDPClient:
+    def __init__(self, host='192.168.4.1', port=PORT, timeout=0.2, retries=3):
+        """
+        Host-side client: send a command, wait for its ack, and retry on timeout.
+
+        Args:
+            host (str): ESP32 address.
+            port (int): ESP32 UDP control port.
+            timeout (float): Seconds to wait for each ack.
+            retries (int): Extra attempts after the first one times out.
+        """
+        self.addr = (host, port)
+        self.retries = retries
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.settimeout(timeout)
+        self.seq = 0
+        self.last_rtt_ms = None
+        self.sent = 0
+        self.resent = 0
+        self.lost = 0
+
+    def send(self, opcode, arg=0):
+        """
+        Send one command and wait for its ack.
+
+        Returns:
+            tuple: (status, round-trip time in ms). status is None if every attempt timed out.
+        """
+        self.seq = (self.seq + 1) & 0xFFFF
+        packet = struct.pack(COMMAND, opcode, self.seq, arg)
+        for attempt in range(self.retries + 1):
+            if attempt:
+                self.resent += 1
+            start = time.perf_counter()
+            self.sock.sendto(packet, self.addr)
+            self.sent += 1
+            deadline = start + self.sock.gettimeout()
+            while True:
+                try:
+                    data = self.sock.recv(16)
+                except socket.timeout:
+                    break
+                if len(data) != ACK_SIZE:
+                    continue
+                ack_op, ack_seq, status = struct.unpack(ACK, data)
+                if ack_seq == self.seq and ack_op == opcode | 0x80:
+                    self.last_rtt_ms = (time.perf_counter() - start) * 1000.0
+                    return status, self.last_rtt_ms
+                # A late ack for an earlier attempt or command; keep waiting for ours
+                if time.perf_counter() >= deadline:
+                    break
+        self.lost += 1
+        return None, None
+
+    def command(self, name):
+        """Send a fixed command by its HTTP name, e.g. 'MOVE_LEFT'."""
+        return self.send(OPCODE_FOR[name])
+
+    def ping(self):
+        return self.send(PING)
+
+    def move(self, deg):
+        return self.send(OPCODE_FOR['MOVE'], deg)
+
+    def inflate(self, chip=0, ms=0):
+        return self.send(OPCODE_FOR['INFLATE'], (chip << 24) | (ms & 0xFFFFFF))
+
+    def deflate(self, chip=0, ms=0):
+        return self.send(OPCODE_FOR['DEFLATE'], (chip << 24) | (ms & 0xFFFFFF))
+
+    def hold(self, chip=ALL_CHIPS):
+        return self.send(OPCODE_FOR['HOLD'], chip)
+
+    def led(self, r, g, b):
+        return self.send(OPCODE_FOR['LED'], (r << 16) | (g << 8) | b)
+
+    def close(self):
+        self.sock.close()
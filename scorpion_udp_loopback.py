@@ -0,0 +1,116 @@
+# Localhost loopback harness for the UDP control channel.
+# Starts UDPControl and the HTTP ControlServer with the stand-in router from
+# scorpion_server.py, then drives both from a client thread: checks every ack,
+# drops some datagrams on purpose to exercise retries, and compares UDP
+# round-trip times with one-TCP-connection-per-command HTTP.
+import http.client
+import socket
+import sys
+import threading
+import time
+
+import asyncio
+
+from bench_util import free_port, percentile
+from scorpion_server import ControlServer, fake_router
+from scorpion_udp import UDPClient, UDPControl, OK, BAD_ARG, UNKNOWN
+
+
+class LossyUDPControl(UDPControl):
+    """Lose every drop_every-th command or its ack, like a noisy soft-AP."""
+
+    def __init__(self, *args, drop_every=0, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.drop_every = drop_every
+        self.dropped = 0
+        self._count = 0
+
+    async def serve(self):
+        sock = self.sock
+        while True:
+            try:
+                packet, addr = sock.recvfrom(16)
+            except OSError:
+                await asyncio.sleep(self.poll_ms / 1000)
+                continue
+            self._count += 1
+            if self.drop_every and self._count % self.drop_every == 0:
+                self.dropped += 1
+                # Alternate between losing the command and losing its ack
+                if self.dropped % 2:
+                    continue
+                self.handle(packet, addr)
+                continue
+            sock.sendto(self.handle(packet, addr), addr)
+
+
+def run_clients(udp_port, http_port, rounds, results):
+    client = UDPClient('127.0.0.1', udp_port, timeout=0.05, retries=5)
+    checks = [
+        (lambda: client.ping(), OK),
+        (lambda: client.command('LIGHT_ON'), OK),
+        (lambda: client.move(37), OK),
+        (lambda: client.move(200), BAD_ARG),
+        (lambda: client.inflate(2, 1500), OK),
+        (lambda: client.led(255, 0, 0), OK),
+        (lambda: client.hold(), UNKNOWN),  # the stand-in router has no HOLD route
+        (lambda: client.send(0x55), UNKNOWN),
+    ]
+    for call, expected in checks:
+        status, rtt = call()
+        assert status == expected, (status, expected)
+
+    udp_rtts = []
+    for i in range(rounds):
+        status, rtt = client.command('MOVE_MID')
+        assert status == OK
+        udp_rtts.append(rtt)
+
+    http_rtts = []
+    for i in range(rounds):
+        start = time.perf_counter()
+        conn = http.client.HTTPConnection('127.0.0.1', http_port)
+        conn.request('GET', '/control?command=MOVE_MID', headers={'Connection': 'close'})
+        resp = conn.getresponse()
+        resp.read()
+        conn.close()
+        assert resp.status == 200
+        http_rtts.append((time.perf_counter() - start) * 1000.0)
+
+    results['client'] = client
+    results['udp'] = udp_rtts
+    results['http'] = http_rtts
+    client.close()
+
+
+async def main(rounds=200, drop_every=10):
+    udp_port = free_port(socket.SOCK_DGRAM)
+    http_port = free_port(socket.SOCK_STREAM)
+    router = fake_router(animation_ms=0)
+    udp = LossyUDPControl(router, host='127.0.0.1', port=udp_port, poll_ms=1, drop_every=drop_every)
+    server = ControlServer(router, host='127.0.0.1', port=http_port, backlog=16)
+    await server.start()
+    udp_task = asyncio.create_task(udp.serve())
+
+    results = {}
+    thread = threading.Thread(target=run_clients, args=(udp_port, http_port, rounds, results))
+    thread.start()
+    while thread.is_alive():
+        await asyncio.sleep(0.01)
+    udp_task.cancel()
+    if 'client' not in results:
+        print('Client thread failed')
+        return 1
+
+    client = results['client']
+    print('UDP: {} datagrams sent, {} retries, {} lost, {} dropped by server, {} duplicate(s) acked without re-running'.format(
+        client.sent, client.resent, client.lost, udp.dropped, udp.duplicates))
+    print('{:5s}  {:>8s}  {:>8s}  {:>8s}'.format('', 'p50 ms', 'p95 ms', 'max ms'))
+    for name in ('udp', 'http'):
+        rtts = results[name]
+        print('{:5s}  {:8.3f}  {:8.3f}  {:8.3f}'.format(name, percentile(rtts, 50), percentile(rtts, 95), max(rtts)))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,197 @@
+import machine
+import math
+from array import array
+
+
+#Servo library
+class Servo:
+    def __init__(self,pin_id,min_us=544.0,max_us=2400.0,min_deg=0.0,max_deg=180.0,freq=50,resolution=1):
+        """
+        Hobby servo on a PWM pin.
+
+        write() looks the pulse width up in a table precomputed here, so the
+        hot path is integer-only for whole (or table-step) angles.
+
+        Args:
+            pin_id (int): GPIO pin the signal wire is connected to.
+            min_us (float): Pulse width at min_deg.
+            max_us (float): Pulse width at max_deg.
+            min_deg (float): Angle of the shortest pulse.
+            max_deg (float): Angle of the longest pulse.
+            freq (int): PWM frequency in Hz.
+            resolution (int): Table steps per degree (2 gives half-degree steps).
+        """
+        self.pwm = machine.PWM(machine.Pin(pin_id))
+        self.pwm.freq(freq)
+        self._duty_ns = 0
+        self._slope = (min_us-max_us)/(math.radians(min_deg)-math.radians(max_deg))
+        self._offset = min_us
+
+        # duty_ns for every table step from min_deg to max_deg
+        self.resolution = resolution
+        self._min_deg = int(min_deg)
+        steps = int((max_deg - self._min_deg) * resolution)
+        us_per_deg = (max_us - min_us) / (max_deg - min_deg)
+        self._table = array('i', (int((min_us + us_per_deg * (self._min_deg + i / resolution - min_deg)) * 1000.0)
+                                  for i in range(steps + 1)))
+
+    @property
+    def current_us(self):
+        return self._duty_ns / 1000
+
+    def write(self,deg):
+        if type(deg) is int:
+            i = (deg - self._min_deg) * self.resolution
+        else:
+            i = int((deg - self._min_deg) * self.resolution + 0.5)
+        if 0 <= i < len(self._table):
+            self.write_ns(self._table[i])
+        else:
+            # Outside the table: extrapolate like the float path always did
+            self.write_rad(math.radians(deg))
+
+    def read(self):
+        return math.degrees(self.read_rad())
+
+    def write_rad(self,rad):
+        self.write_us(rad*self._slope+self._offset)
+
+    def read_rad(self):
+        return (self.current_us-self._offset)/self._slope
+
+    def write_us(self,us):
+        self.write_ns(int(us*1000.0))
+
+    def write_ns(self,ns):
+        self._duty_ns = ns
+        self.pwm.duty_ns(ns)
+
+    def read_us(self):
+        return self.current_us
+
+    def read_ns(self):
+        return self._duty_ns
+
+    def off(self):
+        self.pwm.duty_ns(0)
+
+
+def write_many(servos, degrees):
+    """
+    Move several servos in one call, e.g. write_many((base, claw), (90, 30)).
+    """
+    for i in range(len(servos)):
+        servos[i].write(degrees[i])
+
+
+class ServoMotion:
+    def __init__(self, servo, max_speed=180, accel=720, period_ms=20):
+        """
+        Move a servo along a trapezoidal velocity profile instead of jumping to the target.
+
+        step() advances the move by one period; start_timer() calls it from a
+        hardware timer so move_to() returns at once. A new move_to() takes over
+        from the current position and velocity, so it can pre-empt a move in flight.
+
+        Args:
+            servo (Servo): The servo to drive.
+            max_speed (float): Cruise speed in degrees per second.
+            accel (float): Acceleration and deceleration in degrees per second squared.
+            period_ms (int): Time between steps.
+        """
+        self.servo = servo
+        self.period_ms = period_ms
+        table = servo._table
+        ns_per_deg = (table[-1] - table[0]) / ((len(table) - 1) / servo.resolution)
+        dt = period_ms / 1000
+        # Everything below is integer ns of pulse width, per step
+        self.max_step = max(1, int(max_speed * ns_per_deg * dt))
+        self.accel_step = max(1, int(accel * ns_per_deg * dt * dt))
+        self.pos = servo.read_ns()
+        self.velocity = 0
+        self.target = self.pos
+        self._timer = None
+
+    @property
+    def moving(self):
+        return self.pos != self.target or self.velocity != 0
+
+    def move_to(self, deg):
+        """Set a new target angle. Returns straight away; the move happens in step()."""
+        servo = self.servo
+        if self.pos == 0:
+            # Position unknown (never written): go straight there, as write() would
+            servo.write(deg)
+            self.pos = self.target = servo.read_ns()
+            self.velocity = 0
+            return
+        i = int((deg - servo._min_deg) * servo.resolution + 0.5)
+        i = min(max(i, 0), len(servo._table) - 1)
+        self.target = servo._table[i]
+
+    def stop(self):
+        """Stop where the servo is now, without decelerating."""
+        self.target = self.pos
+        self.velocity = 0
+
+    def _stop_distance(self, speed):
+        """Distance covered while braking from speed to rest, one accel_step per period."""
+        n = speed // self.accel_step
+        return n * speed - self.accel_step * n * (n + 1) // 2
+
+    def step(self):
+        """
+        Advance the move by one period and write the new pulse width.
+
+        Returns:
+            bool: True while the servo is still moving.
+        """
+        remaining = self.target - self.pos
+        v = self.velocity
+        a = self.accel_step
+        if remaining == 0 and abs(v) <= a:
+            self.velocity = 0
+            return False
+
+        if v != 0 and (remaining == 0 or (remaining > 0) != (v > 0)):
+            # Pre-empted while heading the other way (or past the target): brake before turning round
+            if v > 0:
+                v = v - a if v > a else 0
+            else:
+                v = v + a if v < -a else 0
+        else:
+            direction = 1 if remaining > 0 else -1
+            dist = remaining * direction
+            speed = v * direction
+            # Speed up or hold speed only if we could still stop in time afterwards
+            up = min(speed + a, self.max_step)
+            if dist - up >= self._stop_distance(up):
+                speed = up
+            elif dist - speed < self._stop_distance(speed):
+                speed = max(speed - a, a)  # Decelerate, but keep creeping until we arrive
+            if speed >= dist:
+                if dist <= a and v * direction - dist <= a:
+                    speed = dist  # Land on the target: slowing to it and stopping there are both in the limit
+                else:
+                    # Pre-empted with a target inside the braking distance: keep braking
+                    # at the limit, overshoot, and come back
+                    speed = max(v * direction - a, 0)
+            v = speed * direction
+
+        self.pos += v
+        # Keep the landing speed too: a new target given before the next step has to start from it
+        self.velocity = v
+        self.servo.write_ns(self.pos)
+        return self.moving
+
+    def start_timer(self, timer_id=2):
+        """Call step() every period_ms from a hardware timer."""
+        self.stop_timer()
+        self._timer = machine.Timer(timer_id)
+        self._timer.init(period=self.period_ms, mode=machine.Timer.PERIODIC, callback=lambda t: self.step())
+
+    def stop_timer(self):
+        """Stop the background timer started by start_timer()."""
+        if self._timer is not None:
+            self._timer.deinit()
+            self._timer = None
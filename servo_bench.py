@@ -0,0 +1,108 @@
+# Host-side microbenchmark for Servo.write().
+# Compares the original float path (radians, float multiply, int(us*1000.0))
+# with the precomputed duty table, against a fake PWM that only records the
+# last duty. Also checks both paths give the same pulse for every whole degree.
+# CPython floats are cheap; on the ESP32 every float result is a heap
+# allocation, so the gap there is wider than these host numbers show.
+import math
+import sys
+import time
+import types
+
+
+class FakePin:
+    OUT = 1
+    IN = 0
+
+    def __init__(self, pin_id, mode=None):
+        self.id = pin_id
+
+
+class FakePWM:
+    def __init__(self, pin, freq=None, duty_ns=None):
+        self.pin = pin
+        self.ns = 0
+        self.calls = 0
+
+    def freq(self, f=None):
+        pass
+
+    def duty_ns(self, ns=None):
+        if ns is None:
+            return self.ns
+        self.ns = ns
+        self.calls += 1
+
+
+fake_machine = types.ModuleType("machine")
+fake_machine.Pin = FakePin
+fake_machine.PWM = FakePWM
+sys.modules["machine"] = fake_machine
+
+from servo import Servo, write_many  # noqa: E402
+
+
+class FloatServo:
+    """The original float-only Servo write path, kept here for comparison."""
+
+    def __init__(self,pin_id,min_us=544.0,max_us=2400.0,min_deg=0.0,max_deg=180.0,freq=50):
+        self.pwm = FakePWM(FakePin(pin_id))
+        self.pwm.freq(freq)
+        self.current_us = 0.0
+        self._slope = (min_us-max_us)/(math.radians(min_deg)-math.radians(max_deg))
+        self._offset = min_us
+
+    def write(self,deg):
+        self.write_rad(math.radians(deg))
+
+    def write_rad(self,rad):
+        self.write_us(rad*self._slope+self._offset)
+
+    def write_us(self,us):
+        self.current_us=us
+        self.pwm.duty_ns(int(self.current_us*1000.0))
+
+
+def time_writes(write, angles, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for deg in angles:
+            write(deg)
+    return (time.perf_counter() - start) / (rounds * len(angles)) * 1e9
+
+
+def main(rounds=2000):
+    whole = list(range(181))
+    halves = [d / 2 for d in range(361)]
+
+    old = FloatServo(4)
+    new = Servo(4)
+    fine = Servo(4, resolution=2)
+    mismatched = 0
+    for deg in whole:
+        old.write(deg)
+        new.write(deg)
+        if abs(old.pwm.ns - new.pwm.ns) > 1:
+            mismatched += 1
+    print("whole degrees where table and float differ by more than 1 ns:", mismatched)
+
+    rows = [
+        ("float path, int degrees", time_writes(old.write, whole, rounds)),
+        ("table, int degrees", time_writes(new.write, whole, rounds)),
+        ("float path, half degrees", time_writes(old.write, halves, rounds // 2)),
+        ("table res=2, half degrees", time_writes(fine.write, halves, rounds // 2)),
+    ]
+    servos = [Servo(pin) for pin in (4, 12, 13, 14)]
+    pose = [10, 90, 135, 180]
+    start = time.perf_counter()
+    for _ in range(rounds * 45):
+        write_many(servos, pose)
+    rows.append(("write_many, per servo", (time.perf_counter() - start) / (rounds * 45 * len(servos)) * 1e9))
+
+    print("{:26s}  {:>10s}".format("path", "ns/write"))
+    for name, ns in rows:
+        print("{:26s}  {:10.0f}".format(name, ns))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+# Simulated-time check for ServoMotion.
+# Steps the planner on a virtual 20 ms timer and checks every pulse written to
+# the fake PWM: steps land on the timer period, speed and acceleration stay in
+# their limits, the profile accelerates, cruises and decelerates, and the move
+# ends exactly on the target. Two more runs pre-empt a move half way through:
+# once back the other way, and once with a target ahead but closer than the
+# braking distance, which has to overshoot and come back. Last, many runs with
+# random targets given at random moments (including right after landing) check
+# the speed and acceleration limits on every step.
+import random
+
+import servo_bench  # noqa: F401  (installs the fake machine module)
+from servo import Servo, ServoMotion
+
+
+def simulate(motion, t_end_ms, preempt=None):
+    """Step motion on a virtual timer; returns [(t_ms, duty_ns)] for every step that wrote a pulse."""
+    pwm = motion.servo.pwm
+    trace = []
+    t = 0
+    while t <= t_end_ms:
+        if preempt and t == preempt[0]:
+            motion.move_to(preempt[1])
+        t += motion.period_ms
+        before = pwm.calls
+        motion.step()
+        if pwm.calls != before:
+            trace.append((t, pwm.ns))
+    return trace
+
+
+def check(motion, trace, start_ns, preempted=False):
+    period = motion.period_ms
+    a = motion.accel_step
+    vmax = motion.max_step
+    times = [t for t, _ in trace]
+    assert all(b - a_ == period for a_, b in zip(times, times[1:])), "steps not on the timer period"
+
+    positions = [start_ns] + [ns for _, ns in trace]
+    speeds = [b - a_ for a_, b in zip(positions, positions[1:])]
+    assert all(abs(v) <= vmax for v in speeds), "speed limit exceeded"
+    # Every change obeys the accel limit, including starting from and coming to rest
+    changes = [abs(b - a_) for a_, b in zip([0] + speeds, speeds + [0])]
+    assert all(c <= a for c in changes), "acceleration limit exceeded"
+    assert trace[-1][1] == motion.target, "did not finish on the target"
+    assert not motion.moving
+    if not preempted:
+        cruise = sum(1 for v in speeds if abs(v) == vmax)
+        assert cruise > 0, "never reached cruise speed"
+    return speeds
+
+
+def random_preemption(runs=3000, steps=300, seed=1):
+    """Re-target at random while moving; every step's change of speed must stay within accel_step."""
+    rng = random.Random(seed)
+    servo = Servo(12)
+    worst = 0
+    for _ in range(runs):
+        servo.write(rng.uniform(0, 180))
+        motion = ServoMotion(servo, max_speed=rng.choice((60, 180, 400)), accel=rng.choice((200, 720, 3000)),
+                             period_ms=rng.choice((10, 20)))
+        chance = rng.choice((0.02, 0.1, 0.5))
+        positions = [motion.pos]
+        for _ in range(steps):
+            if rng.random() < chance:
+                motion.move_to(rng.uniform(0, 180))
+            motion.step()
+            positions.append(motion.pos)
+        speeds = [b - a for a, b in zip(positions, positions[1:])]
+        assert all(abs(v) <= motion.max_step for v in speeds), "speed limit exceeded"
+        changes = [abs(b - a) for a, b in zip([0] + speeds, speeds)]
+        assert all(c <= motion.accel_step for c in changes), "acceleration limit exceeded"
+        worst = max(worst, max(changes) / motion.accel_step)
+    return worst
+
+
+def main():
+    servo = Servo(12)
+    servo.write(0)
+    motion = ServoMotion(servo, max_speed=180, accel=720, period_ms=20)
+    start = servo.read_ns()
+    motion.move_to(180)
+    trace = simulate(motion, 3000)
+    speeds = check(motion, trace, start)
+    print("0 -> 180 deg: {} steps, {} ms, peak {} ns/step, final {} ns".format(
+        len(trace), trace[-1][0], max(abs(v) for v in speeds), trace[-1][1]))
+
+    servo.write(0)
+    motion = ServoMotion(servo, max_speed=180, accel=720, period_ms=20)
+    start = servo.read_ns()
+    motion.move_to(180)
+    trace = simulate(motion, 4000, preempt=(400, 45))
+    speeds = check(motion, trace, start, preempted=True)
+    peak = max(ns for _, ns in trace)
+    print("0 -> 180 pre-empted to 45 at 400 ms: {} steps, {} ms, furthest {} ns, final {} ns".format(
+        len(trace), trace[-1][0], peak, trace[-1][1]))
+
+    # At 600 ms it cruises at about 85 deg with some 22 deg of braking distance: 95 deg is too close
+    servo.write(0)
+    motion = ServoMotion(servo, max_speed=180, accel=720, period_ms=20)
+    start = servo.read_ns()
+    motion.move_to(180)
+    trace = simulate(motion, 4000, preempt=(600, 95))
+    speeds = check(motion, trace, start, preempted=True)
+    peak = max(ns for _, ns in trace)
+    assert peak > motion.target, "should have overshot the close target"
+    print("0 -> 180 pre-empted to 95 at 600 ms: {} steps, {} ms, overshot by {} ns, final {} ns".format(
+        len(trace), trace[-1][0], peak - motion.target, trace[-1][1]))
+
+    worst = random_preemption()
+    print("random re-targets: 3000 runs, largest change of speed {:.2f} x accel_step".format(worst))
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+# Timeline checks for the ESP32 scripts, run on the laptop with hostsim.
+# Each scenario simulates up to 30 seconds of device time in a few
+# milliseconds and asserts on the recorded pin/PWM/SPI timeline.
+# The Scorpion controller itself can't run here (hostsim has no uasyncio or
+# sockets), so its shift register is checked on its own in inflate().
+import random
+import time
+
+import hostsim
+
+sim = None
+
+
+def fresh():
+    global sim
+    sim = hostsim.install()
+    return sim
+
+
+def jumpscare():
+    """ODTL_Scaffold 2_ESP32 code.py: a JUMPSCARE arriving at 5 s plays 5 short tones then 1 s at 1500 Hz."""
+    fresh()
+    random.seed(3)
+    sim.uart_input(2, 5.0, b'JUMPSCARE\n')
+    sim.run_script('ODTL_Scaffold 2_ESP32 code.py', seconds=30)
+
+    assert sim.events('UART(2)', 'write')[0][3] == b'ESP32 ready\n'
+    buzzer = [(t, v) for t, _, _, v in sim.events('PWM(5)', 'duty_u16') if t >= 5000]
+    starts = [t for t, v in buzzer if v]
+    stops = [t for t, v in buzzer if not v]
+    # Picked up on the next 100 ms pass of the main loop, or after an ambient effect finishes
+    assert 5000 <= starts[0] < 5000 + 100 + 1000, starts[0]
+    lengths = [round(stop - start) for start, stop in zip(starts[:6], stops[:6])]
+    assert lengths == [100] * 5 + [1000], lengths
+    gaps = [round(b - a) for a, b in zip(starts[:6], starts[1:6])]
+    assert gaps == [150] * 5, gaps
+    freqs = [v for t, _, _, v in sim.events('PWM(5)', 'freq') if t >= starts[0] - 1][:6]
+    assert all(800 <= f <= 2000 for f in freqs[:5]) and freqs[5] == 1500, freqs
+    return 'jumpscare at {:.0f} ms, tones {} ms'.format(starts[0], lengths)
+
+
+def piano():
+    """touchpad piano code final.py: holding E4 (GPIO33) from 2 s to 2.5 s plays 329 Hz once for 200 ms."""
+    fresh()
+    sim.touch(33, lambda t: 50 if 2.0 <= t < 2.5 else 400)
+    sim.run_script('touchpad piano code final.py', seconds=5)
+
+    notes = sim.events('PWM(26)', 'freq')
+    assert [v for _, _, _, v in notes] == [329], notes
+    duty = [(t, v) for t, _, _, v in sim.events('PWM(26)', 'duty_u16')]
+    assert len(duty) == 2 and duty[0][1] and not duty[1][1], duty
+    assert 2000 <= duty[0][0] < 2000 + 8 * 0.5 + 1, duty  # one pass over the 8 pads
+    assert round(duty[1][0] - duty[0][0]) == 200, duty
+    return 'note on at {:.1f} ms for {:.0f} ms'.format(duty[0][0], duty[1][0] - duty[0][0])
+
+
+def inflate():
+    """SRControl on SPI: inflate chip 0 for 15 s, released by tick() every 10 ms as run() does, over a 30 s run."""
+    fresh()
+    from srcontrol import SRControl
+    src = SRControl(25, 33, 32, 23, spi_id=1, miso_pin=39)
+    src.inflate(0, 15)
+    src.inflate(0, 15)  # Same state again: no second shift-out
+    for _ in range(3000):
+        sim.run_for(0.01)
+        src.tick()
+
+    writes = sim.events('SPI(1)', 'write')
+    assert [v for _, _, _, v in writes] == [b'\x03', b'\x00'], writes
+    released = writes[1][0] - writes[0][0]
+    assert 15000 <= released <= 15000 + 10, released  # within one 10 ms tick period
+    latches = [t for t, _, _, v in sim.events('Pin(32)', 'value') if v]
+    assert len(latches) == 2, latches
+    return 'relays on for {:.0f} ms'.format(released)
+
+
+def main():
+    for scenario in (jumpscare, piano, inflate):
+        start = time.perf_counter()
+        result = scenario()
+        elapsed = (time.perf_counter() - start) * 1000
+        print('{:10s} {:8.1f} s simulated in {:6.1f} ms: {}'.format(
+            scenario.__name__, sim.clock.now_us / 1e6, elapsed, result))
+    hostsim.uninstall()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,392 @@
+# Resident recognizer for the Scorpion speech client.
+# Loading the Vosk model takes seconds, and the speech client used to pay that
+# on every launch (and every relaunch after the ESP32 link dropped). This
+# daemon loads the model once and serves recognizers over a Unix socket; the
+# speech client streams its audio blocks in and gets commands back. It is used
+# only when the client's DAEMON flag is on; the first client to find no daemon
+# then starts one, and it stays up until stopped with --stop.
+#
+#   python speech_daemon.py                 # run in the foreground
+#   python speech_daemon.py --stop          # stop a running daemon
+#   python speech_daemon.py --bench         # time a cold and a warm attach
+#
+# Audio blocks carry their perf_counter() capture time; on Linux and macOS
+# that clock is system-wide, so the daemon can judge command age and latency.
+#
+# The socket carries live microphone audio one way and arm commands the other,
+# so it lives in a directory only this user can enter ($XDG_RUNTIME_DIR, or a
+# mode 0700 directory in the temp dir), and both ends check that before using it.
+import argparse
+import errno
+import json
+import os
+import socket
+import socketserver
+import stat
+import struct
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+
+def _socket_dir():
+    runtime = os.environ.get('XDG_RUNTIME_DIR')
+    if runtime:
+        return os.path.join(runtime, 'scorpion-speech')
+    user = os.getuid() if hasattr(os, 'getuid') else os.environ.get('USERNAME', 'user')
+    return os.path.join(tempfile.gettempdir(), 'scorpion-speech-{}'.format(user))
+
+
+SOCKET_PATH = os.path.join(_socket_dir(), 'speech.sock')
+MODEL_PATH = 'vosk-model-small-en-us-0.15'
+
+# Every message is a type byte and a payload length, then the payload
+HEADER = '>cI'
+HEADER_SIZE = struct.calcsize(HEADER)
+HELLO = b'H'  # client -> daemon: JSON model path and detector options; answered with READY or ERROR
+READY = b'R'  # JSON: model load time, daemon uptime, clients served
+ERROR = b'E'  # JSON: {'error': why the HELLO can't be served, or what came before it}; then the daemon hangs up
+AUDIO = b'A'  # client -> daemon: capture time (double) + 16-bit mono samples; answered with DONE
+FLUSH = b'F'  # end of the audio: finish the utterance; answered with DONE
+DISCARD = b'X'  # drop the utterance in progress; answered with DONE
+USAGE = b'U'  # answered with DONE holding usage and report text
+STOP = b'Q'  # shut the daemon down
+DONE = b'D'  # JSON: {'commands': [[command, spoken], ...], 'log': [...], ...}
+ARRIVED = '>d'
+ARRIVED_SIZE = struct.calcsize(ARRIVED)
+
+
+def private_dir(path, create=False):
+    """
+    Check that only this user can reach sockets in a directory: it must be a real
+    directory (not a link), owned by this user, with no group or other permissions.
+
+    Args:
+        path (str): The directory.
+        create (bool): Make it, with mode 0700, if it does not exist.
+
+    Raises:
+        PermissionError: Another user owns the directory or can get into it.
+        FileNotFoundError: It does not exist and create is False.
+    """
+    if create:
+        os.makedirs(path, mode=0o700, exist_ok=True)
+    st = os.lstat(path)
+    if not stat.S_ISDIR(st.st_mode) or st.st_uid != os.getuid() or st.st_mode & 0o077:
+        raise PermissionError('{} must be a directory of yours that only you can use (mode 0700); '
+                              'someone else could be listening on the socket in it'.format(path))
+
+
+def send_message(sock, kind, payload=b''):
+    sock.sendall(struct.pack(HEADER, kind, len(payload)) + payload)
+
+
+def _recv_exact(sock, n):
+    buf = bytearray(n)
+    view = memoryview(buf)
+    got = 0
+    while got < n:
+        k = sock.recv_into(view[got:])
+        if not k:
+            raise ConnectionError('Connection closed')
+        got += k
+    return bytes(buf)
+
+
+def recv_message(sock):
+    """Returns (type byte, payload bytes)."""
+    kind, length = struct.unpack(HEADER, _recv_exact(sock, HEADER_SIZE))
+    return kind, _recv_exact(sock, length) if length else b''
+
+
+class RecognizerDaemon(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_path=SOCKET_PATH, model_path=MODEL_PATH):
+        """
+        Listen on socket_path straight away and load the model in the background;
+        clients that attach during the load wait for it.
+
+        Raises:
+            OSError: Another daemon is already answering on socket_path.
+            PermissionError: The directory of socket_path is not private to this user.
+        """
+        private_dir(os.path.dirname(os.path.abspath(socket_path)), create=True)
+        if os.path.exists(socket_path):
+            try:
+                _connect(socket_path).close()
+            except OSError:
+                os.unlink(socket_path)  # left behind by a daemon that died
+            else:
+                raise OSError(errno.EADDRINUSE, 'A recognizer daemon is already running on ' + socket_path)
+        super().__init__(socket_path, _ClientHandler)
+        self.socket_path = socket_path
+        self.model_path = os.path.abspath(model_path)
+        self.model = None
+        self.model_load_s = None
+        self.error = None
+        self.started = time.perf_counter()
+        self.clients = 0
+        self.ready = threading.Event()
+        threading.Thread(target=self._load, daemon=True).start()
+
+    def _load(self):
+        from vosk import Model, SetLogLevel
+        SetLogLevel(-1)
+        start = time.perf_counter()
+        try:
+            self.model = Model(self.model_path)
+        except Exception as e:
+            self.error = 'Could not load model {}: {}'.format(self.model_path, e)
+            print(self.error, flush=True)
+        else:
+            self.model_load_s = time.perf_counter() - start
+            print('Model {} loaded in {:.1f} s'.format(self.model_path, self.model_load_s), flush=True)
+        finally:
+            self.ready.set()
+
+    def server_close(self):
+        super().server_close()
+        try:
+            os.unlink(self.socket_path)
+        except OSError:
+            pass
+
+
+class _ClientHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        from scorpion_speech import make_detector
+        daemon = self.server
+        sock = self.request
+        detector = None
+        lines = []
+        try:
+            while True:
+                kind, payload = recv_message(sock)
+                if detector is None and kind not in (HELLO, STOP):
+                    send_message(sock, ERROR, json.dumps({'error': 'Send HELLO before {!r}'.format(kind)}).encode())
+                    return
+                if kind == AUDIO:
+                    arrived, = struct.unpack_from(ARRIVED, payload)
+                    reply = {'commands': detector.feed(payload[ARRIVED_SIZE:], arrived)}
+                elif kind == HELLO:
+                    daemon.ready.wait()
+                    options = json.loads(payload)
+                    model_path = options.pop('model_path', daemon.model_path)
+                    if daemon.error:
+                        send_message(sock, ERROR, json.dumps({'error': daemon.error}).encode())
+                        # Exit, so the next client starts a daemon that tries again
+                        threading.Thread(target=daemon.shutdown, daemon=True).start()
+                        return
+                    if os.path.abspath(model_path) != daemon.model_path:
+                        send_message(sock, ERROR, json.dumps({'error': (
+                            'The recognizer daemon has {} loaded, not {}; stop it with '
+                            '"python speech_daemon.py --stop"').format(daemon.model_path, model_path)}).encode())
+                        return
+                    options['log'] = lines.append
+                    detector = make_detector(daemon.model, **options)
+                    daemon.clients += 1
+                    send_message(sock, READY, json.dumps({
+                        'model_load_s': daemon.model_load_s,
+                        'uptime_s': time.perf_counter() - daemon.started,
+                        'clients': daemon.clients,
+                    }).encode())
+                    continue
+                elif kind == FLUSH:
+                    reply = {'commands': detector.flush()}
+                elif kind == DISCARD:
+                    detector.discard()
+                    reply = {'commands': []}
+                elif kind == USAGE:
+                    reply = {'commands': [], 'usage': detector.usage(), 'report': detector.report()}
+                elif kind == STOP:
+                    threading.Thread(target=daemon.shutdown, daemon=True).start()
+                    return
+                else:
+                    raise ValueError('Unknown message type {!r}'.format(kind))
+                reply['log'] = lines[:]
+                del lines[:]
+                send_message(sock, DONE, json.dumps(reply).encode())
+        except ConnectionError:
+            pass
+
+
+def _connect(socket_path):
+    private_dir(os.path.dirname(os.path.abspath(socket_path)))
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(socket_path)
+    except OSError:
+        sock.close()
+        raise
+    return sock
+
+
+def spawn_daemon(socket_path=SOCKET_PATH, model_path=MODEL_PATH):
+    """Start a daemon in its own session, logging to a file beside the socket."""
+    log = open(socket_path + '.log', 'a')
+    subprocess.Popen([sys.executable, os.path.abspath(__file__), '--socket', socket_path, '--model', model_path],
+                     stdin=subprocess.DEVNULL, stdout=log, stderr=subprocess.STDOUT,
+                     start_new_session=True, cwd=os.getcwd())
+    log.close()
+
+
+class RecognizerClient:
+    def __init__(self, socket_path=SOCKET_PATH, model_path=MODEL_PATH, spawn=True, timeout=120,
+                 log=print, **options):
+        """
+        Attach to the recognizer daemon, starting it first if it is not running.
+
+        Stands in for a local CommandDetector: feed(), flush(), discard(), usage()
+        and report() do the same, with the decoding done in the daemon.
+
+        Args:
+            socket_path (str): The daemon's Unix socket.
+            model_path (str): Model to use; the daemon is started with it if it isn't running,
+                and a running daemon that has a different one loaded refuses this client.
+            spawn (bool): Start a daemon when none is running.
+            timeout (float): Seconds to wait for a new daemon to load its model.
+            log (callable): Called with each line the detector logs, or None.
+            **options: Detector options (sample_rate, grammar, vad, partial, measure, max_age).
+
+        Raises:
+            ConnectionError: The daemon could not load its model, or has another model loaded.
+            PermissionError: The directory of socket_path is not private to this user.
+        """
+        start = time.perf_counter()
+        private_dir(os.path.dirname(os.path.abspath(socket_path)), create=True)
+        self.log = log
+        self.cold = False
+        try:
+            self.sock = _connect(socket_path)
+        except OSError:
+            if not spawn:
+                raise
+            self.cold = True
+            spawn_daemon(socket_path, model_path)
+            deadline = start + timeout
+            while True:
+                time.sleep(0.02)
+                try:
+                    self.sock = _connect(socket_path)
+                    break
+                except OSError:
+                    if time.perf_counter() > deadline:
+                        raise TimeoutError('Recognizer daemon did not start; see ' + socket_path + '.log')
+        self.connect_s = time.perf_counter() - start
+        self.sock.settimeout(timeout)
+        send_message(self.sock, HELLO, json.dumps(dict(options, model_path=os.path.abspath(model_path))).encode())
+        kind, payload = recv_message(self.sock)
+        if kind == ERROR:
+            self.sock.close()
+            raise ConnectionError(json.loads(payload)['error'])
+        if kind != READY:
+            raise ConnectionError('Unexpected reply from the recognizer daemon')
+        self.sock.settimeout(None)
+        self.info = json.loads(payload)
+        self.attach_s = time.perf_counter() - start
+
+    def startup(self):
+        """One line on how long attaching took, and why."""
+        if self.cold:
+            return 'Recognizer ready in {:.2f} s (cold: started the daemon, model load {:.2f} s)'.format(
+                self.attach_s, self.info['model_load_s'])
+        return 'Recognizer ready in {:.1f} ms (warm: daemon up {:.0f} s, client #{})'.format(
+            1000 * self.attach_s, self.info['uptime_s'], self.info['clients'])
+
+    def _call(self, kind, payload=b''):
+        send_message(self.sock, kind, payload)
+        kind, payload = recv_message(self.sock)
+        if kind != DONE:
+            raise ConnectionError('Unexpected reply from the recognizer daemon')
+        reply = json.loads(payload)
+        if self.log:
+            for line in reply['log']:
+                self.log(line)
+        return reply
+
+    def feed(self, data, arrived=None):
+        if arrived is None:
+            arrived = time.perf_counter()
+        return [tuple(c) for c in self._call(AUDIO, struct.pack(ARRIVED, arrived) + data)['commands']]
+
+    def flush(self):
+        return [tuple(c) for c in self._call(FLUSH)['commands']]
+
+    def discard(self):
+        self._call(DISCARD)
+
+    def usage(self):
+        return self._call(USAGE)['usage']
+
+    def report(self):
+        return self._call(USAGE)['report']
+
+    def close(self):
+        self.sock.close()
+
+
+def stop_daemon(socket_path=SOCKET_PATH):
+    """Ask a running daemon to exit. Returns False if none was running."""
+    try:
+        sock = _connect(socket_path)
+    except PermissionError:
+        raise
+    except OSError:
+        return False
+    send_message(sock, STOP)
+    sock.close()
+    deadline = time.perf_counter() + 5
+    while os.path.exists(socket_path) and time.perf_counter() < deadline:
+        time.sleep(0.02)
+    return True
+
+
+def bench(socket_path, model_path, warm_runs=5):
+    """Time a cold attach (no daemon running) and then warm attaches to the same daemon."""
+    stop_daemon(socket_path)
+    cold = RecognizerClient(socket_path, model_path, log=None)
+    print(cold.startup())
+    cold.close()
+    times = []
+    for _ in range(warm_runs):
+        client = RecognizerClient(socket_path, model_path, log=None)
+        times.append(client.attach_s)
+        client.close()
+    print(client.startup())
+    print('cold attach {:.2f} s (model load {:.2f} s), warm attach median {:.1f} ms, best {:.1f} ms'.format(
+        cold.attach_s, cold.info['model_load_s'], 1000 * sorted(times)[len(times) // 2], 1000 * min(times)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Resident Vosk recognizer for the Scorpion speech client.')
+    parser.add_argument('--socket', default=SOCKET_PATH)
+    parser.add_argument('--model', default=MODEL_PATH)
+    parser.add_argument('--stop', action='store_true', help='stop a running daemon')
+    parser.add_argument('--bench', action='store_true', help='time a cold and a warm attach')
+    args = parser.parse_args()
+
+    if args.stop:
+        print('Stopped' if stop_daemon(args.socket) else 'Not running')
+        return
+    if args.bench:
+        bench(args.socket, args.model)
+        return
+    try:
+        daemon = RecognizerDaemon(args.socket, args.model)
+    except OSError as e:
+        print(e)
+        sys.exit(1)
+    print('Listening on', args.socket, flush=True)
+    try:
+        daemon.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        daemon.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+# Compares the open-vocabulary recognizer with the command grammar on recorded
+# speech: decode real-time factor, CPU use, and which commands each one heard.
+# The audio is fed in the same 0.5 s blocks as the live client, as fast as the
+# recognizer will take it.
+#
+#   python speech_grammar_bench.py commands.wav [more.wav ...] [--model vosk-model-small-en-us-0.15]
+#
+# WAV files must be 16-bit mono; any sample rate the model accepts.
+import argparse
+import time
+
+from vosk import KaldiRecognizer, Model, SetLogLevel
+
+from bench_util import read_wav
+from scorpion_speech import CommandDetector, command_grammar
+
+
+def decode(model, frames, sample_rate, grammar, block_s=0.5):
+    """Run one recording through a fresh recognizer. Returns (detector, commands, process CPU s)."""
+    if grammar:
+        recognizer = KaldiRecognizer(model, sample_rate, command_grammar())
+    else:
+        recognizer = KaldiRecognizer(model, sample_rate)
+    detector = CommandDetector(recognizer, sample_rate, log=None)
+    block = int(sample_rate * block_s) * 2
+    commands = []
+    cpu = time.process_time()
+    for i in range(0, len(frames), block):
+        commands += [command for command, _ in detector.feed(frames[i:i + block])]
+    commands += [command for command, _ in detector.flush()]
+    return detector, commands, time.process_time() - cpu
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Open vocabulary vs command grammar on recorded speech.')
+    parser.add_argument('wavs', nargs='+')
+    parser.add_argument('--model', default='vosk-model-small-en-us-0.15')
+    args = parser.parse_args()
+
+    SetLogLevel(-1)
+    load = time.perf_counter()
+    model = Model(args.model)
+    print('model loaded in {:.1f} s'.format(time.perf_counter() - load))
+    print('{:8s} {:>8s} {:>8s} {:>7s} {:>9s} {:>9s}  commands'.format(
+        'mode', 'audio s', 'decode s', 'RTF', 'CPU core%', 'proc CPU%'))
+    for path in args.wavs:
+        frames, sample_rate = read_wav(path)
+        print(path)
+        for name, grammar in (('open', False), ('grammar', True)):
+            detector, commands, cpu = decode(model, frames, sample_rate, grammar)
+            print('{:8s} {:8.1f} {:8.2f} {:7.3f} {:9.1f} {:9.1f}  {}'.format(
+                name, detector.audio_s, detector.decode_s, detector.decode_s / detector.audio_s,
+                100 * detector.decode_cpu_s / detector.audio_s, 100 * cpu / detector.audio_s,
+                ' '.join(commands) or '-'))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,246 @@
+# Offline replay benchmark for the speech-to-command pipeline.
+# Streams WAV files through the same path as the live client (audio callback ->
+# AudioRing -> CommandDetector -> CommandSender) into a stub ESP32 on localhost,
+# either in real time or as fast as the recognizer will go, and reports the
+# real-time factor, the latency from the end of each spoken keyword to the
+# command being sent, and a confusion matrix of intended vs sent commands.
+#
+#   python speech_replay.py corpus/               # corpus/labels.csv names the files
+#   python speech_replay.py corpus/ --realtime --partial --grammar
+#   python speech_replay.py take1.wav take2.wav   # unlabeled: just list what was sent
+#
+# labels.csv has one row per spoken command (times in seconds from the start
+# of the file); a file with no row, or an empty command, expects nothing:
+#
+#   file,command,end_s
+#   left_01.wav,MOVE_LEFT,1.42
+#   two_01.wav,LIGHT_ON,0.95
+#   two_01.wav,MOVE_MID,2.60
+#   chatter_01.wav,,
+import argparse
+import asyncio
+import csv
+import os
+import queue
+import socket
+import threading
+import time
+
+from bench_util import free_port, percentile, read_wav
+from scorpion_server import ControlServer, fake_router
+from scorpion_speech import AudioRing, CommandSender, make_detector
+
+NONE = '-'  # no command intended / none sent
+MATCH_WINDOW = (-0.5, 3.0)  # a sent command counts for a label this long before/after the word ended
+
+
+def load_corpus(paths):
+    """
+    Return [(wav path, [(command, end_s), ...] or None if unlabeled)].
+    """
+    corpus = []
+    for path in paths:
+        if os.path.isdir(path):
+            labels = {}
+            with open(os.path.join(path, 'labels.csv'), newline='') as f:
+                for row in csv.DictReader(f):
+                    expected = labels.setdefault(row['file'], [])
+                    if row['command']:
+                        end = row.get('end_s')
+                        expected.append((row['command'], float(end) if end else None))
+            for name in sorted(labels):
+                corpus.append((os.path.join(path, name), sorted(labels[name], key=lambda e: e[1] or 0)))
+        else:
+            corpus.append((path, None))
+    return corpus
+
+
+class StubESP32:
+    def __init__(self):
+        """The stand-in Scorpion HTTP server on a free localhost port, recording every command it gets."""
+        self.port = free_port(socket.SOCK_STREAM)
+        self.url = 'http://127.0.0.1:{}/control'.format(self.port)
+        self.received = []  # (perf_counter time, request target)
+        self._router = fake_router(animation_ms=0)
+        self._started = threading.Event()
+        threading.Thread(target=self._run, daemon=True).start()
+        self._started.wait()
+
+    def _dispatch(self, target):
+        self.received.append((time.perf_counter(), target))
+        return self._router.dispatch(target)
+
+    def _run(self):
+        async def serve():
+            await ControlServer(self._dispatch, host='127.0.0.1', port=self.port).start()
+            self._started.set()
+            while True:
+                await asyncio.sleep(3600)
+
+        asyncio.run(serve())
+
+
+def replay(frames, sample_rate, detector, sender, blocksize, realtime, max_lag):
+    """
+    Play one recording through the pipeline.
+
+    Args:
+        frames (bytes): 16-bit mono samples, as read_wav() returns them.
+        sample_rate (int): Their sample rate; the detector must have been made for it.
+
+    Returns:
+        tuple: (audio seconds, wall seconds, [(command, seconds into the file when it was sent)])
+    """
+    block = blocksize * 2
+    ring = AudioRing(capacity=max(4, int(max_lag * sample_rate / blocksize) + 2), max_lag=max_lag)
+    finished = threading.Event()
+    begin = time.perf_counter()
+    start = begin + 0.05
+
+    def source():
+        # Stands in for sd.RawInputStream: each block is stamped with the moment its last
+        # sample would have been captured. Flat out, the stamps run ahead of the clock.
+        for i in range(0, len(frames), block):
+            captured = start + min(i + block, len(frames)) / 2 / sample_rate
+            if realtime:
+                delay = captured - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            else:
+                while len(ring) >= ring.capacity - 1:
+                    time.sleep(0.0005)  # a file can wait for the recognizer; a microphone can't
+            ring.put(frames[i:i + block], captured)
+        finished.set()
+
+    threading.Thread(target=source, daemon=True).start()
+    sent = []
+
+    def dispatch(commands, before, arrived):
+        # Same rule as CommandDetector: ahead of the clock, only the decode time counts
+        now = max(time.perf_counter(), arrived + time.perf_counter() - before)
+        for command, spoken in commands:
+            sender.send(command, spoken)
+            sent.append((command, now - start))
+
+    while not (finished.is_set() and not len(ring)):
+        try:
+            data, arrived, gap = ring.get(timeout=0.05)
+        except queue.Empty:
+            continue
+        if gap:
+            detector.discard()
+        before = time.perf_counter()
+        dispatch(detector.feed(data, arrived), before, arrived)
+    before = time.perf_counter()
+    dispatch(detector.flush(), before, start + len(frames) / 2 / sample_rate)
+    return len(frames) / 2 / sample_rate, time.perf_counter() - begin, sent
+
+
+def match(expected, sent):
+    """
+    Pair each labeled command with the first unused sent command in its window.
+
+    Returns:
+        list: (intended, sent, latency s or None) with NONE for a miss or a false alarm.
+    """
+    pairs = []
+    used = [False] * len(sent)
+    for command, end in expected:
+        for i, (got, at) in enumerate(sent):
+            if used[i]:
+                continue
+            if end is None or MATCH_WINDOW[0] <= at - end <= MATCH_WINDOW[1]:
+                used[i] = True
+                pairs.append((command, got, None if end is None else at - end))
+                break
+        else:
+            pairs.append((command, NONE, None))
+    pairs += [(NONE, got, None) for i, (got, _) in enumerate(sent) if not used[i]]
+    return pairs
+
+
+def confusion_matrix(pairs):
+    labels = sorted({p[0] for p in pairs} | {p[1] for p in pairs}, key=lambda c: (c == NONE, c))
+    counts = {}
+    for intended, got, _ in pairs:
+        counts[intended, got] = counts.get((intended, got), 0) + 1
+    width = max(len(c) for c in labels) + 1
+    lines = ['intended \\ sent'.ljust(width + 2) + ''.join(c.rjust(width) for c in labels)]
+    for row in labels:
+        lines.append(row.ljust(width + 2) + ''.join(str(counts.get((row, col), '.')).rjust(width) for col in labels))
+    return '\n'.join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay WAV files through the speech-to-command pipeline.')
+    parser.add_argument('paths', nargs='+', help='corpus folders holding labels.csv, or WAV files')
+    parser.add_argument('--model', default='vosk-model-small-en-us-0.15')
+    parser.add_argument('--realtime', action='store_true', help='play at the speed it was recorded')
+    parser.add_argument('--blocksize', type=int, default=8000, help='samples per audio block, as in the live client')
+    parser.add_argument('--grammar', action='store_true', help='restrict the recognizer to the command words')
+    parser.add_argument('--partial', action='store_true', help='fire commands from partial results')
+    parser.add_argument('--no-vad', action='store_true', help='decode every block')
+    parser.add_argument('--max-lag', type=float, default=1.0)
+    parser.add_argument('--max-age', type=float, default=None, help='drop commands heard longer ago than this')
+    args = parser.parse_args()
+
+    from vosk import Model, SetLogLevel
+    SetLogLevel(-1)
+    corpus = load_corpus(args.paths)
+    model = Model(args.model)
+    stub = StubESP32()
+    sender = CommandSender(stub.url, max_age=args.max_age, log=None)
+
+    audio_total = wall_total = 0.0
+    decode_total = cpu_total = 0.0
+    pairs = []
+    print('Replaying at {}, blocks of {} samples, {}{}{}'.format(
+        'real time' if args.realtime else 'max speed', args.blocksize, 'grammar' if args.grammar else 'open vocabulary',
+        ', partial results' if args.partial else '', '' if args.no_vad else ', VAD'))
+    print('{:28s} {:>7s} {:>7s}  {:24s} {:24s} {}'.format('file', 'audio s', 'RTF', 'intended', 'sent', 'latency ms'))
+    for path, expected in corpus:
+        frames, sample_rate = read_wav(path)
+        detector = make_detector(model, sample_rate=sample_rate, grammar=args.grammar, vad=not args.no_vad,
+                                 partial=args.partial, max_age=args.max_age, log=None)
+        audio_s, wall_s, sent = replay(frames, sample_rate, detector, sender, args.blocksize, args.realtime,
+                                       args.max_lag)
+        audio_total += audio_s
+        wall_total += wall_s
+        decode_total += detector.decode_s
+        cpu_total += detector.decode_cpu_s
+        if expected is None:
+            file_pairs = [(NONE, got, None) for got, _ in sent]
+            intended = '(unlabeled)'
+        else:
+            file_pairs = match(expected, sent)
+            pairs += file_pairs
+            intended = ' '.join(c for c, _ in expected) or NONE
+        print('{:28s} {:7.1f} {:7.3f}  {:24s} {:24s} {}'.format(
+            os.path.basename(path)[:28], audio_s, wall_s / audio_s, intended,
+            ' '.join(c for c, _ in sent) or NONE,
+            ' '.join('{:.0f}'.format(1000 * p[2]) for p in file_pairs if p[2] is not None) or '-'))
+
+    sender.close()
+    print()
+    print('audio {:.1f} s replayed in {:.1f} s: pipeline real-time factor {:.3f}; recognizer RTF {:.3f}, '
+          'CPU {:.1f}% of one core'.format(audio_total, wall_total, wall_total / audio_total,
+                                           decode_total / audio_total, 100 * cpu_total / audio_total))
+    print('stub ESP32 received {} of {} commands sent ({} failed, {} dropped, {} stale)'.format(
+        len(stub.received), sender.sent + sender.failed + sender.dropped + sender.stale, sender.failed,
+        sender.dropped, sender.stale))
+    if not pairs:
+        return
+    latencies = [1000 * p[2] for p in pairs if p[2] is not None and p[0] == p[1]]
+    if latencies:
+        print('end of word to dispatch, correct commands: p50 {:.0f} ms, p95 {:.0f} ms, max {:.0f} ms'.format(
+            percentile(latencies, 50), percentile(latencies, 95), max(latencies)))
+    correct = sum(1 for p in pairs if p[0] == p[1])
+    print('{} of {} correct, {} missed, {} wrong command, {} false alarms'.format(
+        correct, sum(1 for p in pairs if p[0] != NONE), sum(1 for p in pairs if p[0] != NONE and p[1] == NONE),
+        sum(1 for p in pairs if NONE not in p and p[0] != p[1]), sum(1 for p in pairs if p[0] == NONE)))
+    print()
+    print(confusion_matrix(pairs))
+
+
+if __name__ == '__main__':
+    main()
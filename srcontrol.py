@@ -0,0 +1,301 @@
+import machine
+import time
+
+try:
+    import uasyncio as asyncio
+except ImportError:
+    import asyncio
+
+try:
+    from time import ticks_ms, ticks_add, ticks_diff
+except ImportError:
+    # Plain Python on the laptop (benchmarks and simulations)
+    def ticks_ms():
+        return int(time.monotonic() * 1000)
+
+    def ticks_add(ticks, delta):
+        return ticks + delta
+
+    def ticks_diff(ticks1, ticks2):
+        return ticks1 - ticks2
+
+
+#shift-out transports for the 74HC595 chain
+class BitBangTransport:
+    def __init__(self, data_pin, clock_pin):
+        """
+        Shift bytes out MSB first by toggling the data and clock pins directly.
+
+        Args:
+            data_pin (int): GPIO pin connected to the Data Input (DS) pin.
+            clock_pin (int): GPIO pin connected to the Clock (SHCP) pin.
+        """
+        self.data = machine.Pin(data_pin, machine.Pin.OUT)
+        self.clock = machine.Pin(clock_pin, machine.Pin.OUT)
+        self.data.value(0)
+        self.clock.value(0)
+
+    def write(self, buf):
+        """
+        Shift out every byte in buf, first byte first.
+
+        The 74HC595 only needs ~20 ns per clock edge, far less than one
+        MicroPython bytecode, so no sleeps are needed between edges.
+        """
+        data = self.data.value
+        clock = self.clock.value
+        for byte in buf:
+            for i in range(7, -1, -1):
+                data((byte >> i) & 1)
+                clock(1)
+                clock(0)
+
+
+class SPITransport:
+    def __init__(self, spi_id, data_pin, clock_pin, miso_pin=39, baudrate=1000000):
+        """
+        Shift bytes out through the hardware SPI peripheral in a single write.
+
+        Args:
+            spi_id (int): Hardware SPI bus id (1 = HSPI, 2 = VSPI on the ESP32).
+            data_pin (int): GPIO pin connected to the Data Input (DS) pin, used as MOSI.
+            clock_pin (int): GPIO pin connected to the Clock (SHCP) pin, used as SCK.
+            miso_pin (int): Unconnected GPIO pin to give the bus as MISO. Nothing is read,
+                but without one the bus claims its default MISO (GPIO12 on HSPI, a boot
+                strapping pin). The default, GPIO39, is input-only and otherwise unused.
+            baudrate (int): SPI clock rate in Hz.
+        """
+        self.spi = machine.SPI(spi_id, baudrate=baudrate, polarity=0, phase=0,
+                               bits=8, firstbit=machine.SPI.MSB,
+                               sck=machine.Pin(clock_pin), mosi=machine.Pin(data_pin),
+                               miso=machine.Pin(miso_pin))
+
+    def write(self, buf):
+        """Shift out every byte in buf, first byte first."""
+        self.spi.write(buf)
+
+
+#air pump control library
+class SRControl:
+    def __init__(self, data_pin, clock_pin, latch_pin, oe_pin, num_chips=1, transport=None, spi_id=None, miso_pin=39,
+                 clock=ticks_ms):
+        """
+        Initialize the 74HC595 shift register class.
+
+        Args:
+            data_pin (int): GPIO pin connected to the Data Input (DS) pin.
+            clock_pin (int): GPIO pin connected to the Clock (SHCP) pin.
+            latch_pin (int): GPIO pin connected to the Latch (STCP) pin.
+            oe_pin (int): GPIO pin connected to the Output Enable pin.
+            num_chips (int): Number of daisy-chained 74HC595 chips.
+            transport (object, optional): Object with a write(buf) method used to shift
+                the state out. Overrides spi_id when given.
+            spi_id (int, optional): Hardware SPI bus to drive data_pin/clock_pin with.
+                If None, the pins are bit-banged.
+            miso_pin (int): Unused GPIO pin for the SPI bus's MISO (see SPITransport).
+            clock (callable): Millisecond tick source used for timed relays.
+        """
+        if transport is None:
+            if spi_id is None:
+                transport = BitBangTransport(data_pin, clock_pin)
+            else:
+                transport = SPITransport(spi_id, data_pin, clock_pin, miso_pin)
+        self.transport = transport
+
+        self.latch = machine.Pin(latch_pin, machine.Pin.OUT)
+        self.oepin = machine.Pin(oe_pin, machine.Pin.OUT)
+
+        # Initialize pins to low state
+        self.latch.value(0)
+        self.oepin.value(1)
+
+        self.num_chips = num_chips
+        self.state = [0x00] * num_chips  # Current state of all shift registers
+        self._buf = bytearray(num_chips)  # Reused shift-out buffer, last chip first
+        self._latched = None  # Bytes last shifted out, None until the first update
+        self._batch_depth = 0
+
+        self._clock = clock
+        self._release = {}  # chip index -> tick at which its relays are turned off
+
+    def _pulse(self, pin):
+        """Generate a pulse on the specified pin."""
+        pin.value(1)
+        pin.value(0)
+
+    def _shift_out(self):
+        """
+        Shift out the states of all daisy-chained 74HC595 chips.
+        """
+        self.transport.write(self._buf)
+
+    def update(self, force=False):
+        """
+        Latch and update the outputs of the shift register.
+
+        Nothing is shifted out while a batch is open, or when the state matches
+        what is already latched (unless force is True).
+
+        Returns:
+            bool: True if the chain was shifted out and latched.
+        """
+        if self._batch_depth:
+            return False
+        buf = self._buf
+        last = self.num_chips - 1
+        for i in range(self.num_chips):
+            buf[i] = self.state[last - i]
+        if not force and buf == self._latched:
+            return False
+        self.oepin.value(1)  # Disable output while updating
+        self._shift_out()
+        self._pulse(self.latch)  # Latch the data
+        self.oepin.value(0)  # Enable output
+        if self._latched is None:
+            self._latched = bytearray(self.num_chips)
+        self._latched[:] = buf
+        return True
+
+    def batch(self):
+        """
+        Group several relay changes into a single latch.
+
+        Usage:
+            with src.batch():
+                src.inflate(0)
+                src.deflate(1)
+        """
+        return self
+
+    def __enter__(self):
+        self._batch_depth += 1
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._batch_depth -= 1
+        self.update()
+        return False
+
+    def _check(self, chip_index, low_nibble):
+        if chip_index < 0 or chip_index >= self.num_chips:
+            raise ValueError("Invalid chip index.")
+
+        if low_nibble & 0b0011 and low_nibble & 0b1100:
+            raise ValueError("Bits 0 and 1 cannot be active simultaneously with bits 2 and 3.")
+
+    def _apply(self, chip_index, low_nibble, duration):
+        # Ensure only the lower nibble is considered
+        low_nibble &= 0x0F
+
+        # Update the state for the specified chip
+        self.state[chip_index] = (self.state[chip_index] & 0xF0) | low_nibble
+
+        if duration:
+            # Turn off all relays for the specified chip once the duration has passed
+            self._release[chip_index] = ticks_add(self._clock(), int(duration * 1000))
+        else:
+            self._release.pop(chip_index, None)
+
+    def set_relays(self, chip_index, low_nibble, duration=None):
+        """
+        Update the relays connected to a specific chip's low nibble.
+
+        Args:
+            chip_index (int): The index of the chip to update (0-based).
+            low_nibble (int): The lower 4 bits (0-15) controlling relays.
+                Bits 0 and 1 will turn on together and are mutually exclusive to bits 2 and 3.
+            duration (int, optional): Time in seconds to keep the relays on. If None, relays remain on indefinitely.
+                The call returns straight away; the chip is turned off later by tick().
+        """
+        self._check(chip_index, low_nibble)
+        self._apply(chip_index, low_nibble, duration)
+        self.update()
+
+    def set_many(self, nibbles, duration=None):
+        """
+        Update the low nibble of several chips and latch them all at once.
+
+        Args:
+            nibbles (dict): Chip index -> low nibble, with the same rules as set_relays().
+            duration (int, optional): Time in seconds to keep the relays on, applied to every chip given.
+        """
+        # Validate everything first so a bad entry leaves the state untouched
+        for chip_index, low_nibble in nibbles.items():
+            self._check(chip_index, low_nibble)
+        for chip_index, low_nibble in nibbles.items():
+            self._apply(chip_index, low_nibble, duration)
+        self.update()
+
+    def inflate(self, chip_index, duration=None):
+        """
+        Activate relays 0 and 1 on the specified chip to turn on inflation, optionally for duration seconds.
+        """
+        self.set_relays(chip_index, 0b0011, duration)
+
+    def deflate(self, chip_index, duration=None):
+        """
+        Activate relays 2 and 3 on the specified chip to turn on deflation, optionally for duration seconds.
+        """
+        self.set_relays(chip_index, 0b1100, duration)
+
+    def hold(self, chip_index=None):
+        """
+        Turn off all relays for a specific chip or all chips.
+
+        Args:
+            chip_index (int, optional): The index of the chip to hold. If None, all chips are held.
+        """
+        if chip_index is None:
+            self.state = [0x00] * self.num_chips
+            self._release.clear()
+        else:
+            if chip_index < 0 or chip_index >= self.num_chips:
+                raise ValueError("Invalid chip index.")
+            self.state[chip_index] = 0x00
+            self._release.pop(chip_index, None)
+        self.update()
+
+    def pending(self):
+        """
+        Return a dict of chip index -> milliseconds left before its relays are turned off.
+        """
+        now = self._clock()
+        return {chip: max(0, ticks_diff(deadline, now)) for chip, deadline in self._release.items()}
+
+    def tick(self, now=None):
+        """
+        Turn off every chip whose timed set_relays() has run out.
+
+        Call this regularly from the main loop, or let run() call it.
+
+        Args:
+            now (int, optional): Current tick in ms. Defaults to the clock given at construction.
+
+        Returns:
+            list: Indices of the chips that were released, in deadline order.
+        """
+        if not self._release:
+            return []
+        if now is None:
+            now = self._clock()
+        due = [chip for chip, deadline in self._release.items() if ticks_diff(now, deadline) >= 0]
+        if not due:
+            return due
+        due.sort(key=lambda chip: ticks_diff(self._release[chip], now))
+        for chip in due:
+            del self._release[chip]
+            self.state[chip] = 0x00
+        self.update()  # One latch for every chip released on this tick
+        return due
+
+    async def run(self, period_ms=10):
+        """
+        Call tick() every period_ms as a uasyncio task so timed relays are released in the background.
+
+        Not a machine.Timer: its callback would run between any two bytecodes of the
+        request handlers, in the middle of their state changes and shift-outs, and
+        latch a torn relay state. A task only runs while the handlers are awaiting.
+        """
+        while True:
+            self.tick()
+            await asyncio.sleep(period_ms / 1000)
@@ -0,0 +1,169 @@
+# Host-side benchmark for the SRControl shift-out transports.
+# Runs on a laptop with normal Python: a fake machine module stands in for the
+# ESP32 so we can count pin toggles and time each update() for 1..8 chips.
+import sys
+import time
+import types
+
+
+class FakePin:
+    OUT = 1
+    IN = 0
+
+    def __init__(self, pin_id, mode=None):
+        self.id = pin_id
+        self.level = 0
+        self.toggles = 0
+        self.rising = []  # callbacks run on every 0 -> 1 edge
+
+    def value(self, v=None):
+        if v is None:
+            return self.level
+        v = 1 if v else 0
+        if v != self.level:
+            self.toggles += 1
+            self.level = v
+            if v:
+                for cb in self.rising:
+                    cb()
+
+
+class FakeSPI:
+    MSB = 0
+    LSB = 1
+
+    def __init__(self, spi_id, **kwargs):
+        self.id = spi_id
+        self.writes = 0
+        self.sent = bytearray()
+
+    def write(self, buf):
+        self.writes += 1
+        self.sent.extend(buf)
+
+
+fake_machine = types.ModuleType("machine")
+fake_machine.Pin = FakePin
+fake_machine.SPI = FakeSPI
+sys.modules["machine"] = fake_machine
+
+from srcontrol import SRControl, BitBangTransport, SPITransport  # noqa: E402
+
+
+class LegacyTransport(BitBangTransport):
+    """The original bit-bang loop: one _pulse() with two 1 ms sleeps per clock edge."""
+
+    def write(self, buf):
+        for byte in buf:
+            for i in range(8):
+                self.data.value((byte >> (7 - i)) & 1)
+                self.clock.value(1)
+                time.sleep(0.001)
+                self.clock.value(0)
+                time.sleep(0.001)
+
+
+def make_sr(kind, num_chips):
+    if kind == "legacy":
+        transport = LegacyTransport(25, 33)
+    elif kind == "bitbang":
+        transport = BitBangTransport(25, 33)
+    else:
+        transport = SPITransport(1, 25, 33)
+    return SRControl(25, 33, 32, 23, num_chips=num_chips, transport=transport)
+
+
+def shifted_bytes(sr):
+    """Return the bytes seen by the chain, however they were shifted out."""
+    t = sr.transport
+    if isinstance(t, SPITransport):
+        return bytes(t.spi.sent)
+    return bytes(t.captured)
+
+
+def attach_capture(sr):
+    """Record the data pin at each rising clock edge, like a real 74HC595 would."""
+    t = sr.transport
+    if isinstance(t, SPITransport):
+        return
+    t.captured = bytearray()
+    bits = []
+
+    def on_clock():
+        bits.append(t.data.level)
+        if len(bits) == 8:
+            byte = 0
+            for b in bits:
+                byte = (byte << 1) | b
+            t.captured.append(byte)
+            bits.clear()
+
+    t.clock.rising.append(on_clock)
+
+
+def pin_toggles(sr):
+    t = sr.transport
+    total = sr.latch.toggles + sr.oepin.toggles
+    if isinstance(t, SPITransport):
+        return total
+    return total + t.data.toggles + t.clock.toggles
+
+
+def bench(kind, num_chips, rounds):
+    sr = make_sr(kind, num_chips)
+    attach_capture(sr)
+    pattern = [0b0011, 0b1100, 0b0000]
+    start = time.perf_counter()
+    for r in range(rounds):
+        for chip in range(num_chips):
+            sr.state[chip] = pattern[(r + chip) % 3]
+        sr.update()
+    elapsed = time.perf_counter() - start
+    expected = bytearray()
+    for r in range(rounds):
+        expected.extend(pattern[(r + chip) % 3] for chip in reversed(range(num_chips)))
+    ok = shifted_bytes(sr) == bytes(expected)
+    return elapsed / rounds * 1000.0, pin_toggles(sr) / rounds, ok
+
+
+def coalescing(num_chips=8, changed=4):
+    """Count SPI writes for the same multi-chip change made three different ways."""
+    counts = {}
+    nibbles = {chip: 0b0011 if chip % 2 else 0b1100 for chip in range(changed)}
+
+    sr = make_sr("spi", num_chips)
+    for chip, nibble in nibbles.items():
+        sr.set_relays(chip, nibble)
+    counts["set_relays x{}".format(changed)] = sr.transport.spi.writes
+
+    sr = make_sr("spi", num_chips)
+    sr.set_many(nibbles)
+    counts["set_many"] = sr.transport.spi.writes
+
+    sr = make_sr("spi", num_chips)
+    with sr.batch():
+        for chip, nibble in nibbles.items():
+            sr.set_relays(chip, nibble)
+    sr.set_many(nibbles)  # already latched, so this is skipped
+    counts["batch() + repeat"] = sr.transport.spi.writes
+    return counts
+
+
+def main():
+    rounds = {"legacy": 3, "bitbang": 200, "spi": 200}
+    rows = []
+    for num_chips in (1, 2, 4, 8):
+        for kind in ("legacy", "bitbang", "spi"):
+            rows.append((num_chips, kind) + bench(kind, num_chips, rounds[kind]))
+    print("chips  transport  ms/update  pin toggles/update  bits ok")
+    for num_chips, kind, ms, toggles, ok in rows:
+        print("{:5d}  {:9s}  {:9.3f}  {:18.1f}  {}".format(num_chips, kind, ms, toggles, ok))
+
+    print()
+    print("writes to change 4 of 8 chips")
+    for name, writes in coalescing().items():
+        print("{:18s}  {}".format(name, writes))
+
+
+if __name__ == "__main__":
+    main()
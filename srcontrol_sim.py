@@ -0,0 +1,57 @@
+# Simulated-clock check for the SRControl timed relay scheduler.
+# Runs on a laptop: several chips are inflated/deflated for overlapping
+# durations and the virtual clock is stepped 1 ms at a time. Each chip must be
+# released on exactly the tick its duration runs out, and nothing may block.
+import srcontrol_bench  # noqa: F401  (installs the fake machine module)
+from srcontrol import SRControl, BitBangTransport
+
+
+class VirtualClock:
+    def __init__(self, start=0):
+        self.now = start
+
+    def __call__(self):
+        return self.now
+
+
+def run(num_chips=6, step_ms=1):
+    clock = VirtualClock(1000)
+    sr = SRControl(25, 33, 32, 23, num_chips=num_chips,
+                   transport=BitBangTransport(25, 33), clock=clock)
+
+    # chip -> (start offset ms, duration s, action)
+    plan = {
+        0: (0, 1.5, sr.inflate),
+        1: (0, 0.25, sr.deflate),
+        2: (100, 1.0, sr.inflate),
+        3: (100, 0.9, sr.deflate),
+        4: (250, 0.5, sr.inflate),
+        5: (400, 0.35, sr.deflate),
+    }
+    plan = {chip: plan[chip] for chip in range(num_chips) if chip in plan}
+    expected = {chip: clock.now + start + int(duration * 1000) for chip, (start, duration, _) in plan.items()}
+
+    released = {}
+    end = max(expected.values()) + 50
+    t0 = clock.now
+    while clock.now <= end:
+        offset = clock.now - t0
+        for chip, (start, duration, action) in plan.items():
+            if start == offset:
+                action(chip, duration)
+                assert sr.state[chip] != 0, "chip {} did not switch on".format(chip)
+        for chip in sr.tick():
+            released[chip] = clock.now
+        clock.now += step_ms
+
+    print("chip  expected  released  state")
+    for chip in sorted(plan):
+        print("{:4d}  {:8d}  {:8d}  {:#04x}".format(chip, expected[chip] - t0, released[chip] - t0, sr.state[chip]))
+        assert released[chip] == expected[chip], "chip {} released at the wrong tick".format(chip)
+        assert sr.state[chip] == 0x00
+    assert not sr.pending()
+    print("All {} chips released on their deadline tick.".format(len(plan)))
+
+
+if __name__ == "__main__":
+    run()